@@ -0,0 +1,61 @@
+# frappe-bench/apps/cat_laser/cat_laser/benchmarks/instances.py
+"""
+Sinh bài toán cắt sắt ngẫu nhiên (có seed) gần với đơn hàng thực tế:
+cây 6000 / 11700 mm, 3-30 kích thước, số lượng từ vài chục tới vài trăm.
+"""
+import json
+import random
+
+STOCK_LENGTHS = (6000, 11700)
+DEFAULT_FACTORS = [1, 2, 3, 4, 5, 6, 8, 10]
+
+
+def make_instance(n_sizes, stock_length=6000, seed=0, max_stock_over=10):
+    """
+    Trả về dict bài toán (lưu được dạng JSON):
+      - phần lớn kích thước ngắn (150 mm - 1/4 cây), một ít đoạn dài (tới 1/2 cây)
+      - kích thước làm tròn 5 mm, thỉnh thoảng lẻ 0.5 mm
+      - số lượng phân bố log-uniform trong [10, 400]
+    """
+    rng = random.Random(f"{n_sizes}-{stock_length}-{seed}")
+    sizes = set()
+    while len(sizes) < n_sizes:
+        upper = stock_length // 2 if rng.random() < 0.15 else stock_length // 4
+        size = rng.randrange(150, upper, 5) + rng.choice([0, 0, 0, 0.5])
+        sizes.add(size)
+
+    items = []
+    for k, size in enumerate(sorted(sizes, reverse=True)):
+        qty = round(10 * 40 ** rng.random())
+        items.append({"item_name": f"P{k + 1:02d}", "length": size, "qty": qty})
+
+    return {
+        "name": f"n{n_sizes}_L{stock_length}_s{seed}",
+        "seed": seed,
+        "stock_length": stock_length,
+        "te_dau_sat": 10,
+        "blade_width": 4,
+        "factors": list(DEFAULT_FACTORS),
+        "max_manual_cuts": 0,
+        "max_stock_over": max_stock_over,
+        "items": items,
+    }
+
+
+def make_suite(size_counts=(3, 5, 10, 20, 30), stock_lengths=STOCK_LENGTHS, seeds=(0,)):
+    return [
+        make_instance(n, stock_length=length, seed=seed)
+        for length in stock_lengths
+        for n in size_counts
+        for seed in seeds
+    ]
+
+
+def save_instance(instance, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(instance, f, ensure_ascii=False, indent=1)
+
+
+def load_instance(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,102 @@
+# frappe-bench/apps/cat_laser/cat_laser/benchmarks/numeric_scaling.py
+"""
+So sánh tiền xử lý số của 2 GĐ (normalize_coefficients):
+  - off: thang x10 cố định, GĐ 2 tối thiểu hao hụt x1000 x 10^6 + số bó trong 1 lần giải
+  - on: thang nguyên nhỏ nhất + chia GCD, GĐ 2 giải theo thứ tự ưu tiên (hao hụt rồi số bó)
+Mỗi chế độ dùng cache pattern trống riêng để đo cả GĐ 1.
+
+Chạy:
+    python -m cat_laser.benchmarks.numeric_scaling --sizes 5,10,20 --time-limit 10
+hoặc trong bench:
+    bench --site <site> execute cat_laser.benchmarks.numeric_scaling.run
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from cat_laser.benchmarks.instances import STOCK_LENGTHS, make_suite
+from cat_laser.benchmarks.optimizer import _int_list
+from cat_laser.optimize import optimizer_from_instance
+from cat_laser.utils.pattern_cache import PatternCacheStore
+from cat_laser.utils.progress import CallbackProgress
+
+
+def run_instance(instance, normalize, time_limit=10, cache_store=None, log=None):
+    row = {"instance": instance["name"], "normalize": normalize}
+    optimizer = optimizer_from_instance(
+        instance,
+        progress=CallbackProgress(log=log),
+        time_limit_seconds=time_limit,
+        cache_store=cache_store,
+        normalize_coefficients=normalize,
+    )
+    try:
+        start = time.perf_counter()
+        optimizer.optimize_cutting()
+        row["phase1_sec"] = round(time.perf_counter() - start, 4)
+        row["patterns"] = len(optimizer.patterns)
+
+        start = time.perf_counter()
+        plan = optimizer.optimize_distribution()
+        row["phase2_sec"] = round(time.perf_counter() - start, 4)
+    except Exception as e:
+        row["error"] = str(e)
+        return row
+
+    stats = optimizer.phase2_stats
+    row.update(
+        build_sec=round(stats["build_time"], 4),
+        solve_sec=round(stats["wall_time"], 4),
+        status=stats["status"],
+        gap=stats.get("gap"),
+        bars=plan["totals"]["bars"],
+        bundles=plan["totals"]["bundles"],
+        waste_mm=round(plan["totals"]["waste"], 1),
+    )
+    return row
+
+
+def print_table(rows):
+    print(
+        f"{'instance':<18} {'norm':<5} {'P1 (s)':>8} {'#pat':>6} {'build':>7} {'solve':>7} "
+        f"{'status':<9} {'gap%':>7} {'bars':>6} {'bó':>5} {'waste':>9}"
+    )
+    for r in rows:
+        norm = "on" if r["normalize"] else "off"
+        if r.get("error"):
+            print(f"{r['instance']:<18} {norm:<5} ❌ {r['error']}")
+            continue
+        gap = f"{r['gap'] * 100:.2f}" if r["gap"] is not None else "-"
+        print(
+            f"{r['instance']:<18} {norm:<5} {r['phase1_sec']:>8.3f} {r['patterns']:>6} "
+            f"{r['build_sec']:>7.3f} {r['solve_sec']:>7.2f} {r['status']:<9} {gap:>7} "
+            f"{r['bars']:>6} {r['bundles']:>5} {r['waste_mm']:>9.1f}"
+        )
+
+
+def run(size_counts=(5, 10, 20), stock_lengths=STOCK_LENGTHS, seeds=(0,), time_limit=10, verbose=False):
+    log = print if verbose else None
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="cat_laser_bench_") as tmp:
+        for k, instance in enumerate(make_suite(size_counts, stock_lengths, seeds)):
+            for normalize in (False, True):
+                store = PatternCacheStore(os.path.join(tmp, f"{k}_{int(normalize)}"))
+                rows.append(run_instance(instance, normalize, time_limit, store, log=log))
+    print_table(rows)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="So sánh tiền xử lý số (thang nguyên, GCD, mục tiêu theo thứ tự)")
+    parser.add_argument("--sizes", type=_int_list, default=(5, 10, 20))
+    parser.add_argument("--stock-lengths", type=_int_list, default=STOCK_LENGTHS)
+    parser.add_argument("--seeds", type=_int_list, default=(0,))
+    parser.add_argument("--time-limit", type=float, default=10)
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+    run(args.sizes, args.stock_lengths, args.seeds, args.time_limit, args.verbose)
+
+
+if __name__ == "__main__":
+    main()
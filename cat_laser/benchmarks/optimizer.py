@@ -0,0 +1,218 @@
+# frappe-bench/apps/cat_laser/cat_laser/benchmarks/optimizer.py
+"""
+Đo hiệu năng SteelCuttingOptimizer (GĐ 1 + GĐ 2) trên bộ bài toán sinh ngẫu nhiên,
+không cần site Frappe: log được chuyển qua callback (CallbackProgress).
+Mỗi lượt chạy được ghi thêm vào lịch sử history.jsonl / history.csv để so sánh giữa các lần sửa.
+
+Chạy:
+    python -m cat_laser.benchmarks.optimizer --sizes 3,10,30 --time-limit 10 --label baseline
+hoặc trong bench:
+    bench --site <site> execute cat_laser.benchmarks.optimizer.run
+"""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from cat_laser.benchmarks.instances import STOCK_LENGTHS, make_suite
+from cat_laser.optimize import optimizer_from_instance
+from cat_laser.utils.constants import PATTERN_MODE_COLUMN_GENERATION, PATTERN_MODE_ENUMERATION
+from cat_laser.utils.pattern_cache import PatternCacheStore
+from cat_laser.utils.progress import CallbackProgress
+
+HISTORY_JSON = "history.jsonl"
+HISTORY_CSV = "history.csv"
+
+FIELDS = [
+    "timestamp",
+    "label",
+    "commit",
+    "instance",
+    "sizes",
+    "stock_length",
+    "pattern_mode",
+    "time_limit",
+    "phase1_sec",
+    "patterns",
+    "build_sec",
+    "phase2_sec",
+    "phase2_status",
+    "gap",
+    "bars",
+    "bundles",
+    "waste_mm",
+    "waste_percent",
+    "error",
+]
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def build_optimizer(instance, time_limit, pattern_mode, cache_store, log=None):
+    return optimizer_from_instance(
+        instance,
+        progress=CallbackProgress(log=log),
+        time_limit_seconds=time_limit,
+        pattern_mode=pattern_mode,
+        cache_store=cache_store,
+    )
+
+
+def run_instance(instance, time_limit=30, pattern_mode=PATTERN_MODE_ENUMERATION, cache_store=None, log=None):
+    """Chạy 1 bài toán, trả về 1 dòng kết quả (dict theo FIELDS)."""
+    row = {
+        "instance": instance["name"],
+        "sizes": len(instance["items"]),
+        "stock_length": instance["stock_length"],
+        "pattern_mode": pattern_mode,
+        "time_limit": time_limit,
+    }
+    optimizer = build_optimizer(instance, time_limit, pattern_mode, cache_store, log=log)
+    try:
+        start = time.perf_counter()
+        optimizer.optimize_cutting()
+        row["phase1_sec"] = round(time.perf_counter() - start, 4)
+        row["patterns"] = len(optimizer.patterns)
+
+        start = time.perf_counter()
+        plan = optimizer.optimize_distribution()
+        row["phase2_sec"] = round(time.perf_counter() - start, 4)
+    except Exception as e:
+        row["error"] = str(e)
+        return row
+
+    stats = optimizer.phase2_stats or {}
+    totals = plan["totals"]
+    row.update(
+        build_sec=round(stats.get("build_time", 0.0), 4),
+        phase2_status=stats.get("status"),
+        gap=stats.get("gap"),
+        bars=totals["bars"],
+        bundles=totals["bundles"],
+        waste_mm=round(totals["waste"], 1),
+        waste_percent=round(totals["waste_percent"], 4),
+    )
+    return row
+
+
+def append_history(rows, out_dir):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with open(out_dir / HISTORY_JSON, "a", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    csv_path = out_dir / HISTORY_CSV
+    new_file = not csv_path.exists()
+    with open(csv_path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction="ignore")
+        if new_file:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+def print_table(rows):
+    print(
+        f"{'instance':<18} {'mode':<6} {'P1 (s)':>8} {'#pat':>7} {'build':>7} {'P2 (s)':>8} "
+        f"{'status':<9} {'bars':>6} {'waste%':>7}"
+    )
+    for r in rows:
+        if r.get("error"):
+            print(f"{r['instance']:<18} {r['pattern_mode'][:6]:<6} ❌ {r['error']}")
+            continue
+        print(
+            f"{r['instance']:<18} {r['pattern_mode'][:6]:<6} {r['phase1_sec']:>8.3f} {r['patterns']:>7} "
+            f"{r['build_sec']:>7.3f} {r['phase2_sec']:>8.2f} {r['phase2_status'] or '':<9} "
+            f"{r['bars']:>6} {r['waste_percent']:>7.3f}"
+        )
+
+
+def run(
+    size_counts=(3, 5, 10, 20, 30),
+    stock_lengths=STOCK_LENGTHS,
+    seeds=(0,),
+    time_limit=30,
+    pattern_modes=(PATTERN_MODE_ENUMERATION,),
+    out_dir="benchmark_history",
+    label="",
+    warm_cache=False,
+    verbose=False,
+):
+    """
+    Chạy cả bộ bài toán với từng pattern_mode và ghi thêm vào lịch sử trong `out_dir`.
+    Mặc định mỗi bài toán dùng một cache pattern trống (đo GĐ 1 khi chưa có cache).
+    """
+    timestamp = datetime.now().isoformat(timespec="seconds")
+    commit = _git_commit()
+    log = print if verbose else None
+
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="cat_laser_bench_") as tmp:
+        shared_store = PatternCacheStore(os.path.join(tmp, "shared")) if warm_cache else None
+        for k, instance in enumerate(make_suite(size_counts, stock_lengths, seeds)):
+            for mode in pattern_modes:
+                store = shared_store or PatternCacheStore(os.path.join(tmp, f"{k}_{mode}"))
+                row = run_instance(instance, time_limit, mode, store, log=log)
+                row.update(timestamp=timestamp, label=label, commit=commit)
+                rows.append(row)
+
+    print_table(rows)
+    if out_dir:
+        append_history(rows, out_dir)
+        print(f"Đã ghi {len(rows)} dòng vào {Path(out_dir) / HISTORY_CSV}")
+    return rows
+
+
+def _int_list(value):
+    return tuple(int(x) for x in value.split(",") if x.strip())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark SteelCuttingOptimizer")
+    parser.add_argument("--sizes", type=_int_list, default=(3, 5, 10, 20, 30))
+    parser.add_argument("--stock-lengths", type=_int_list, default=STOCK_LENGTHS)
+    parser.add_argument("--seeds", type=_int_list, default=(0,))
+    parser.add_argument("--time-limit", type=float, default=30)
+    parser.add_argument(
+        "--modes",
+        default=PATTERN_MODE_ENUMERATION,
+        help=f"{PATTERN_MODE_ENUMERATION},{PATTERN_MODE_COLUMN_GENERATION}",
+    )
+    parser.add_argument("--out", default="benchmark_history")
+    parser.add_argument("--label", default="")
+    parser.add_argument("--warm-cache", action="store_true")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    run(
+        size_counts=args.sizes,
+        stock_lengths=args.stock_lengths,
+        seeds=args.seeds,
+        time_limit=args.time_limit,
+        pattern_modes=tuple(m for m in args.modes.split(",") if m),
+        out_dir=args.out,
+        label=args.label,
+        warm_cache=args.warm_cache,
+        verbose=args.verbose,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# frappe-bench/apps/cat_laser/cat_laser/benchmarks/pattern_enum.py
+"""
+So sánh tốc độ GĐ 1: bộ liệt kê NumPy vs CP-SAT (enumerate_all_solutions).
+
+Chạy trong bench:
+    bench --site <site> execute cat_laser.benchmarks.pattern_enum.run
+"""
+import random
+import time
+
+from cat_laser.utils.optimization import (
+    ENUMERATOR_CPSAT,
+    ENUMERATOR_NUMPY,
+    SteelCuttingOptimizer,
+)
+
+
+def make_sizes(n, seed):
+    rng = random.Random(seed)
+    return [rng.randrange(150, 1500, 5) + rng.choice([0, 0.5]) for _ in range(n)]
+
+
+def run(size_counts=(5, 10, 20), stock_length=6000, max_solutions=100000, seed=42):
+    rows = []
+    for n in size_counts:
+        sizes = make_sizes(n, seed + n)
+        optimizer = SteelCuttingOptimizer(
+            length=stock_length,
+            te_dau_sat=10,
+            piece_names=[f"P{i}" for i in range(n)],
+            segment_sizes=sizes,
+            demands=[50] * n,
+            blade_width=4,
+            factors=[1, 2, 3, 4, 5, 6, 8, 10],
+            max_manual_cuts=0,
+            max_stock_over=10,
+        )
+        optimizer.log = lambda message: None
+
+        row = {"sizes": n}
+        for engine in (ENUMERATOR_NUMPY, ENUMERATOR_CPSAT):
+            start = time.perf_counter()
+            patterns = optimizer._solve_single_bar_batch(
+                max_solutions=max_solutions, enumerator=engine
+            )
+            row[f"{engine}_sec"] = time.perf_counter() - start
+            row[f"{engine}_patterns"] = len(patterns)
+        # So thời gian chỉ có nghĩa khi 2 engine liệt kê cùng một tập pattern
+        assert row[f"{ENUMERATOR_NUMPY}_patterns"] == row[f"{ENUMERATOR_CPSAT}_patterns"], (
+            f"{n} kích thước: numpy {row[f'{ENUMERATOR_NUMPY}_patterns']} patterns "
+            f"!= cpsat {row[f'{ENUMERATOR_CPSAT}_patterns']} patterns"
+        )
+        row["speedup"] = row[f"{ENUMERATOR_CPSAT}_sec"] / max(row[f"{ENUMERATOR_NUMPY}_sec"], 1e-9)
+        rows.append(row)
+
+    print(f"{'sizes':>6} {'numpy (s)':>10} {'#':>8} {'cpsat (s)':>10} {'#':>8} {'speedup':>8}")
+    for r in rows:
+        print(
+            f"{r['sizes']:>6} {r['numpy_sec']:>10.3f} {r['numpy_patterns']:>8} "
+            f"{r['cpsat_sec']:>10.3f} {r['cpsat_patterns']:>8} {r['speedup']:>7.1f}x"
+        )
+    return rows
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,107 @@
+# frappe-bench/apps/cat_laser/cat_laser/benchmarks/phase2_model.py
+"""
+So sánh 2 mô hình GĐ 2 trên cùng tập pattern của GĐ 1:
+  - bundles: 1 biến số bó cho mỗi (pattern, hệ số)
+  - compact: 1 biến số cây cho mỗi pattern, số bó ít nhất tra bảng coin change
+Đo số biến, thời gian dựng mô hình, thời gian giải và kết quả.
+
+Chạy:
+    python -m cat_laser.benchmarks.phase2_model --sizes 5,10,20 --time-limit 10
+hoặc trong bench:
+    bench --site <site> execute cat_laser.benchmarks.phase2_model.run
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from cat_laser.benchmarks.instances import STOCK_LENGTHS, make_suite
+from cat_laser.benchmarks.optimizer import _int_list
+from cat_laser.optimize import optimizer_from_instance
+from cat_laser.utils.constants import PHASE2_MODEL_BUNDLES, PHASE2_MODEL_COMPACT
+from cat_laser.utils.pattern_cache import PatternCacheStore
+from cat_laser.utils.progress import CallbackProgress
+
+MODELS = (PHASE2_MODEL_BUNDLES, PHASE2_MODEL_COMPACT)
+
+
+def run_instance(instance, time_limit=10, cache_store=None, log=None):
+    """GĐ 1 một lần, rồi GĐ 2 với từng mô hình; trả về 1 dòng kết quả cho mỗi mô hình."""
+    optimizer = optimizer_from_instance(
+        instance,
+        progress=CallbackProgress(log=log),
+        time_limit_seconds=time_limit,
+        cache_store=cache_store,
+    )
+    try:
+        optimizer.optimize_cutting()
+    except Exception as e:
+        return [{"instance": instance["name"], "model": model, "error": str(e)} for model in MODELS]
+
+    rows = []
+    for model in MODELS:
+        row = {"instance": instance["name"], "model": model, "patterns": len(optimizer.patterns)}
+        optimizer.phase2_model = model
+        try:
+            start = time.perf_counter()
+            plan = optimizer.optimize_distribution()
+            row["phase2_sec"] = round(time.perf_counter() - start, 4)
+        except Exception as e:
+            row["error"] = str(e)
+            rows.append(row)
+            continue
+        stats = optimizer.phase2_stats
+        row.update(
+            num_vars=stats["num_vars"],
+            build_sec=round(stats["build_time"], 4),
+            solve_sec=round(stats["wall_time"], 4),
+            status=stats["status"],
+            gap=stats.get("gap"),
+            bars=plan["totals"]["bars"],
+            bundles=plan["totals"]["bundles"],
+            waste_mm=round(plan["totals"]["waste"], 1),
+        )
+        rows.append(row)
+    return rows
+
+
+def print_table(rows):
+    print(
+        f"{'instance':<18} {'model':<8} {'#pat':>6} {'#vars':>8} {'build':>7} {'solve':>7} "
+        f"{'status':<9} {'gap%':>7} {'bars':>6} {'bó':>5} {'waste':>9}"
+    )
+    for r in rows:
+        if r.get("error"):
+            print(f"{r['instance']:<18} {r['model']:<8} ❌ {r['error']}")
+            continue
+        gap = f"{r['gap'] * 100:.2f}" if r["gap"] is not None else "-"
+        print(
+            f"{r['instance']:<18} {r['model']:<8} {r['patterns']:>6} {r['num_vars']:>8} "
+            f"{r['build_sec']:>7.3f} {r['solve_sec']:>7.2f} {r['status']:<9} {gap:>7} "
+            f"{r['bars']:>6} {r['bundles']:>5} {r['waste_mm']:>9.1f}"
+        )
+
+
+def run(size_counts=(5, 10, 20), stock_lengths=STOCK_LENGTHS, seeds=(0,), time_limit=10, verbose=False):
+    log = print if verbose else None
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="cat_laser_bench_") as tmp:
+        for k, instance in enumerate(make_suite(size_counts, stock_lengths, seeds)):
+            rows.extend(run_instance(instance, time_limit, PatternCacheStore(os.path.join(tmp, str(k))), log=log))
+    print_table(rows)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="So sánh mô hình GĐ 2: bundles vs compact")
+    parser.add_argument("--sizes", type=_int_list, default=(5, 10, 20))
+    parser.add_argument("--stock-lengths", type=_int_list, default=STOCK_LENGTHS)
+    parser.add_argument("--seeds", type=_int_list, default=(0,))
+    parser.add_argument("--time-limit", type=float, default=10)
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+    run(args.sizes, args.stock_lengths, args.seeds, args.time_limit, args.verbose)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,116 @@
 // frappe-bench/apps/cat_laser/cat_laser/cat_laser/doctype/cutting_request/cutting_request.js
+// Dựng bảng kết quả từ dữ liệu đã lưu (result_data), không cần chạy lại bộ tối ưu.
+// `provisional`: phương án tạm thời (heuristic) server gửi trong lúc CP-SAT đang chạy
+function render_cutting_result(frm, provisional) {
+    const wrapper = frm.fields_dict.result_html && frm.fields_dict.result_html.$wrapper;
+    if (!wrapper) return;
+
+    const plan = provisional || (frm.doc.result_data
+        ? (typeof frm.doc.result_data === 'string' ? JSON.parse(frm.doc.result_data) : frm.doc.result_data)
+        : null);
+    if (!plan || !plan.patterns) {
+        wrapper.html('');
+        return;
+    }
+
+    const fmt = (v, d = 0) => format_number(v, null, d);
+    // Nhiều loại cây: thêm cột chiều dài cây của từng pattern và số cây theo loại
+    const stocks = plan.stocks || (plan.batch && plan.batch.stocks) || [];
+    const multi_stock = stocks.length > 1;
+    const rows = plan.patterns.map((p, k) => `
+        <tr>
+            <td>${k + 1}</td>
+            ${multi_stock ? `<td class="text-right">${p.stock_length}</td>` : ''}
+            <td>${p.cuts.map((c) => `${c.qty} x ${frappe.utils.escape_html(c.item_name || '')} (${c.length})`).join('<br>')}</td>
+            <td class="text-right">${p.bars}</td>
+            <td>${p.bundles.map((b) => `${b.count} bó x ${b.factor}`).join(' + ')}</td>
+            ${plan.batch ? `<td>${(p.allocated || []).map((a) => `${a.pieces} x ${frappe.utils.escape_html(a.item_name || '')}`).join('<br>')}</td>` : ''}
+            <td class="text-right">${fmt(p.waste_per_bar, 1)}</td>
+            <td class="text-right">${fmt(p.total_waste, 1)}</td>
+        </tr>`).join('');
+    const size_rows = plan.sizes.map((s) => `
+        <tr>
+            <td>${frappe.utils.escape_html(s.item_name || '')}</td>
+            <td class="text-right">${s.length}</td>
+            <td class="text-right">${s.demand}</td>
+            <td class="text-right">${s.produced}</td>
+            <td class="text-right">${s.surplus}</td>
+        </tr>`).join('');
+
+    const t = plan.totals;
+    const solver = plan.solver || {};
+    // Kết quả giải gộp: pattern là cây cắt chung, cột "Của đơn này" là số đoạn được phân cho đơn
+    const others = plan.batch ? plan.batch.orders.filter((name) => name !== frm.doc.name) : [];
+    wrapper.html(`
+        <div class="alert ${provisional ? 'alert-warning' : 'alert-success'}">
+            ${provisional ? '<b>⏳ Phương án tạm thời (heuristic), đang tiếp tục tối ưu...</b><br>' : ''}
+            <b>${provisional ? '' : '✅ '}${t.bars} cây, ${t.bundles} bó, hao hụt ${fmt(t.waste, 1)}mm (${fmt(t.waste_percent, 2)}%)</b>
+            ${solver.finished_at ? `<br><small>Thời gian: ${solver.finished_at} · ${solver.status || ''}${solver.num_search_workers ? ` · ${solver.num_search_workers} search worker` : ''}${solver.waste_window ? ` · khoảng hao hụt GĐ 1: ${fmt(solver.waste_window * 100, 0)}%` : ''}${solver.from_cache ? ' · kết quả đã lưu' : ''}</small>` : ''}
+            ${others.length ? `<br><small>Gộp chung với: ${others.map((n) => frappe.utils.escape_html(n)).join(', ')} · cả lô ${plan.batch.totals.bars} cây, hao hụt ${fmt(plan.batch.totals.waste_percent, 2)}%</small>` : ''}
+            ${multi_stock ? `<br><small>Loại cây: ${stocks.map((s) => `${s.bars} cây ${s.length}mm`).join(' · ')}${plan.batch ? ' (cả lô)' : ''}</small>` : ''}
+        </div>
+        <table class="table table-bordered table-sm">
+            <thead><tr><th>#</th>${multi_stock ? '<th>Cây (mm)</th>' : ''}<th>Pattern</th><th>Số cây</th><th>Chia bó</th>${plan.batch ? '<th>Của đơn này</th>' : ''}<th>Hao hụt / cây</th><th>Tổng hao hụt</th></tr></thead>
+            <tbody>${rows}</tbody>
+        </table>
+        <table class="table table-bordered table-sm">
+            <thead><tr><th>Kích thước</th><th>mm</th><th>Cần</th><th>Đã cắt</th><th>Dư</th></tr></thead>
+            <tbody>${size_rows}</tbody>
+        </table>
+    `);
+}
+
 frappe.ui.form.on('Cutting Request', {
     refresh: function (frm) {
-        // 1. Lắng nghe log realtime (Hiển thị Alert xanh + Console log)
+        render_cutting_result(frm);
+
+        if (frm.doc.status === 'Processing') {
+            frm.add_custom_button("⏹ Hủy tối ưu", () => {
+                frappe.confirm("Dừng lượt tối ưu đang chạy?", () => {
+                    frappe.call({
+                        method: 'cat_laser.cat_laser.doctype.cutting_request.cutting_request.cancel_optimization',
+                        args: { doc_name: frm.doc.name },
+                        callback: function (r) {
+                            frappe.show_alert({ message: "Đã gửi yêu cầu hủy", indicator: 'orange' });
+                        }
+                    });
+                });
+            });
+        }
+
+        // Chỉ đăng ký listener 1 lần cho mỗi form
+        if (frm._cutting_listener_added) return;
+        frm._cutting_listener_added = true;
+
+        // 1. Lắng nghe log realtime: server gửi theo lô (messages) tới room của document
         frappe.realtime.on('cutting_log', function (data) {
-            frappe.show_alert({ message: data.message, indicator: 'blue' });
-            console.log("🔥 LOG TỪ SERVER:", data.message);
+            if (data.doc_name && data.doc_name !== frm.doc.name) return;
+
+            (data.messages || []).forEach((msg) => console.log("🔥 LOG TỪ SERVER:", msg));
+            if (data.dropped) {
+                console.log(`🔥 (bỏ qua ${data.dropped} dòng log)`);
+            }
+            if (data.status) {
+                frm.dashboard.set_headline_alert(data.status, 'blue');
+            }
+            if (data.messages && data.messages.length) {
+                frappe.show_alert({ message: data.messages[data.messages.length - 1], indicator: 'blue' });
+            } else if (!data.status && data.message) {
+                frappe.show_alert({ message: data.message, indicator: 'blue' });
+            }
+        });
+
+        // 2. Phương án tạm thời: hiển thị ngay, được thay bằng kết quả cuối khi tải lại form
+        frappe.realtime.on('cutting_provisional', function (data) {
+            if (data.doc_name !== frm.doc.name || frm.doc.status !== 'Processing') return;
+            render_cutting_result(frm, data.plan);
         });
 
-        // 2. Lắng nghe sự kiện hoàn thành
+        // 3. Lắng nghe sự kiện hoàn thành
         frappe.realtime.on('cutting_finish', function (data) {
             if (data.doc_name === frm.doc.name) {
-                frappe.msgprint("✅ Đã tính toán xong!");
+                frm.dashboard.clear_headline();
+                frappe.msgprint(data.cancelled ? "⏹ Đã hủy tối ưu." : "✅ Đã tính toán xong!");
                 frm.reload_doc();
             }
         });
@@ -27,7 +127,11 @@ frappe.ui.form.on('Cutting Request', {
                 freeze: true, // Khóa màn hình
                 freeze_message: "🚀 Đang gửi lệnh chạy ngầm...",
                 callback: function (r) {
-                    frappe.msgprint("Đã gửi lệnh! Hãy để ý thông báo góc phải màn hình.");
+                    if (r.message === "Job already running") {
+                        frappe.msgprint("Document này đang được tối ưu, vui lòng chờ hoặc hủy lượt đang chạy.");
+                    } else {
+                        frappe.msgprint("Đã gửi lệnh! Hãy để ý thông báo góc phải màn hình.");
+                    }
                     frm.reload_doc(); // Tải lại để thấy trạng thái Processing
                 }
             });
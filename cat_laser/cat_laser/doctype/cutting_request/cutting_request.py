@@ -1,121 +1,459 @@
 # frappe-bench/apps/cat_laser/cat_laser/cat_laser/doctype/cutting_request/cutting_request.py
+import json
+import os
+
 import frappe
 from frappe.model.document import Document
 from frappe.utils.background_jobs import enqueue
-import json
 
-# Import Class tối ưu hóa
-from cat_laser.utils.optimization import SteelCuttingOptimizer
+# Chỉ import các module nhẹ ở đây: OR-Tools / NumPy được import trong background job
+from cat_laser.utils.constants import (
+    PATTERN_MODE_COLUMN_GENERATION,
+    PATTERN_MODE_ENUMERATION,
+    PHASE2_MODEL_BUNDLES,
+)
+from cat_laser.utils.cutting_plan import format_allocated, format_bundles, format_cuts
+from cat_laser.utils.exceptions import OptimizationCancelled
+from cat_laser.utils.job_control import (
+    JOB_TIMEOUT,
+    batch_job_id,
+    clear_cancel,
+    get_optimization_job,
+    is_cancel_requested,
+    is_optimization_enqueued,
+    optimize_job_id,
+    optimize_queue,
+    register_batch,
+    request_cancel,
+    solve_slot,
+    unregister_batch,
+)
+from cat_laser.utils.progress import MultiProgress, ProgressReporter
+from cat_laser.utils.result_cache import (
+    RESULT_CACHE_IMPROVE,
+    RESULT_CACHE_OFF,
+    RESULT_CACHE_REUSE,
+)
+from cat_laser.utils.scheduler import host_solve_slot, search_workers_from_conf
+from cat_laser.utils.stocks import stocks_key
+
+# Giá trị của trường result_cache_mode -> chế độ cache kết quả của bộ tối ưu
+RESULT_CACHE_MODES = {
+    "Reuse": RESULT_CACHE_REUSE,
+    "Improve": RESULT_CACHE_IMPROVE,
+    "Off": RESULT_CACHE_OFF,
+}
 
 class CuttingRequest(Document):
     pass
 
+
+def apply_cutting_plan(doc, plan):
+    """Ghi kết quả GĐ 2 vào document: trường tổng hợp, bảng con và JSON đầy đủ."""
+    totals = plan["totals"]
+    solver = plan.get("solver") or {}
+
+    doc.total_bars = totals["bars"]
+    doc.total_bundles = totals["bundles"]
+    doc.total_waste = totals["waste"]
+    doc.waste_percent = totals["waste_percent"]
+    doc.solver_status = solver.get("status")
+    doc.solver_gap = (solver["gap"] * 100) if solver.get("gap") is not None else None
+
+    doc.set("result_patterns", [])
+    for p in plan["patterns"]:
+        doc.append("result_patterns", {
+            "stock_length": p.get("stock_length"),
+            "cuts": format_cuts(p["cuts"]),
+            "bars": p["bars"],
+            "bundles": format_bundles(p["bundles"]),
+            "bundle_count": p["bundle_count"],
+            "used_length": p["used_length"],
+            "waste_per_bar": p["waste_per_bar"],
+            "total_waste": p["total_waste"],
+            "allocated": format_allocated(p.get("allocated")),
+        })
+
+    doc.set("result_sizes", [])
+    for s in plan["sizes"]:
+        doc.append("result_sizes", s)
+
+    doc.result_data = json.dumps(plan, ensure_ascii=False)
+
+
 @frappe.whitelist()
 def run_optimization_job(doc_name):
     """Hàm nhận request từ JS"""
-    
+
+    # 0. Mỗi document chỉ có 1 job đang chờ/chạy
+    if is_optimization_enqueued(doc_name):
+        return "Job already running"
+
     # 1. Cập nhật trạng thái Processing
     doc = frappe.get_doc("Cutting Request", doc_name)
     if doc.status != 'Processing':
         doc.status = 'Processing'
         doc.save(ignore_permissions=True)
-        frappe.db.commit() 
-    
-    # 2. Đẩy vào Background Job
-    # Lưu ý: user_to_notify=None để báo hiệu cho hàm bên dưới là Broadcast
+        frappe.db.commit()
+    clear_cancel(doc_name)
+
+    # 2. Đẩy vào hàng đợi riêng của bộ tối ưu, job_id theo doc_name để chống chạy trùng
     enqueue(
         method=execute_optimization,
-        queue='default', 
-        timeout=3000, 
+        queue=optimize_queue(),
+        timeout=JOB_TIMEOUT,
+        job_id=optimize_job_id(doc_name),
+        deduplicate=True,
         doc_name=doc_name
     )
     return "Job started"
 
+
+@frappe.whitelist()
+def cancel_optimization(doc_name):
+    """Hủy job đang chờ hoặc báo cho solver đang chạy dừng lại."""
+    request_cancel(doc_name)
+
+    job = get_optimization_job(doc_name)
+    status = job.get_status() if job else None
+    if status == "started":
+        # Job đang chạy tự kiểm tra cờ hủy mỗi giây, dừng solver và trả trạng thái về Draft
+        return "Cancel requested"
+
+    doc_names = [doc_name]
+    if status in ("queued", "deferred", "scheduled"):
+        # Job gộp nhiều đơn: hủy job thì trả tất cả các đơn trong lô về Draft
+        doc_names = (job.kwargs.get("kwargs") or {}).get("doc_names") or doc_names
+        job.cancel()
+        unregister_batch(doc_names)
+
+    for name in doc_names:
+        clear_cancel(name)
+        if frappe.db.get_value("Cutting Request", name, "status") == "Processing":
+            frappe.db.set_value("Cutting Request", name, "status", "Draft")
+        frappe.publish_realtime(
+            'cutting_finish',
+            {'doc_name': name, 'cancelled': True},
+            doctype="Cutting Request",
+            docname=name,
+        )
+    frappe.db.commit()
+    return "Cancelled"
+
+
+def stock_options(doc):
+    """Các loại cây của bảng Nhiều loại cây, None nếu chỉ dùng stock_length."""
+    rows = [row for row in doc.get("stock_options") or [] if row.length and row.length > 0]
+    if not rows:
+        return None
+    return [{"length": row.length, "cost": row.cost, "available": row.available} for row in rows]
+
+
+def previous_plan_of(doc):
+    """Kết quả hiện tại làm điểm xuất phát khi bật Tối ưu lại (không dùng phần của lô gộp)."""
+    if not doc.incremental or not doc.result_data:
+        return None
+    plan = json.loads(doc.result_data)
+    if plan.get("batch"):
+        return None
+    return plan
+
+
+def optimizer_options(doc):
+    """Tham số của bộ tối ưu đọc từ Cutting Request (trừ dữ liệu item)."""
+    return dict(
+        length=doc.stock_length,
+        stocks=stock_options(doc),
+        te_dau_sat=10,
+        blade_width=4,
+        factors=[1, 2, 3, 4, 5, 6, 8, 10],
+        max_manual_cuts=0,
+        max_stock_over=doc.max_surplus,
+        time_limit_seconds=doc.time_limit,
+        gap_limit=(doc.gap_limit or 0) / 100.0,
+        stall_seconds=doc.stall_seconds or 0,
+        pattern_mode=(
+            PATTERN_MODE_COLUMN_GENERATION
+            if doc.optimization_mode == "Column Generation"
+            else PATTERN_MODE_ENUMERATION
+        ),
+        top_k_per_support=doc.top_k_per_support or None,
+        adaptive_window=bool(doc.adaptive_window),
+        result_cache_mode=RESULT_CACHE_MODES.get(doc.result_cache_mode, RESULT_CACHE_REUSE),
+    )
+
+
+def solve_with_limits(slot_name, options, progress, should_stop):
+    """
+    Chờ lượt giải của site, chia CPU theo số lượt đang chạy trên máy rồi chạy bộ tối ưu.
+    `options` là tham số của SteelCuttingOptimizer (gồm cả item).
+    """
+    from cat_laser.utils.optimization import SteelCuttingOptimizer
+
+    log = progress.log
+    with solve_slot(slot_name, log=log, should_stop=should_stop), host_solve_slot(
+        frappe.cache, f"{frappe.local.site}:{slot_name}:{os.getpid()}"
+    ) as active_solves:
+        # Chia CPU của máy cho các lượt giải đang chạy
+        search_workers = search_workers_from_conf(active_solves, frappe.conf)
+        phase1_workers = frappe.conf.get("cat_laser_phase1_workers") or search_workers
+        log(f"🧮 {active_solves} lượt giải trên máy, dùng {search_workers} search worker.")
+
+        optimizer = SteelCuttingOptimizer(
+            **options,
+            progress=progress,
+            phase1_workers=phase1_workers,
+            phase1_max_kept=frappe.conf.get("cat_laser_phase1_max_kept"),
+            phase2_model=frappe.conf.get("cat_laser_phase2_model") or PHASE2_MODEL_BUNDLES,
+            num_search_workers=search_workers,
+            should_stop=should_stop,
+        )
+        # GĐ 1 + GĐ 2 (hoặc dùng lại kết quả đã lưu cho cùng đầu vào)
+        return optimizer.solve()
+
+
+def publish_provisional_plan(doc_name):
+    """Hàm gửi phương án tạm thời (heuristic) tới form đang mở; chưa ghi vào document."""
+    def publish(plan):
+        frappe.publish_realtime(
+            'cutting_provisional',
+            {'doc_name': doc_name, 'plan': plan},
+            doctype="Cutting Request",
+            docname=doc_name,
+        )
+    return publish
+
+
+def _finish(doc_names, progress, cancelled=False):
+    # Gửi nốt log còn trong bộ đệm rồi báo hiệu kết thúc
+    progress.close()
+    for name in doc_names:
+        payload = {'doc_name': name}
+        if cancelled:
+            payload['cancelled'] = True
+        frappe.publish_realtime('cutting_finish', payload, doctype="Cutting Request", docname=name)
+
+
+def _revert_to_draft(doc_names):
+    for name in doc_names:
+        doc = frappe.get_doc("Cutting Request", name)
+        doc.status = "Draft"
+        doc.save(ignore_permissions=True)
+    frappe.db.commit()
+
+
 def execute_optimization(doc_name):
     """Hàm chạy thực tế trong background worker"""
-    
-    # === SỬA QUAN TRỌNG: user=None để Gửi cho TẤT CẢ (Broadcast) ===
-    def log(msg):
-        frappe.publish_realtime('cutting_log', {'message': msg}, user=None)
+
+    # Log được gom theo lô và chỉ gửi tới room của document đang giải
+    progress = ProgressReporter(
+        doctype="Cutting Request",
+        docname=doc_name,
+        interval=frappe.conf.get("cat_laser_progress_interval") or 1.0,
+    )
+    log = progress.log
+
+    def should_stop():
+        return is_cancel_requested(doc_name)
 
     log('⏳ Worker bắt đầu nhận việc...')
-    
+
     try:
         doc = frappe.get_doc("Cutting Request", doc_name)
 
         # 1. Chuẩn bị dữ liệu
-        piece_names = []
-        segment_sizes = []
-        demands = []
-        
         valid_items = [row for row in doc.items if row.length > 0 and row.qty > 0]
-        
+
         if not valid_items:
             log('❌ Không có dữ liệu kích thước hợp lệ.')
             doc.status = "Draft"
             doc.save(ignore_permissions=True)
             return
 
-        for row in valid_items:
-            piece_names.append(row.item_name)
-            segment_sizes.append(float(row.length))
-            demands.append(int(row.qty))
-
-        # 2. Khởi tạo bộ tối ưu hóa
-        # Truyền user_to_notify=None vào đây luôn
-        optimizer = SteelCuttingOptimizer(
-            length=doc.stock_length,
-            te_dau_sat=10,
-            piece_names=piece_names,
-            segment_sizes=segment_sizes,
-            demands=demands,
-            blade_width=4,
-            factors=[1, 2, 3, 4, 5, 6, 8, 10],
-            max_manual_cuts=0,
-            max_stock_over=doc.max_surplus,
-            time_limit_seconds=doc.time_limit,
-            user_to_notify=None # <--- QUAN TRỌNG: None để Broadcast
+        options = dict(
+            optimizer_options(doc),
+            piece_names=[row.item_name for row in valid_items],
+            segment_sizes=[float(row.length) for row in valid_items],
+            demands=[int(row.qty) for row in valid_items],
+            on_provisional_plan=publish_provisional_plan(doc_name),
         )
+        previous_plan = previous_plan_of(doc)
+        if previous_plan is not None:
+            log("🔁 Tối ưu lại từ kết quả trước.")
+            options.update(
+                previous_plan=previous_plan,
+                max_changed_patterns=doc.max_changed_patterns or None,
+            )
+        if doc.use_priority:
+            # Độ ưu tiên (phạt đoạn dư) và quy tắc đoạn cuối được xử lý ngay trong 1 lượt giải
+            options.update(
+                priorities=[int(row.priority or 0) for row in valid_items],
+                last_segment=[bool(row.is_last_segment) for row in valid_items],
+            )
 
-        # 3. Chạy Phase 1
-        log('🚀 Phase 1: Đang tìm patterns...')
-        optimizer.optimize_cutting()
+        # 2. Giải (chờ lượt nếu site đã đủ số lượt giải đồng thời)
+        plan = solve_with_limits(doc_name, options, progress, should_stop)
 
-        # 4. Chạy Phase 2
-        log('⚙️ Phase 2: Đang tối ưu phân phối...')
-        optimizer.optimize_distribution() 
-
-        # 5. Cập nhật trạng thái thành công
-        doc.reload() 
+        # 3. Lưu kết quả có cấu trúc, HTML được dựng lại từ dữ liệu này khi mở form
+        doc.reload()
         doc.status = "Completed"
-        
-        # Lưu kết quả HTML vào field (lấy từ biến tạm hoặc logic tạo HTML nếu cần)
-        # Ở đây ta giả định optimization.py đã in log HTML, 
-        # nhưng nếu muốn lưu vào DocType, bạn nên sửa optimization.py để trả về HTML string.
-        # Tạm thời gán thông báo thành công:
-        doc.result_html = f"""
-            <div class="alert alert-success">
-                <h4>✅ Tính toán hoàn tất!</h4>
-                <p>Kết quả chi tiết đã được hiển thị qua Log Realtime (Vui lòng xem lại Console/Log).</p>
-            </div>
-        """
+        apply_cutting_plan(doc, plan)
         doc.save(ignore_permissions=True)
-        
-        # Báo hiệu kết thúc (Broadcast)
-        frappe.publish_realtime('cutting_finish', {'doc_name': doc.name}, user=None)
+        frappe.db.commit()
+        _finish([doc_name], progress)
+
+    except OptimizationCancelled:
+        frappe.db.rollback()
+        log('⏹ Đã hủy tối ưu theo yêu cầu.')
+        _revert_to_draft([doc_name])
+        _finish([doc_name], progress, cancelled=True)
 
     except Exception as e:
         frappe.db.rollback()
-        error_msg = f"Lỗi tính toán: {str(e)}"
+        error_msg = f"Lỗi tính toán: {e!s}"
         frappe.log_error(error_msg, "Cutting Optimization Error")
-        
+
         # Gửi log lỗi
         log(f'❌ {error_msg}')
-        
+
         # Revert trạng thái
-        doc = frappe.get_doc("Cutting Request", doc_name)
-        doc.status = "Draft"
-        doc.save(ignore_permissions=True)
+        _revert_to_draft([doc_name])
+
+    finally:
+        clear_cancel(doc_name)
+        progress.close()
+
+
+# ===================================================================
+# Gộp nhiều Cutting Request cùng chiều dài cây, giải 1 lần
+# ===================================================================
+@frappe.whitelist()
+def run_batch_optimization(doc_names=None, filters=None):
+    """
+    Gộp các Cutting Request (danh sách tên hoặc bộ lọc, mặc định mọi đơn Draft) theo loại cây,
+    mỗi nhóm được giải 1 lần trong một job. Bỏ qua đơn đang Processing.
+    Trả về danh sách nhóm [{stock_length, doc_names, job_id}].
+    """
+    if doc_names:
+        doc_names = frappe.parse_json(doc_names)
+    else:
+        doc_names = frappe.get_all(
+            "Cutting Request", filters=frappe.parse_json(filters) or {"status": "Draft"}, pluck="name"
+        )
+
+    groups = {}
+    for name in doc_names:
+        doc = frappe.get_doc("Cutting Request", name)
+        if doc.status == "Processing" or is_optimization_enqueued(name):
+            continue
+        # Chỉ gộp các đơn dùng cùng (các) loại cây
+        stocks = stock_options(doc)
+        key = stocks_key(stocks) if stocks else doc.stock_length
+        groups.setdefault(key, {"stock_length": doc.stock_length, "doc_names": []})["doc_names"].append(name)
+
+    started = []
+    for group in groups.values():
+        names = group["doc_names"]
+        job_id = batch_job_id(names)
+        for name in names:
+            frappe.db.set_value("Cutting Request", name, "status", "Processing")
+            clear_cancel(name)
+        register_batch(job_id, names)
+        frappe.db.commit()
+
+        enqueue(
+            method=execute_batch_optimization,
+            queue=optimize_queue(),
+            timeout=JOB_TIMEOUT,
+            job_id=job_id,
+            deduplicate=True,
+            doc_names=names,
+        )
+        started.append(dict(group, job_id=job_id))
+    return started
+
+
+def execute_batch_optimization(doc_names):
+    """
+    Background job: gộp item của các đơn thành 1 vector nhu cầu (cùng kích thước thì cộng dồn),
+    giải 1 lần với tham số của đơn đầu tiên (dư tối đa = nhỏ nhất, thời gian = lớn nhất),
+    rồi chia kết quả lại cho từng đơn.
+    """
+    from cat_laser.utils.batch import merge_orders, split_plan
+
+    # Log của lô được gửi tới room của từng document trong lô
+    interval = frappe.conf.get("cat_laser_progress_interval") or 1.0
+    progress = MultiProgress(
+        ProgressReporter(doctype="Cutting Request", docname=name, interval=interval)
+        for name in doc_names
+    )
+    log = progress.log
+
+    def should_stop():
+        return any(is_cancel_requested(name) for name in doc_names)
+
+    log(f'⏳ Worker bắt đầu giải gộp {len(doc_names)} đơn...')
+
+    try:
+        docs = [frappe.get_doc("Cutting Request", name) for name in doc_names]
+        orders = [
+            {
+                "name": doc.name,
+                "items": [
+                    {
+                        "item_name": row.item_name,
+                        "length": row.length,
+                        "qty": row.qty,
+                        "priority": row.priority if doc.use_priority else 0,
+                        "is_last_segment": row.is_last_segment if doc.use_priority else 0,
+                    }
+                    for row in doc.items
+                ],
+            }
+            for doc in docs
+        ]
+        piece_names, segment_sizes, demands, owners, priorities, last_segment = merge_orders(orders)
+        if not segment_sizes:
+            log('❌ Không có dữ liệu kích thước hợp lệ.')
+            _revert_to_draft(doc_names)
+            return
+        log(f"📦 Gộp {len(docs)} đơn: {len(segment_sizes)} kích thước, {sum(demands)} đoạn.")
+
+        options = dict(
+            optimizer_options(docs[0]),
+            max_stock_over=min(doc.max_surplus or 0 for doc in docs),
+            time_limit_seconds=max(doc.time_limit or 0 for doc in docs),
+            piece_names=piece_names,
+            segment_sizes=segment_sizes,
+            demands=demands,
+            priorities=priorities,
+            last_segment=last_segment,
+        )
+        plan = solve_with_limits(batch_job_id(doc_names), options, progress, should_stop)
+
+        for name, order_plan in split_plan(plan, owners, doc_names).items():
+            doc = frappe.get_doc("Cutting Request", name)
+            doc.status = "Completed"
+            apply_cutting_plan(doc, order_plan)
+            doc.save(ignore_permissions=True)
         frappe.db.commit()
+        _finish(doc_names, progress)
 
+    except OptimizationCancelled:
+        frappe.db.rollback()
+        log('⏹ Đã hủy tối ưu theo yêu cầu.')
+        _revert_to_draft(doc_names)
+        _finish(doc_names, progress, cancelled=True)
+
+    except Exception as e:
+        frappe.db.rollback()
+        error_msg = f"Lỗi tính toán: {e!s}"
+        frappe.log_error(error_msg, "Cutting Optimization Error")
+        log(f'❌ {error_msg}')
+        _revert_to_draft(doc_names)
 
+    finally:
+        unregister_batch(doc_names)
+        for name in doc_names:
+            clear_cancel(name)
+        progress.close()
@@ -0,0 +1,27 @@
+// frappe-bench/apps/cat_laser/cat_laser/cat_laser/doctype/cutting_request/cutting_request_list.js
+frappe.listview_settings['Cutting Request'] = {
+    onload: function (listview) {
+        // Gộp các đơn được chọn (cùng chiều dài cây) và giải 1 lần
+        listview.page.add_action_item("⚡ Tối ưu gộp", () => {
+            const names = listview.get_checked_items(true);
+            if (!names.length) return;
+
+            frappe.call({
+                method: 'cat_laser.cat_laser.doctype.cutting_request.cutting_request.run_batch_optimization',
+                args: { doc_names: names },
+                callback: function (r) {
+                    const groups = r.message || [];
+                    if (!groups.length) {
+                        frappe.msgprint("Không có đơn nào cần tối ưu (các đơn đã chọn đang được xử lý).");
+                        return;
+                    }
+                    frappe.show_alert({
+                        message: groups.map((g) => `Cây ${g.stock_length}: ${g.doc_names.length} đơn`).join('<br>'),
+                        indicator: 'blue'
+                    });
+                    listview.refresh();
+                }
+            });
+        });
+    }
+};
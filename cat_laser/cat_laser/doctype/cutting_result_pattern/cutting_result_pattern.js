@@ -0,0 +1,8 @@
+// Copyright (c) 2025, vuongcris4 and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Cutting Result Pattern", {
+// 	refresh(frm) {
+
+// 	},
+// });
@@ -0,0 +1,9 @@
+# Copyright (c) 2025, vuongcris4 and contributors
+# For license information, please see license.txt
+
+# import frappe
+from frappe.model.document import Document
+
+
+class CuttingStockLength(Document):
+	pass
@@ -0,0 +1,140 @@
+# frappe-bench/apps/cat_laser/cat_laser/optimize.py
+"""
+Chạy bộ tối ưu cắt sắt không cần bench / site Frappe.
+
+    python -m cat_laser.optimize instance.json [--time-limit 30] [--mode column_generation] [-o plan.json]
+
+instance.json (cùng định dạng với cat_laser.benchmarks.instances):
+    {
+        "stock_length": 6000, "max_stock_over": 10,
+        "te_dau_sat": 10, "blade_width": 4, "factors": [1, 2, 3, 4, 5, 6, 8, 10], "max_manual_cuts": 0,
+        "items": [{"item_name": "P01", "length": 1250, "qty": 40, "priority": 0, "is_last_segment": 0}, ...]
+    }
+Chỉ `stock_length` và `items` là bắt buộc. Nhiều loại cây: thêm
+    "stocks": [{"length": 6000, "cost": 1.0, "available": 200}, {"length": 12000}, ...]
+(`stock_length` khi đó có thể bỏ qua). Kết quả (plan) được in ra stdout dạng JSON hoặc ghi vào file -o.
+"""
+import argparse
+import json
+import sys
+
+from cat_laser.utils.constants import (
+    PATTERN_MODE_COLUMN_GENERATION,
+    PATTERN_MODE_ENUMERATION,
+    PHASE2_MODEL_BUNDLES,
+    PHASE2_MODEL_COMPACT,
+)
+from cat_laser.utils.progress import CallbackProgress
+from cat_laser.utils.scheduler import choose_search_workers
+
+DEFAULTS = {
+    "te_dau_sat": 10,
+    "blade_width": 4,
+    "factors": [1, 2, 3, 4, 5, 6, 8, 10],
+    "max_manual_cuts": 0,
+    "max_stock_over": 10,
+}
+
+
+def optimizer_from_instance(instance, progress=None, **options):
+    """Dựng SteelCuttingOptimizer từ dict bài toán; `options` được truyền thẳng vào constructor."""
+    from cat_laser.utils.optimization import SteelCuttingOptimizer
+
+    data = dict(DEFAULTS, **instance)
+    items = [it for it in data["items"] if float(it["length"]) > 0 and int(it["qty"]) > 0]
+    if not items:
+        raise ValueError("Không có dữ liệu kích thước hợp lệ.")
+    stocks = data.get("stocks")
+    return SteelCuttingOptimizer(
+        length=data.get("stock_length") or max(float(s["length"]) for s in stocks),
+        stocks=stocks,
+        te_dau_sat=data["te_dau_sat"],
+        piece_names=[it.get("item_name") or str(it["length"]) for it in items],
+        segment_sizes=[float(it["length"]) for it in items],
+        demands=[int(it["qty"]) for it in items],
+        priorities=[int(it.get("priority") or 0) for it in items],
+        last_segment=[bool(it.get("is_last_segment")) for it in items],
+        blade_width=data["blade_width"],
+        factors=data["factors"],
+        max_manual_cuts=data["max_manual_cuts"],
+        max_stock_over=data["max_stock_over"],
+        progress=progress,
+        **options,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m cat_laser.optimize", description=__doc__.split("\n")[1])
+    parser.add_argument("instance", help="file JSON mô tả bài toán ('-' để đọc từ stdin)")
+    parser.add_argument("--time-limit", type=float, default=30, help="thời gian tối đa cho GĐ 2 (giây)")
+    parser.add_argument(
+        "--mode",
+        choices=(PATTERN_MODE_ENUMERATION, PATTERN_MODE_COLUMN_GENERATION),
+        default=PATTERN_MODE_ENUMERATION,
+    )
+    parser.add_argument(
+        "--phase2-model",
+        choices=(PHASE2_MODEL_BUNDLES, PHASE2_MODEL_COMPACT),
+        default=PHASE2_MODEL_BUNDLES,
+        help="mô hình GĐ 2: 1 biến / (pattern, hệ số bó) hoặc 1 số cây / pattern",
+    )
+    parser.add_argument(
+        "--no-normalize",
+        action="store_true",
+        help="tắt tiền xử lý số: thang x10 cố định, GĐ 2 dùng mục tiêu tổng có trọng số",
+    )
+    parser.add_argument("--gap", type=float, default=0.5, help="ngưỡng gap để dừng sớm (%%), 0 = tắt")
+    parser.add_argument("--stall", type=int, default=10, help="dừng khi không cải thiện trong N giây, 0 = tắt")
+    parser.add_argument("--workers", type=int, default=None, help="số search worker của CP-SAT")
+    parser.add_argument("--previous", help="plan JSON của lần giải trước: tối ưu lại, giữ ổn định phương án cũ")
+    parser.add_argument("--max-changed", type=int, default=None, help="số pattern tối đa được đổi so với --previous")
+    parser.add_argument(
+        "--adaptive-window",
+        action="store_true",
+        help="bắt đầu với khoảng hao hụt hẹp, chỉ nới rộng khi GĐ 2 không khả thi hoặc gap còn cao",
+    )
+    parser.add_argument("-o", "--output", help="ghi plan JSON vào file thay vì stdout")
+    parser.add_argument("-q", "--quiet", action="store_true", help="không in log tiến độ")
+    args = parser.parse_args(argv)
+
+    if args.instance == "-":
+        instance = json.load(sys.stdin)
+    else:
+        with open(args.instance, encoding="utf-8") as f:
+            instance = json.load(f)
+
+    def log(message):
+        print(message, file=sys.stderr, flush=True)
+
+    options = {
+        "time_limit_seconds": args.time_limit,
+        "pattern_mode": args.mode,
+        "gap_limit": args.gap / 100.0,
+        "stall_seconds": args.stall,
+        "adaptive_window": args.adaptive_window,
+        "phase2_model": args.phase2_model,
+        "normalize_coefficients": not args.no_normalize,
+    }
+    # Mặc định: dùng các core được phép (CPU affinity), tối đa 8
+    options["num_search_workers"] = args.workers or choose_search_workers(1)
+    if args.previous:
+        with open(args.previous, encoding="utf-8") as f:
+            options["previous_plan"] = json.load(f)
+        options["max_changed_patterns"] = args.max_changed
+
+    optimizer = optimizer_from_instance(
+        instance, progress=CallbackProgress(log=None if args.quiet else log), **options
+    )
+    plan = optimizer.solve()
+
+    text = json.dumps(plan, ensure_ascii=False, indent=1)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+# frappe-bench/apps/cat_laser/cat_laser/tests/test_batch.py
+import unittest
+
+from cat_laser.utils.batch import allocate_pieces, merge_orders, split_plan
+
+
+def _plan():
+    # 2 pattern trên cây 1000 mm: [300 x 3] x 2 cây, [300 x 1 + 200 x 3] x 1 cây
+    return {
+        "stock_length": 1000,
+        "sizes": [{"length": 300.0}, {"length": 200.0}],
+        "patterns": [
+            {
+                "cuts": [{"size": 0, "length": 300.0, "qty": 3}],
+                "bars": 2,
+                "bundle_count": 1,
+                "total_waste": 200.0,
+            },
+            {
+                "cuts": [{"size": 0, "length": 300.0, "qty": 1}, {"size": 1, "length": 200.0, "qty": 3}],
+                "bars": 1,
+                "bundle_count": 1,
+                "total_waste": 100.0,
+            },
+        ],
+        "totals": {"bars": 3, "bundles": 2, "waste": 300.0},
+    }
+
+
+class TestMergeOrders(unittest.TestCase):
+    def test_same_size_across_orders_is_merged(self):
+        orders = [
+            {"name": "A", "items": [
+                {"item_name": "X", "length": 300, "qty": 4},
+                {"item_name": "Y", "length": 200, "qty": 3, "is_last_segment": 1},
+            ]},
+            {"name": "B", "items": [
+                {"item_name": "Z", "length": 300.0004, "qty": 3, "priority": 2},
+                {"item_name": "W", "length": 150, "qty": 0},
+            ]},
+        ]
+        names, sizes, demands, owners, priorities, last_segment = merge_orders(orders)
+        self.assertEqual(names, ["X / Z", "Y"])
+        self.assertEqual(sizes, [300.0, 200.0])
+        self.assertEqual(demands, [7, 3])
+        self.assertEqual(owners, [[("A", "X", 4), ("B", "Z", 3)], [("A", "Y", 3)]])
+        self.assertEqual(priorities, [2, 0])
+        self.assertEqual(last_segment, [False, True])
+
+
+class TestSplitPlan(unittest.TestCase):
+    def setUp(self):
+        self.owners = [[("A", "X", 4), ("B", "Z", 3)], [("A", "Y", 3)]]
+
+    def test_allocate_in_pattern_order_surplus_to_first_line(self):
+        alloc = allocate_pieces(_plan(), self.owners)
+        self.assertEqual(alloc[(0, 0)], {0: 4})
+        self.assertEqual(alloc[(0, 1)], {0: 2, 1: 1})
+        self.assertEqual(alloc[(1, 0)], {1: 3})
+
+        # Cắt dư 1 đoạn 300 mm: tính cho dòng đầu tiên của kích thước đó
+        owners = [[("A", "X", 3), ("B", "Z", 3)], [("A", "Y", 3)]]
+        alloc = allocate_pieces(_plan(), owners)
+        self.assertEqual(alloc[(0, 0)], {0: 3, 1: 1})
+        self.assertEqual(alloc[(0, 1)], {0: 3})
+
+    def test_split_shares_add_up_to_batch(self):
+        plan = _plan()
+        out = split_plan(plan, self.owners, ["A", "B"])
+        self.assertEqual(set(out), {"A", "B"})
+        self.assertEqual([s["produced"] for s in out["A"]["sizes"]], [4, 3])
+        self.assertEqual([s["produced"] for s in out["B"]["sizes"]], [3])
+
+        waste = sum(out[name]["totals"]["waste"] for name in out)
+        self.assertAlmostEqual(waste, plan["totals"]["waste"])
+        for k, p in enumerate(plan["patterns"]):
+            share = sum(q["share"] for name in out for q in out[name]["patterns"] if q["cuts"] == p["cuts"])
+            self.assertAlmostEqual(share, 1.0, msg=f"pattern {k}")
+        self.assertEqual(out["A"]["batch"]["orders"], ["A", "B"])
+        self.assertEqual(out["A"]["batch"]["totals"], plan["totals"])
+
+
+if __name__ == "__main__":
+    unittest.main()
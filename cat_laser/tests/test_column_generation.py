@@ -0,0 +1,69 @@
+# frappe-bench/apps/cat_laser/cat_laser/tests/test_column_generation.py
+import itertools
+import random
+import unittest
+
+import numpy as np
+
+from cat_laser.utils.column_generation import ColumnGenerator, solve_bounded_knapsack
+from cat_laser.utils.pattern_enum import PatternEnumerator
+
+
+def _brute_force(values, weights, bounds, capacity, max_distinct):
+    best = 0.0
+    for x in itertools.product(*[range(b + 1) for b in bounds]):
+        if sum(w * t for w, t in zip(weights, x, strict=True)) > capacity:
+            continue
+        if max_distinct is not None and sum(1 for t in x if t) > max_distinct:
+            continue
+        best = max(best, sum(v * t for v, t in zip(values, x, strict=True)))
+    return best
+
+
+class TestBoundedKnapsack(unittest.TestCase):
+    def test_matches_brute_force(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            n = rng.randint(1, 4)
+            weights = [rng.randint(1, 30) for _ in range(n)]
+            values = [round(rng.uniform(-2, 10), 3) for _ in range(n)]
+            bounds = [rng.randint(0, 6) for _ in range(n)]
+            capacity = rng.randint(0, 120)
+            max_distinct = rng.choice([None, 1, 2])
+            best, x = solve_bounded_knapsack(values, weights, bounds, capacity, max_distinct)
+            with self.subTest(values=values, weights=weights, bounds=bounds, capacity=capacity):
+                self.assertAlmostEqual(best, _brute_force(values, weights, bounds, capacity, max_distinct))
+                self.assertAlmostEqual(best, sum(v * t for v, t in zip(values, x, strict=True)))
+                self.assertLessEqual(sum(w * t for w, t in zip(weights, x, strict=True)), capacity)
+                self.assertTrue(all(0 <= t <= b for t, b in zip(x, bounds, strict=True)))
+
+
+class TestLowWasteColumns(unittest.TestCase):
+    def test_adds_lowest_waste_patterns(self):
+        sizes = [1480, 1215, 990, 730.5, 615, 402, 355, 180]
+        cg = ColumnGenerator(
+            6000,
+            sizes,
+            [40] * len(sizes),
+            blade_width=4,
+            max_stock_over=2,
+            te_dau_sat=10,
+            max_distinct=4,
+            max_low_waste=20,
+        )
+        cg._low_waste_columns()
+        got = np.array(cg.columns)
+        self.assertEqual(len(got), 20)
+        got_waste = np.sort(cg.capacity - got @ np.array(cg.weights))
+
+        # Toàn bộ pattern trong cửa sổ hao hụt, lấy 20 pattern hao hụt thấp nhất
+        floor = round(cg.length * cg.scale * (1 - cg.low_waste_window))
+        _, matrix = PatternEnumerator(cg.weights, 0, floor, cg.capacity, 30, 4).run(max_solutions=10**7)
+        matrix = matrix[(matrix <= np.array(cg.bounds)).all(axis=1)].astype(np.int64)
+        self.assertGreater(len(matrix), 20)
+        true_waste = np.sort(cg.capacity - matrix @ np.array(cg.weights))[:20]
+        self.assertEqual(got_waste.tolist(), true_waste.tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+# frappe-bench/apps/cat_laser/cat_laser/tests/test_heuristics.py
+import unittest
+
+import numpy as np
+
+from cat_laser.utils.heuristics import (
+    decompose_bars,
+    greedy_bundle_plan,
+    min_bundle_table,
+    rebundle,
+    remainder_bundle_table,
+    repair_bundle_plan,
+    split_bars,
+)
+
+FACTORS = [10, 8, 6, 5, 4, 3, 2]
+
+
+def _check_plan(test, bundles, A, demands, max_stock_over, pos_factors, max_manual_cuts=0):
+    test.assertIsNotNone(bundles)
+    produced = (bundles @ np.array(pos_factors)) @ np.asarray(A)
+    test.assertTrue((produced >= demands).all(), produced)
+    test.assertTrue((produced <= np.asarray(demands) + max_stock_over).all(), produced)
+    if 1 in pos_factors:
+        test.assertLessEqual(bundles[:, pos_factors.index(1)].sum(), max_manual_cuts)
+
+
+class TestBundleTables(unittest.TestCase):
+    def test_min_bundle_table(self):
+        best, choice = min_bundle_table(20, [10, 4, 3])
+        self.assertEqual(best[:8].tolist(), [0, -1, -1, 1, 1, -1, 2, 2])
+        self.assertEqual(best[20], 2)
+        for k in np.flatnonzero(best > 0):
+            parts = decompose_bars(int(k), choice)
+            self.assertEqual(sum(f * c for f, c in parts.items()), k)
+            self.assertEqual(sum(parts.values()), best[k])
+
+    def test_remainder_table_matches_full_table(self):
+        best, _ = min_bundle_table(200, FACTORS)
+        F, small, _ = remainder_bundle_table(200, FACTORS)
+        self.assertEqual(F, 10)
+        self.assertLess(len(small), len(best))
+        for k in np.flatnonzero(best >= 0):
+            q, r = split_bars(int(k), F, small)
+            self.assertEqual(q * F + r, k)
+            self.assertEqual(q + small[r], best[k])
+
+    def test_rebundle_keeps_bars_and_manual_cuts(self):
+        pos_factors = [10, 5, 2, 1]
+        bundles = np.array([[0, 0, 10, 1], [0, 2, 0, 0], [0, 0, 0, 0]])
+        out = rebundle(bundles, pos_factors)
+        self.assertEqual((out @ pos_factors).tolist(), (bundles @ pos_factors).tolist())
+        self.assertEqual(out[:, 3].tolist(), [1, 0, 0])
+        self.assertEqual(out.sum(axis=1).tolist(), [3, 1, 0])
+
+
+class TestGreedyBundlePlan(unittest.TestCase):
+    def test_simple_plan(self):
+        A = np.array([[2, 0], [0, 3], [1, 1]])
+        bundles = greedy_bundle_plan(A, [10.0, 20.0, 5.0], [20, 30], 0, FACTORS)
+        _check_plan(self, bundles, A, [20, 30], 0, FACTORS)
+
+    def test_backtracks_when_greedy_overshoots(self):
+        # Chọn tham lam pattern hao hụt thấp nhất dẫn tới bế tắc; vẫn có phương án khả thi
+        A = np.array([[0, 1, 0, 0], [1, 1, 1, 0], [0, 0, 0, 2], [1, 1, 0, 1], [2, 1, 1, 2]])
+        waste = [65.0, 68.8, 38.9, 13.5, 72.1]
+        demands = [9, 11, 5, 8]
+        bundles = greedy_bundle_plan(A, waste, demands, 2, FACTORS)
+        _check_plan(self, bundles, A, demands, 2, FACTORS)
+
+    def test_bar_count_beyond_two_of_target(self):
+        # Cần 1 cây nhưng chỉ chia được bó 5 / 10 cây: phải thêm 5 cây (xa hơn k + 2)
+        A = np.array([[1, 0], [0, 1]])
+        bundles = greedy_bundle_plan(A, [1.0, 2.0], [1, 1], 5, [10, 5])
+        _check_plan(self, bundles, A, [1, 1], 5, [10, 5])
+        self.assertEqual((bundles @ [10, 5]).tolist(), [5, 5])
+
+    def test_manual_cuts(self):
+        A = np.array([[1]])
+        self.assertIsNone(greedy_bundle_plan(A, [1.0], [3], 0, [2, 1], max_manual_cuts=0))
+        bundles = greedy_bundle_plan(A, [1.0], [3], 0, [2, 1], max_manual_cuts=1)
+        _check_plan(self, bundles, A, [3], 0, [2, 1], max_manual_cuts=1)
+
+    def test_infeasible(self):
+        A = np.array([[2]])
+        self.assertIsNone(greedy_bundle_plan(A, [1.0], [3], 0, FACTORS))
+        self.assertIsNone(greedy_bundle_plan(np.zeros((0, 1)), [], [3], 0, FACTORS))
+
+    def test_repair_keeps_previous_plan(self):
+        A = np.array([[2, 0], [0, 3], [1, 1]])
+        waste = [10.0, 20.0, 5.0]
+        # Nhu cầu cũ (20, 30) -> mới (20, 36): giữ 10 cây pattern 0, 10 cây pattern 1, thêm cây
+        bundles = repair_bundle_plan(A, waste, [20, 36], 0, FACTORS, start_bars=[10, 10, 0])
+        _check_plan(self, bundles, A, [20, 36], 0, FACTORS)
+        self.assertEqual((bundles @ FACTORS)[0], 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+# frappe-bench/apps/cat_laser/cat_laser/tests/test_optimization.py
+import tempfile
+import time
+import unittest
+
+from cat_laser.benchmarks.instances import make_instance
+from cat_laser.optimize import optimizer_from_instance
+from cat_laser.utils.optimization import SolutionAndLogCollector
+from cat_laser.utils.pattern_cache import PatternCacheStore
+from cat_laser.utils.progress import CallbackProgress
+
+# Dừng timer, giải mã nghiệm và dựng kết quả sau lượt giải CP-SAT cuối
+OVERHEAD_SECONDS = 0.5
+
+
+class _ReplayCollector(SolutionAndLogCollector):
+    """Gọi on_solution_callback với nghiệm cho sẵn, không cần CP-SAT đang chạy."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.current = None
+        self.stop_calls = 0
+
+    def Value(self, var):
+        return self.current[var]
+
+    def StopSearch(self):
+        self.stop_calls += 1
+
+    def replay(self, x):
+        self.current = x
+        self.on_solution_callback()
+
+
+class TestSolutionCollector(unittest.TestCase):
+    def _collector(self, **kwargs):
+        return _ReplayCollector(
+            vars_x=[0, 1],
+            seg_scaled=[100, 30],
+            blade_scaled=0,
+            scale=1,
+            length=1000,
+            te_dau_sat=0,
+            exclude=None,
+            user_to_notify=None,
+            **kwargs,
+        )
+
+    def test_ignores_solutions_after_accept_at_most(self):
+        # Bộ đệm đúng bằng accept_at_most dòng, không có max_kept: worker báo thêm nghiệm sau StopSearch
+        collector = self._collector(accept_at_most=3)
+        for x in ([9, 3], [8, 6], [7, 9], [6, 12], [5, 15]):
+            collector.replay(x)
+        self.assertEqual(collector.found, 3)
+        self.assertEqual(collector.stop_calls, 1)
+        self.assertEqual(collector.patterns.matrix.tolist(), [[9, 3], [8, 6], [7, 9]])
+
+    def test_keeps_lowest_waste_with_max_kept(self):
+        collector = self._collector(accept_at_most=100, max_kept=2)
+        for x in ([1, 0], [9, 3], [2, 0], [8, 6], [3, 0], [7, 9]):
+            collector.replay(x)
+        self.assertEqual(collector.found, 6)
+        self.assertEqual(collector.patterns.matrix.tolist(), [[9, 3], [8, 6]])
+
+
+class TestPhase2TimeLimit(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_multi_stock_warm_start_within_time_limit(self):
+        # Heuristic bế tắc trên bài này: GĐ 2 giải riêng từng loại cây để khởi động
+        instance = make_instance(6, 6000, seed=1)
+        instance["stocks"] = [{"length": 6000}, {"length": 11700, "available": 40}]
+        logs = []
+        time_limit = 3
+        optimizer = optimizer_from_instance(
+            instance,
+            progress=CallbackProgress(log=logs.append),
+            time_limit_seconds=time_limit,
+            cache_store=PatternCacheStore(self._tmp.name),
+        )
+        optimizer.optimize_cutting()
+
+        start = time.perf_counter()
+        plan = optimizer.optimize_distribution()
+        elapsed = time.perf_counter() - start
+
+        self.assertTrue(any("chỉ dùng cây" in line for line in logs), "không chạy khởi động theo loại cây")
+        self.assertLessEqual(elapsed, time_limit + OVERHEAD_SECONDS)
+        self.assertGreater(plan["totals"]["bars"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
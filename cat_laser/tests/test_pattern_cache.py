@@ -0,0 +1,107 @@
+# frappe-bench/apps/cat_laser/cat_laser/tests/test_pattern_cache.py
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from cat_laser.utils.pattern_cache import (
+    SCHEMA_VERSION,
+    PatternCacheStore,
+    canonical_sizes,
+    match_columns,
+    project_patterns,
+)
+
+
+class TestPatternCacheStore(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.store = PatternCacheStore(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _entry_bytes(self, key):
+        entry = self.store.root / key
+        return sum(f.stat().st_size for f in entry.iterdir())
+
+    def test_make_key_is_versioned_and_order_independent(self):
+        a = PatternCacheStore.make_key({"length": 6000, "sizes": [1, 2]})
+        b = PatternCacheStore.make_key({"sizes": [1, 2], "length": 6000})
+        self.assertEqual(a, b)
+        self.assertTrue(a.startswith(f"v{SCHEMA_VERSION}_"))
+        self.assertNotEqual(a, PatternCacheStore.make_key({"length": 6001, "sizes": [1, 2]}))
+
+    def test_round_trip_sorted_by_waste(self):
+        waste = np.array([30.0, 10.0, 20.0])
+        patterns = np.array([[1, 0], [2, 1], [0, 3]])
+        self.store.save("k", waste, patterns, meta={"group": "g", "complete": True})
+
+        loaded_waste, loaded_patterns = self.store.load("k")
+        self.assertIsInstance(loaded_waste, np.memmap)
+        self.assertEqual(loaded_patterns.dtype, np.uint8)
+        self.assertEqual(loaded_waste.tolist(), [10.0, 20.0, 30.0])
+        self.assertEqual(loaded_patterns.tolist(), [[2, 1], [0, 3], [1, 0]])
+        self.assertEqual(self.store.load_meta("k"), {"group": "g", "complete": True})
+        self.assertEqual(self.store.find_entries("g"), [("k", {"group": "g", "complete": True})])
+        self.assertEqual(self.store.find_entries("other"), [])
+
+    def test_missing_key(self):
+        self.assertIsNone(self.store.load("missing"))
+        self.assertIsNone(self.store.load_meta("missing"))
+
+    def test_overwrite_and_clear(self):
+        self.store.save("k", [1.0], [[1]])
+        self.store.save("k", [2.0, 3.0], [[2], [3]])
+        self.assertEqual(self.store.load("k", mmap=False)[0].tolist(), [2.0, 3.0])
+        self.store.clear()
+        self.assertIsNone(self.store.load("k"))
+
+    def test_rejects_counts_above_uint8(self):
+        with self.assertRaises(ValueError):
+            self.store.save("k", [1.0], [[256]])
+
+    def test_lru_eviction(self):
+        rows = np.ones((1000, 8))
+        self.store.save("a", np.zeros(1000), rows)
+        size = self._entry_bytes("a")
+        self.store.max_bytes = 2 * size
+        self.store.save("b", np.zeros(1000), rows)
+        os.utime(self.store.root / "a", (1, 1))
+        os.utime(self.store.root / "b", (2, 2))
+
+        # Đọc "a" làm mới mtime: "b" trở thành entry cũ nhất và bị loại khi thêm "c"
+        self.store.load("a")
+        self.store.save("c", np.zeros(1000), rows)
+        self.assertIsNotNone(self.store.load("a"))
+        self.assertIsNone(self.store.load("b"))
+        self.assertIsNotNone(self.store.load("c"))
+
+    def test_eviction_keeps_newest_entry(self):
+        self.store.max_bytes = 1
+        self.store.save("a", [1.0], [[1]])
+        self.store.save("b", [1.0], [[1]])
+        self.assertIsNone(self.store.load("a"))
+        self.assertIsNotNone(self.store.load("b"))
+
+
+class TestProjectPatterns(unittest.TestCase):
+    def test_canonical_sizes(self):
+        self.assertEqual(canonical_sizes([500.0004, 300, 500]), [300.0, 500.0, 500.0])
+
+    def test_match_columns(self):
+        self.assertEqual(match_columns([300, 500, 300], [300, 300]), [0, 2])
+        self.assertIsNone(match_columns([300, 500], [300, 300]))
+
+    def test_project_subset(self):
+        waste = np.array([5.0, 7.0, 9.0])
+        patterns = np.array([[1, 0, 2], [0, 1, 1], [3, 0, 0]])
+        projected = project_patterns(waste, patterns, [300, 500, 700], [700, 300])
+        self.assertEqual(projected[0].tolist(), [5.0, 9.0])
+        self.assertEqual(projected[1].tolist(), [[2, 1], [0, 3]])
+        self.assertIsNone(project_patterns(waste, patterns, [300, 500, 700], [400]))
+
+
+if __name__ == "__main__":
+    unittest.main()
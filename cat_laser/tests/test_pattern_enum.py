@@ -0,0 +1,93 @@
+# frappe-bench/apps/cat_laser/cat_laser/tests/test_pattern_enum.py
+import itertools
+import unittest
+
+import numpy as np
+
+from cat_laser.utils.pattern_enum import PatternEnumerator, enumerate_parallel
+
+SEG = [1905, 1335, 1315, 980, 455]
+BLADE = 4
+
+
+def _brute_force(seg, blade, lower, upper, max_per_size=30, max_distinct=None, exclude=(),
+                 require_any=None, last_segment=None, max_last_segment=1):
+    """Tập pattern thỏa mãn các ràng buộc, duyệt hết mọi vector số lượng."""
+    weights = np.array(seg) + blade
+    ranges = [range(min(max_per_size, upper // w) + 1) for w in weights]
+    exclude = {tuple(p) for p in exclude}
+    found = {}
+    for x in itertools.product(*ranges):
+        used = int(np.dot(x, weights))
+        if not lower <= used <= upper or x in exclude:
+            continue
+        if max_distinct is not None and np.count_nonzero(x) > max_distinct:
+            continue
+        if require_any and not any(x[i] for i in require_any):
+            continue
+        if last_segment and sum(x[i] for i in last_segment) > max_last_segment:
+            continue
+        found[x] = used
+    return found
+
+
+def _as_dict(used, matrix):
+    return {tuple(int(v) for v in row): int(u) for u, row in zip(used, matrix, strict=True)}
+
+
+class TestPatternEnumerator(unittest.TestCase):
+    def check(self, **kwargs):
+        kwargs = dict(seg_scaled=SEG, blade_scaled=BLADE, **kwargs)
+        used, matrix = PatternEnumerator(**kwargs).run()
+        expected = _brute_force(kwargs.pop("seg_scaled"), kwargs.pop("blade_scaled"), **kwargs)
+        self.assertEqual(_as_dict(used, matrix), expected)
+        self.assertEqual(len(matrix), len(expected))
+        # Tổng chiều dài giảm dần (hao hụt tăng dần)
+        self.assertTrue((np.diff(used) <= 0).all())
+
+    def test_matches_brute_force(self):
+        self.check(lower=5800, upper=5990)
+
+    def test_max_distinct_and_per_size(self):
+        self.check(lower=5000, upper=5990, max_distinct=2, max_per_size=4)
+
+    def test_exclude_and_require_any(self):
+        _, matrix = PatternEnumerator(SEG, BLADE, 5800, 5990).run()
+        self.check(lower=5800, upper=5990, exclude=matrix[::3], require_any=[1, 3])
+
+    def test_last_segment(self):
+        self.check(lower=5500, upper=5990, last_segment=[3, 4])
+        self.check(lower=5500, upper=5990, last_segment=[4], max_last_segment=2)
+
+    def test_truncation(self):
+        used, matrix = PatternEnumerator(SEG, BLADE, 5000, 5990).run(max_solutions=10)
+        self.assertEqual(len(matrix), 10)
+        expected = _brute_force(SEG, BLADE, 5000, 5990)
+        self.assertTrue(set(_as_dict(used, matrix).items()) <= set(expected.items()))
+
+
+KWARGS = dict(seg_scaled=SEG, blade_scaled=BLADE, lower=4000, upper=5990, max_distinct=4)
+
+
+class TestEnumerateParallel(unittest.TestCase):
+    def test_complete_set(self):
+        used, matrix = enumerate_parallel(KWARGS, workers=1)
+        self.assertEqual(_as_dict(used, matrix), _brute_force(SEG, BLADE, 4000, 5990, max_distinct=4))
+
+    def test_parallel_equals_sequential(self):
+        for max_solutions in (100000, 50, 7):
+            with self.subTest(max_solutions=max_solutions):
+                seq = enumerate_parallel(KWARGS, workers=1, max_solutions=max_solutions, num_partitions=8)
+                par = enumerate_parallel(KWARGS, workers=2, max_solutions=max_solutions, num_partitions=8)
+                self.assertLessEqual(len(seq[1]), max_solutions)
+                np.testing.assert_array_equal(seq[0], par[0])
+                np.testing.assert_array_equal(seq[1], par[1])
+
+    def test_no_solution(self):
+        used, matrix = enumerate_parallel(dict(KWARGS, lower=1, upper=400), workers=1)
+        self.assertEqual(len(used), 0)
+        self.assertEqual(matrix.shape, (0, len(SEG)))
+
+
+if __name__ == "__main__":
+    unittest.main()
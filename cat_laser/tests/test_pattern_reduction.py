@@ -0,0 +1,84 @@
+# frappe-bench/apps/cat_laser/cat_laser/tests/test_pattern_reduction.py
+import itertools
+import unittest
+
+import numpy as np
+
+from cat_laser.utils.pattern_enum import PatternEnumerator
+from cat_laser.utils.pattern_reduction import reduce_patterns
+from cat_laser.utils.pattern_set import PatternSet
+
+LENGTH = 3000
+
+
+def _all_patterns(sizes):
+    used, matrix = PatternEnumerator(sizes, 0, 0, LENGTH).run()
+    return PatternSet(matrix, used)
+
+
+def _min_waste(patterns, demands, max_stock_over):
+    """Hao hụt nhỏ nhất để đủ nhu cầu (không vượt demand + max_stock_over): quy hoạch động vét cạn."""
+    caps = np.asarray(demands) + max_stock_over
+    waste = patterns.waste(LENGTH)
+    best = {}
+    states = sorted(itertools.product(*[range(c + 1) for c in caps]), key=sum, reverse=True)
+    for state in states:
+        if all(s >= d for s, d in zip(state, demands, strict=True)):
+            best[state] = 0.0
+            continue
+        best[state] = np.inf
+        for row, w in zip(patterns.matrix, waste, strict=True):
+            nxt = tuple(int(v) for v in np.asarray(state) + row)
+            if any(row) and (np.asarray(nxt) <= caps).all():
+                best[state] = min(best[state], w + best[nxt])
+    return best[(0,) * len(demands)]
+
+
+class TestReducePatterns(unittest.TestCase):
+    def test_infeasible_and_duplicate_removed(self):
+        patterns = PatternSet([[3, 0], [1, 1], [1, 1], [0, 2]], [2700, 1900, 1900, 1800])
+        reduced, stats = reduce_patterns(patterns, LENGTH, demands=[2, 2], max_stock_over=0)
+        self.assertEqual(reduced.matrix.tolist(), [[1, 1], [0, 2]])
+        self.assertEqual((stats["infeasible"], stats["duplicate"], stats["after"]), (1, 1, 2))
+
+    def test_dominance_keeps_group_best(self):
+        patterns = _all_patterns([1000, 700, 450])
+        slack = 50
+        reduced, stats = reduce_patterns(patterns, LENGTH, [30, 30, 30], 0, dominance_slack=slack)
+        self.assertGreater(stats["dominated"], 0)
+
+        kept = reduced.index()
+        waste = patterns.waste(LENGTH)
+        supports = [tuple(row > 0) for row in patterns.matrix]
+        for support in set(supports):
+            members = [p for p, s in enumerate(supports) if s == support]
+            best = min(waste[p] for p in members)
+            for p in members:
+                self.assertEqual(PatternSet.key(patterns.matrix[p]) in kept, waste[p] <= best + slack)
+
+    def test_dominance_keeps_optimum(self):
+        for sizes, demands in [
+            ([1000, 700, 450], (3, 4, 5)),
+            ([1200, 800, 550], (4, 3, 6)),
+            ([900, 650, 400], (5, 5, 5)),
+        ]:
+            with self.subTest(sizes=sizes):
+                patterns = _all_patterns(sizes)
+                reduced, _ = reduce_patterns(patterns, LENGTH, demands, 1, dominance_slack=50)
+                self.assertLess(len(reduced), len(patterns))
+                self.assertEqual(_min_waste(reduced, demands, 1), _min_waste(patterns, demands, 1))
+
+    def test_top_k_and_budget(self):
+        patterns = _all_patterns([1000, 700, 450])
+        reduced, stats = reduce_patterns(patterns, LENGTH, [30, 30, 30], 0, top_k_per_support=1)
+        n_supports = len({tuple(row > 0) for row in patterns.matrix})
+        self.assertEqual(len(reduced), n_supports)
+
+        reduced, stats = reduce_patterns(patterns, LENGTH, [30, 30, 30], 0, max_patterns=3)
+        self.assertEqual(stats["after"], 3)
+        # Mỗi kích thước có nhu cầu vẫn còn ít nhất 1 pattern
+        self.assertTrue((reduced.matrix.sum(axis=0) > 0).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
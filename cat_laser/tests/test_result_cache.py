@@ -0,0 +1,84 @@
+# frappe-bench/apps/cat_laser/cat_laser/tests/test_result_cache.py
+import os
+import tempfile
+import time
+import unittest
+
+from cat_laser.benchmarks.instances import make_instance
+from cat_laser.optimize import optimizer_from_instance
+from cat_laser.utils.constants import ENUMERATOR_CPSAT, PHASE2_MODEL_COMPACT
+from cat_laser.utils.result_cache import SCHEMA_VERSION, ResultCacheStore
+
+
+class TestResultCacheStore(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.store = ResultCacheStore(self._tmp.name, max_entries=2)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_make_key_is_versioned_and_order_independent(self):
+        a = ResultCacheStore.make_key({"items": [[100.0, 2]], "time_limit_seconds": 60.0})
+        b = ResultCacheStore.make_key({"time_limit_seconds": 60.0, "items": [[100.0, 2]]})
+        self.assertEqual(a, b)
+        self.assertTrue(a.startswith(f"r{SCHEMA_VERSION}_"))
+        self.assertNotEqual(a, ResultCacheStore.make_key({"items": [[100.0, 2]], "time_limit_seconds": 120.0}))
+
+    def test_round_trip_and_delete(self):
+        self.store.set("k", {"patterns": [[1, 2]], "waste": [5.0]})
+        entry = self.store.get("k")
+        self.assertEqual(entry["patterns"], [[1, 2]])
+        self.assertIn("created", entry)
+        self.store.delete("k")
+        self.assertIsNone(self.store.get("k"))
+        self.assertIsNone(self.store.get("missing"))
+
+    def test_expired_entry_is_dropped(self):
+        store = ResultCacheStore(self._tmp.name, ttl_seconds=60)
+        store.set("k", {"waste": []})
+        self.assertIsNotNone(store.get("k"))
+
+        # set() luôn ghi "created" hiện tại; ghi thẳng file để mô phỏng entry cũ
+        path = store.root / "old.json"
+        path.write_text('{"waste": [], "created": 0}', encoding="utf-8")
+        self.assertIsNone(store.get("old"))
+        self.assertFalse(path.exists())
+
+    def test_evicts_least_recently_used(self):
+        now = time.time()
+        for k, key in enumerate(("a", "b")):
+            self.store.set(key, {"waste": []})
+            os.utime(self.store.root / f"{key}.json", (now - 100 + k, now - 100 + k))
+        self.store.get("a")
+        self.store.set("c", {"waste": []})
+        self.assertIsNotNone(self.store.get("a"))
+        self.assertIsNotNone(self.store.get("c"))
+        self.assertIsNone(self.store.get("b"))
+
+    def test_clear(self):
+        self.store.set("k", {"waste": []})
+        self.store.clear()
+        self.assertIsNone(self.store.get("k"))
+        self.assertTrue(self.store.root.is_dir())
+
+
+
+class TestResultCacheKey(unittest.TestCase):
+    def test_solver_options_are_part_of_the_key(self):
+        instance = make_instance(5)
+        key = optimizer_from_instance(instance)._result_cache_key()
+        self.assertEqual(key, optimizer_from_instance(instance)._result_cache_key())
+        for options in (
+            {"time_limit_seconds": 120},
+            {"gap_limit": 0.001},
+            {"phase2_model": PHASE2_MODEL_COMPACT},
+            {"normalize_coefficients": False},
+            {"enumerator": ENUMERATOR_CPSAT},
+        ):
+            with self.subTest(options=options):
+                self.assertNotEqual(key, optimizer_from_instance(instance, **options)._result_cache_key())
+
+
+if __name__ == "__main__":
+    unittest.main()
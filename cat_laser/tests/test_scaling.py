@@ -0,0 +1,68 @@
+# frappe-bench/apps/cat_laser/cat_laser/tests/test_scaling.py
+import unittest
+
+import numpy as np
+
+from cat_laser.utils.scaling import LengthScale, decimal_scale, integer_coefficients
+
+
+class TestDecimalScale(unittest.TestCase):
+    def test_smallest_exact_scale(self):
+        self.assertEqual(decimal_scale([6000, 1200, 3]), 1)
+        self.assertEqual(decimal_scale([1200.5, 3]), 10)
+        self.assertEqual(decimal_scale([0.1, 0.2, 0.25]), 100)
+        self.assertEqual(decimal_scale(np.array([[1.125, -2.5]])), 1000)
+
+    def test_capped_at_max_digits(self):
+        self.assertEqual(decimal_scale([1 / 3]), 1000)
+        self.assertEqual(decimal_scale([0.12345], max_digits=2), 100)
+
+
+class TestIntegerCoefficients(unittest.TestCase):
+    def test_divided_by_gcd(self):
+        coeffs, unit = integer_coefficients([15.5, 31.0, 4.5])
+        self.assertEqual(coeffs.tolist(), [31, 62, 9])
+        self.assertAlmostEqual(unit, 0.5)
+        np.testing.assert_allclose(coeffs * unit, [15.5, 31.0, 4.5])
+
+    def test_integers_and_empty(self):
+        coeffs, unit = integer_coefficients([200, 400, 600])
+        self.assertEqual(coeffs.tolist(), [1, 2, 3])
+        self.assertEqual(unit, 200)
+        coeffs, unit = integer_coefficients([])
+        self.assertEqual(coeffs.size, 0)
+        self.assertEqual(unit, 1)
+
+
+class TestLengthScale(unittest.TestCase):
+    def test_exact_scale_and_gcd(self):
+        ls = LengthScale([1200, 600.5], blade_width=3)
+        self.assertEqual(ls.scale, 10)
+        self.assertEqual(ls.seg_scaled, [12000, 6005])
+        self.assertEqual(ls.blade_scaled, 30)
+        self.assertEqual(ls.gcd, 5)
+        self.assertEqual(ls.seg, [2400, 1201])
+        self.assertEqual(ls.blade, 6)
+        np.testing.assert_allclose(ls.to_mm([2400, 6]), [1200.0, 3.0])
+
+    def test_bounds_round_inwards(self):
+        ls = LengthScale([1200, 600], blade_width=3)
+        self.assertEqual((ls.scale, ls.gcd), (1, 3))
+        # 5940 / 3 = 1980 đúng; 5941 không chia hết: cận dưới làm tròn lên, cận trên làm tròn xuống
+        self.assertEqual(ls.lower(5940), 1980)
+        self.assertEqual(ls.upper(5940), 1980)
+        self.assertEqual(ls.lower(5941), 1981)
+        self.assertEqual(ls.upper(5941), 1980)
+        self.assertEqual(ls.upper(np.float64(5999.0)), 1999)
+        self.assertIsInstance(ls.upper(np.float64(5999.0)), int)
+
+    def test_without_normalize(self):
+        ls = LengthScale([1200, 600], blade_width=3, normalize=False)
+        self.assertEqual((ls.scale, ls.gcd), (10, 1))
+        self.assertEqual(ls.seg, [12000, 6000])
+        self.assertEqual(ls.lower(5940.2), 59402)
+        self.assertEqual(ls.upper(5940.2), 59402)
+
+
+if __name__ == "__main__":
+    unittest.main()
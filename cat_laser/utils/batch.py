@@ -0,0 +1,150 @@
+# frappe-bench/apps/cat_laser/cat_laser/utils/batch.py
+"""
+Gộp nhiều đơn (Cutting Request) cùng chiều dài cây thành một bài toán,
+giải 1 lần rồi chia kết quả lại cho từng đơn.
+"""
+import copy
+
+from cat_laser.utils.pattern_cache import size_key
+
+
+# ===================================================================
+# Gộp nhu cầu
+# ===================================================================
+def merge_orders(orders):
+    """
+    orders: [{"name": ..., "items": [{"item_name", "length", "qty", "priority", "is_last_segment"}, ...]}, ...]
+    Các item cùng kích thước (kể cả khác đơn) gộp thành một dòng nhu cầu, lấy độ ưu tiên
+    cao nhất và là đoạn cuối nếu có item nào là đoạn cuối.
+
+    Trả về (piece_names, segment_sizes, demands, owners, priorities, last_segment) với
+    owners[i] = [(tên đơn, item_name, qty), ...] theo thứ tự các đơn.
+    """
+    index = {}
+    piece_names, segment_sizes, demands, owners = [], [], [], []
+    priorities, last_segment = [], []
+    for order in orders:
+        for item in order["items"]:
+            length, qty = float(item["length"]), int(item["qty"])
+            if length <= 0 or qty <= 0:
+                continue
+            key = size_key(length)
+            i = index.get(key)
+            if i is None:
+                i = index[key] = len(segment_sizes)
+                piece_names.append(item["item_name"])
+                segment_sizes.append(length)
+                demands.append(0)
+                owners.append([])
+                priorities.append(0)
+                last_segment.append(False)
+            elif item["item_name"] not in piece_names[i].split(" / "):
+                piece_names[i] = f"{piece_names[i]} / {item['item_name']}"
+            demands[i] += qty
+            owners[i].append((order["name"], item["item_name"], qty))
+            priorities[i] = max(priorities[i], int(item.get("priority") or 0))
+            last_segment[i] = last_segment[i] or bool(item.get("is_last_segment"))
+    return piece_names, segment_sizes, demands, owners, priorities, last_segment
+
+
+# ===================================================================
+# Chia kết quả về từng đơn
+# ===================================================================
+def allocate_pieces(plan, owners):
+    """
+    Phân các đoạn đã cắt cho từng dòng item của các đơn: với mỗi kích thước, lấy lần lượt
+    theo thứ tự pattern trong plan và theo thứ tự các dòng. Đoạn dư tính cho dòng đầu tiên.
+
+    Trả về {(kích thước i, vị trí dòng r trong owners[i]): {vị trí pattern k: số đoạn}}.
+    """
+    supply = {}
+    for k, p in enumerate(plan["patterns"]):
+        for c in p["cuts"]:
+            supply.setdefault(c["size"], []).append([k, c["qty"] * p["bars"]])
+
+    alloc = {}
+    for i, owner_list in enumerate(owners):
+        sources = supply.get(i, [])
+        pos = 0
+        for r, (_, _, qty) in enumerate(owner_list):
+            cell = alloc.setdefault((i, r), {})
+            need = qty
+            while need > 0 and pos < len(sources):
+                k, left = sources[pos]
+                take = min(need, left)
+                cell[k] = cell.get(k, 0) + take
+                sources[pos][1] -= take
+                need -= take
+                if sources[pos][1] == 0:
+                    pos += 1
+        if owner_list:
+            cell = alloc[(i, 0)]
+            for k, left in sources[pos:]:
+                if left > 0:
+                    cell[k] = cell.get(k, 0) + left
+    return alloc
+
+
+def split_plan(plan, owners, order_names):
+    """
+    Tạo kết quả riêng cho từng đơn từ kết quả gộp:
+      - patterns: các pattern (cây cắt chung) có đoạn của đơn, kèm `allocated` (số đoạn của đơn)
+        và `share` (tỷ lệ chiều dài đoạn cắt ra thuộc về đơn)
+      - sizes: nhu cầu / đã phân / dư của riêng đơn
+      - totals: số cây, số bó, hao hụt phân bổ theo `share`
+      - batch: danh sách đơn được gộp và tổng của cả lô
+    """
+    alloc = allocate_pieces(plan, owners)
+    lengths = [s["length"] for s in plan["sizes"]]
+    stock_length = plan["stock_length"]
+    piece_length = [
+        sum(c["length"] * c["qty"] for c in p["cuts"]) * p["bars"] for p in plan["patterns"]
+    ]
+
+    out = {}
+    for name in order_names:
+        sizes = []
+        allocated = {}
+        for i, owner_list in enumerate(owners):
+            for r, (owner, item_name, qty) in enumerate(owner_list):
+                if owner != name:
+                    continue
+                cell = alloc.get((i, r), {})
+                produced = sum(cell.values())
+                sizes.append({
+                    "item_name": item_name,
+                    "length": lengths[i],
+                    "demand": qty,
+                    "produced": int(produced),
+                    "surplus": int(produced - qty),
+                })
+                for k, n in cell.items():
+                    allocated.setdefault(k, []).append(
+                        {"size": i, "item_name": item_name, "length": lengths[i], "pieces": int(n)}
+                    )
+
+        patterns = []
+        bars = bundles = waste = used_stock = 0.0
+        for k in sorted(allocated):
+            p = plan["patterns"][k]
+            used = sum(a["length"] * a["pieces"] for a in allocated[k])
+            share = used / piece_length[k] if piece_length[k] > 0 else 0.0
+            patterns.append(dict(copy.deepcopy(p), allocated=allocated[k], share=share))
+            bars += share * p["bars"]
+            bundles += share * p["bundle_count"]
+            waste += share * p["total_waste"]
+            used_stock += share * p["bars"] * p.get("stock_length", stock_length)
+
+        order_plan = dict(plan, patterns=patterns, sizes=sizes)
+        order_plan["totals"] = {
+            "bars": round(bars),
+            "bundles": round(bundles),
+            "waste": waste,
+            "waste_percent": waste / used_stock * 100 if used_stock else 0.0,
+            "surplus": int(sum(s["surplus"] for s in sizes)),
+        }
+        # Số cây theo loại cây chỉ có cho cả lô
+        order_plan.pop("stocks", None)
+        order_plan["batch"] = {"orders": list(order_names), "totals": plan["totals"], "stocks": plan.get("stocks")}
+        out[name] = order_plan
+    return out
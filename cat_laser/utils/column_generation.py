@@ -0,0 +1,337 @@
+# frappe-bench/apps/cat_laser/cat_laser/utils/column_generation.py
+import time
+
+import numpy as np
+
+from cat_laser.utils.pattern_enum import PatternEnumerator
+from cat_laser.utils.pattern_set import PatternSet
+
+# Cột hao hụt thấp: dải hao hụt bắt đầu từ 1/GROWTH^2 của low_waste_window, mỗi lần nới x GROWTH
+LOW_WASTE_BAND_GROWTH = 4
+# Giới hạn số nghiệm liệt kê mỗi dải, theo bội số của max_low_waste
+LOW_WASTE_SOLUTIONS_PER_COLUMN = 20
+
+
+# ===================================================================
+# Bài toán con (pricing): Bounded knapsack bằng quy hoạch động
+# ===================================================================
+def solve_bounded_knapsack(values, weights, bounds, capacity, max_distinct=None):
+    """
+    Tìm vector số nguyên x (0 <= x_i <= bounds[i]) tối đa sum(values[i] * x[i])
+    với sum(weights[i] * x[i]) <= capacity.
+    Nếu có max_distinct thì số loại kích thước khác 0 trong x không vượt quá giá trị này.
+    Trả về (giá trị tốt nhất, x).
+    """
+    n = len(values)
+    capacity = int(capacity)
+    x = [0] * n
+    if capacity <= 0 or n == 0:
+        return 0.0, x
+
+    items = [
+        i for i in range(n)
+        if values[i] > 1e-9 and bounds[i] > 0 and 0 < weights[i] <= capacity
+    ]
+    if not items:
+        return 0.0, x
+
+    # Rút gọn dung lượng theo ước chung lớn nhất của các trọng số
+    g = int(np.gcd.reduce([int(weights[i]) for i in items]))
+    cap = capacity // g
+    w = {i: int(weights[i]) // g for i in items}
+
+    limited = max_distinct is not None and max_distinct < len(items)
+    rows = (int(max_distinct) + 1) if limited else 1
+
+    # dp[k][c]: giá trị tốt nhất khi dùng tối đa k loại kích thước, dung lượng <= c
+    dp = np.zeros((rows, cap + 1), dtype=float)
+    choices = []
+
+    for i in items:
+        src = dp[:-1] if limited else dp
+        new = dp.copy()
+        choice = np.zeros((rows, cap + 1), dtype=np.int16)
+        dst = new[1:] if limited else new
+        dst_choice = choice[1:] if limited else choice
+
+        u = min(int(bounds[i]), cap // w[i])
+        for t in range(1, u + 1):
+            shift = t * w[i]
+            cand = src[:, : cap + 1 - shift] + t * values[i]
+            better = cand > dst[:, shift:] + 1e-12
+            dst[:, shift:][better] = cand[better]
+            dst_choice[:, shift:][better] = t
+
+        dp = new
+        choices.append(choice)
+
+    # Truy vết nghiệm
+    k = rows - 1
+    c = cap
+    for idx in range(len(items) - 1, -1, -1):
+        i = items[idx]
+        t = int(choices[idx][k, c])
+        if t > 0:
+            x[i] = t
+            c -= t * w[i]
+            if limited:
+                k -= 1
+
+    best = float(sum(values[i] * x[i] for i in range(n)))
+    return best, x
+
+
+# ===================================================================
+# Gilmore-Gomory: LP master + pricing bằng knapsack
+# ===================================================================
+class ColumnGenerator:
+    """
+    Sinh pattern theo phương pháp Column Generation (Gilmore-Gomory).
+    LP master tối thiểu hao hụt trên một tập pattern nhỏ, các giá đối ngẫu (dual)
+    được đưa vào bài toán knapsack để sinh pattern mới có reduced cost âm.
+    `surplus_penalty[i]` (mm / đoạn dư) được cộng vào chi phí của pattern như hao hụt;
+    mỗi pattern chứa tối đa 1 đoạn thuộc `last_segment`.
+    Các cột tối ưu cho LP thường thiếu pattern cần cho nghiệm nguyên: tập trả về được bổ sung
+    `max_low_waste` pattern hao hụt thấp nhất (hao hụt <= low_waste_window x chiều dài).
+    """
+
+    def __init__(
+        self,
+        length,
+        segment_sizes,
+        demands,
+        blade_width,
+        max_stock_over,
+        te_dau_sat=0,
+        max_distinct=None,
+        max_per_size=30,
+        scale=10,
+        max_iterations=500,
+        time_limit_sec=None,
+        low_waste_window=0.01,
+        max_low_waste=50,
+        surplus_penalty=None,
+        last_segment=None,
+        log=None,
+    ):
+        self.length = length
+        self.segment_sizes = [float(s) for s in segment_sizes]
+        self.demands = [int(d) for d in demands]
+        self.blade_width = blade_width
+        self.max_stock_over = int(max_stock_over)
+        self.te_dau_sat = te_dau_sat
+        self.max_distinct = max_distinct
+        self.max_per_size = max_per_size
+        self.scale = scale
+        self.max_iterations = max_iterations
+        self.time_limit_sec = time_limit_sec
+        self.low_waste_window = low_waste_window
+        self.max_low_waste = max_low_waste
+        self.log = log or (lambda msg: None)
+
+        self.weights = [
+            round((s + self.blade_width) * scale) for s in self.segment_sizes
+        ]
+        self.capacity = round((self.length - self.te_dau_sat) * scale)
+        self.bounds = [
+            min(self.max_per_size, d + self.max_stock_over) for d in self.demands
+        ]
+        self.surplus_penalty = [float(p) for p in (surplus_penalty or [0.0] * len(self.demands))]
+        self.last_segment = sorted(set(int(i) for i in (last_segment or [])))
+        for i in self.last_segment:
+            self.bounds[i] = min(self.bounds[i], 1)
+
+        self.columns = []
+        self._seen = set()
+        self.lp_objective = None
+
+    def _used_length(self, x):
+        return sum(self.weights[i] * x[i] for i in range(len(x))) / self.scale
+
+    def _cost(self, x):
+        """Chi phí của pattern trong LP master: hao hụt + phạt đoạn dư theo độ ưu tiên."""
+        return self.length - self._used_length(x) + sum(
+            self.surplus_penalty[i] * x[i] for i in range(len(x))
+        )
+
+    def _price(self, values):
+        """
+        Knapsack của bài toán con. Có kích thước đoạn cuối: giải 1 lần không dùng nhóm này,
+        và 1 lần cho mỗi kích thước đoạn cuối đặt sẵn 1 đoạn, lấy nghiệm tốt nhất.
+        """
+        if not self.last_segment:
+            return solve_bounded_knapsack(
+                values, self.weights, self.bounds, self.capacity, self.max_distinct
+            )
+
+        free = [0 if i in self.last_segment else b for i, b in enumerate(self.bounds)]
+        best, x = solve_bounded_knapsack(values, self.weights, free, self.capacity, self.max_distinct)
+        for g in self.last_segment:
+            if values[g] <= 1e-9 or self.weights[g] > self.capacity:
+                continue
+            distinct = None if self.max_distinct is None else self.max_distinct - 1
+            if distinct is not None and distinct < 0:
+                continue
+            rest, y = solve_bounded_knapsack(
+                values, self.weights, free, self.capacity - self.weights[g], distinct
+            )
+            if rest + values[g] > best + 1e-9:
+                y[g] = 1
+                best, x = rest + values[g], y
+        return best, x
+
+    def _add_column(self, x):
+        key = tuple(int(v) for v in x)
+        if key in self._seen or not any(key):
+            return False
+        self._seen.add(key)
+        self.columns.append(list(key))
+        return True
+
+    def _initial_columns(self):
+        # Pattern đồng nhất cho từng kích thước
+        for i, w in enumerate(self.weights):
+            x = [0] * len(self.weights)
+            x[i] = min(self.bounds[i], self.capacity // w) if w > 0 else 0
+            self._add_column(x)
+
+        # Pattern tham lam kiểu First-Fit-Decreasing
+        order = sorted(range(len(self.weights)), key=lambda i: -self.weights[i])
+        for start in range(len(order)):
+            x = [0] * len(self.weights)
+            remain = self.capacity
+            distinct = 0
+            has_last = False
+            for i in order[start:] + order[:start]:
+                if self.max_distinct is not None and distinct >= self.max_distinct:
+                    break
+                if has_last and i in self.last_segment:
+                    continue
+                t = min(self.bounds[i], remain // self.weights[i])
+                has_last = has_last or (t > 0 and i in self.last_segment)
+                if t > 0:
+                    x[i] = t
+                    remain -= t * self.weights[i]
+                    distinct += 1
+            self._add_column(x)
+
+    def _low_waste_columns(self):
+        """
+        Thêm các pattern hao hụt thấp nhất vào tập cột. Liệt kê bằng PatternEnumerator trong một
+        dải hao hụt hẹp sát chiều dài cây (cắt tỉa theo cận dưới nên rất nhanh), chỉ nới dải
+        (x LOW_WASTE_BAND_GROWTH, tới low_waste_window) khi chưa đủ `max_low_waste` pattern.
+        Dải liệt kê hết (không chạm giới hạn số nghiệm) thì đúng là các pattern hao hụt thấp nhất.
+        """
+        if not self.max_low_waste or not self.low_waste_window:
+            return
+        floor = max(round(self.length * self.scale * (1 - self.low_waste_window)), 0)
+        band = max((self.capacity - floor) // LOW_WASTE_BAND_GROWTH**2, 1)
+        limit = LOW_WASTE_SOLUTIONS_PER_COLUMN * self.max_low_waste
+        bounds = np.array(self.bounds)
+        complete = np.zeros((0, len(self.weights)), dtype=np.int16)
+        while True:
+            lower = max(self.capacity - band, floor)
+            enumerator = PatternEnumerator(
+                seg_scaled=self.weights,
+                blade_scaled=0,
+                lower=lower,
+                upper=self.capacity,
+                max_per_size=self.max_per_size,
+                max_distinct=self.max_distinct,
+                last_segment=self.last_segment,
+            )
+            _, matrix = enumerator.run(max_solutions=limit)
+            truncated = len(matrix) >= limit
+            # Chỉ nhận pattern không vượt số đoạn cần của từng kích thước
+            matrix = matrix[(matrix <= bounds).all(axis=1)]
+            if truncated:
+                # Dải rộng bị cắt theo thứ tự duyệt: giữ trước các pattern của dải hẹp đã liệt kê hết
+                matrix = np.concatenate([complete, matrix])
+                break
+            complete = matrix
+            if len(matrix) >= self.max_low_waste or lower == floor:
+                break
+            band *= LOW_WASTE_BAND_GROWTH
+
+        # Kết quả đã sắp hao hụt tăng dần (trùng lặp bị _add_column bỏ qua)
+        added = 0
+        for row in matrix.tolist():
+            if added >= self.max_low_waste:
+                break
+            added += self._add_column(row)
+
+    def _solve_master(self):
+        from ortools.linear_solver import pywraplp
+
+        solver = pywraplp.Solver.CreateSolver("GLOP")
+        m = len(self.demands)
+        y = [solver.NumVar(0.0, solver.infinity(), f"y_{j}") for j in range(len(self.columns))]
+
+        rows = []
+        for i in range(m):
+            ct = solver.Constraint(
+                float(self.demands[i]), float(self.demands[i] + self.max_stock_over)
+            )
+            for j, col in enumerate(self.columns):
+                if col[i]:
+                    ct.SetCoefficient(y[j], float(col[i]))
+            rows.append(ct)
+
+        objective = solver.Objective()
+        for j, col in enumerate(self.columns):
+            objective.SetCoefficient(y[j], float(self._cost(col)))
+        objective.SetMinimization()
+
+        status = solver.Solve()
+        if status != pywraplp.Solver.OPTIMAL:
+            return None, None
+
+        duals = [ct.dual_value() for ct in rows]
+        return solver.Objective().Value(), duals
+
+    def run(self):
+        """Trả về PatternSet các cột đã sinh (hao hụt tăng dần) giống định dạng GĐ 1."""
+        start = time.time()
+        self._initial_columns()
+
+        iteration = 0
+        for iteration in range(1, self.max_iterations + 1):
+            lp_value, duals = self._solve_master()
+            if duals is None:
+                raise ValueError("LP master của Column Generation không khả thi.")
+            self.lp_objective = lp_value
+
+            # Reduced cost của pattern x: L - sum((w_i/scale + pi_i - phạt_i) * x_i)
+            values = [
+                self.weights[i] / self.scale + duals[i] - self.surplus_penalty[i]
+                for i in range(len(duals))
+            ]
+            best, x = self._price(values)
+
+            if iteration % 10 == 0:
+                self.log(
+                    f"CG vòng {iteration}: LP hao hụt = {lp_value:.1f}mm, "
+                    f"{len(self.columns)} patterns"
+                )
+
+            if self.length - best >= -1e-6 or not self._add_column(x):
+                break
+            if self.time_limit_sec and time.time() - start > self.time_limit_sec:
+                self.log("CG: Hết thời gian, dừng sinh cột.")
+                break
+
+        n_generated = len(self.columns)
+        self._low_waste_columns()
+        if len(self.columns) > n_generated:
+            self.log(f"CG: Thêm {len(self.columns) - n_generated} pattern hao hụt thấp cho bài toán nguyên.")
+
+        self.log(
+            f"CG hoàn tất sau {iteration} vòng ({time.time() - start:.2f}s): "
+            f"{len(self.columns)} patterns, cận dưới LP hao hụt = {self.lp_objective:.1f}mm"
+        )
+
+        patterns = PatternSet(
+            np.array(self.columns, dtype=np.int64).reshape(-1, len(self.segment_sizes)),
+            [self._used_length(col) for col in self.columns],
+        )
+        return patterns.sort_by_used()
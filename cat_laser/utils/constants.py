@@ -0,0 +1,13 @@
+# frappe-bench/apps/cat_laser/cat_laser/utils/constants.py
+# Hằng số dùng chung, không phụ thuộc OR-Tools / NumPy để controller import nhẹ
+
+PATTERN_MODE_ENUMERATION = "enumeration"
+PATTERN_MODE_COLUMN_GENERATION = "column_generation"
+
+# Bộ liệt kê pattern ở GĐ 1
+ENUMERATOR_NUMPY = "numpy"
+ENUMERATOR_CPSAT = "cpsat"
+
+# Mô hình GĐ 2: 1 biến số bó cho mỗi (pattern, hệ số) hoặc 1 biến số cây cho mỗi pattern
+PHASE2_MODEL_BUNDLES = "bundles"
+PHASE2_MODEL_COMPACT = "compact"
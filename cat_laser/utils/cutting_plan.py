@@ -0,0 +1,122 @@
+# frappe-bench/apps/cat_laser/cat_laser/utils/cutting_plan.py
+
+# Tăng khi thay đổi cấu trúc dữ liệu kết quả lưu trên Cutting Request
+PLAN_VERSION = 2
+
+
+# ===================================================================
+# Kết quả có cấu trúc của GĐ 2
+# ===================================================================
+def build_cutting_plan(
+    length,
+    piece_names,
+    segment_sizes,
+    demands,
+    matrix,
+    waste,
+    bundles,
+    pos_factors,
+    solver_stats=None,
+    stocks=None,
+    pattern_stock=None,
+):
+    """
+    Dựng kết quả có cấu trúc từ ma trận số bó (n_patterns x len(pos_factors)).
+    Chỉ giữ các pattern được dùng, sắp xếp theo số cây giảm dần.
+    Nhiều loại cây: `stocks` (normalize_stocks) và `pattern_stock` (loại cây của từng pattern).
+
+    Trả về dict (lưu được dạng JSON):
+      - patterns: số đoạn mỗi kích thước, số bó theo hệ số, số cây, hao hụt
+      - sizes: số lượng cần / đã cắt / dư cho từng kích thước
+      - totals: tổng số cây, số bó, hao hụt
+      - stocks: số cây, hao hụt theo từng loại cây
+      - solver: trạng thái, gap... của CP-SAT (nếu có)
+    """
+    # NumPy chỉ cần khi dựng kết quả; format_* được controller dùng mà không kéo NumPy theo
+    import numpy as np
+
+    A = np.asarray(matrix, dtype=np.int64)
+    waste = np.asarray(waste, dtype=float)
+    bundles = np.asarray(bundles, dtype=np.int64).reshape(len(A), len(pos_factors))
+    factors = np.asarray(pos_factors, dtype=np.int64)
+    demands = np.asarray(demands, dtype=np.int64)
+    if stocks is None:
+        stocks = [{"length": float(length), "cost": 1.0, "available": None}]
+    pattern_stock = (
+        np.zeros(len(A), dtype=np.int64) if pattern_stock is None else np.asarray(pattern_stock, dtype=np.int64)
+    )
+    stock_length = np.array([s["length"] for s in stocks], dtype=float)[pattern_stock]
+
+    bars = bundles @ factors
+    produced = bars @ A if len(A) else np.zeros(len(demands), dtype=np.int64)
+
+    patterns = []
+    for j in sorted(np.flatnonzero(bars), key=lambda j: (-bars[j], waste[j], j)):
+        cuts = [
+            {"size": int(i), "item_name": piece_names[i], "length": float(segment_sizes[i]), "qty": int(A[j, i])}
+            for i in np.flatnonzero(A[j])
+        ]
+        patterns.append({
+            "stock_length": float(stock_length[j]),
+            "cuts": cuts,
+            "bundles": [
+                {"factor": int(f), "count": int(c)} for f, c in zip(factors, bundles[j], strict=True) if c > 0
+            ],
+            "bars": int(bars[j]),
+            "bundle_count": int(bundles[j].sum()),
+            "used_length": float(stock_length[j] - waste[j]),
+            "waste_per_bar": float(waste[j]),
+            "total_waste": float(waste[j] * bars[j]),
+        })
+
+    sizes = [
+        {
+            "item_name": piece_names[i],
+            "length": float(segment_sizes[i]),
+            "demand": int(demands[i]),
+            "produced": int(produced[i]),
+            "surplus": int(produced[i] - demands[i]),
+        }
+        for i in range(len(demands))
+    ]
+
+    total_bars = int(bars.sum())
+    total_waste = float((bars * waste).sum())
+    total_length = float((bars * stock_length).sum())
+    stock_bars = np.bincount(pattern_stock, weights=bars, minlength=len(stocks))
+    stock_waste = np.bincount(pattern_stock, weights=bars * waste, minlength=len(stocks))
+    return {
+        "version": PLAN_VERSION,
+        "stock_length": float(length),
+        "patterns": patterns,
+        "sizes": sizes,
+        "totals": {
+            "bars": total_bars,
+            "bundles": int(bundles.sum()),
+            "waste": total_waste,
+            "waste_percent": total_waste / total_length * 100 if total_length else 0.0,
+            "surplus": int((produced - demands).sum()),
+        },
+        "stocks": [
+            dict(s, bars=int(stock_bars[k]), waste=float(stock_waste[k]))
+            for k, s in enumerate(stocks)
+        ],
+        "solver": dict(solver_stats or {}),
+    }
+
+
+def format_cuts(cuts):
+    """Vd: "2 x 1500 + 1 x 2000" """
+    return " + ".join(f"{c['qty']} x {c['length']:g}" for c in cuts)
+
+
+def format_bundles(bundles):
+    """Vd: "3 bó x 10 + 1 bó x 5" """
+    return " + ".join(f"{b['count']} bó x {b['factor']}" for b in bundles)
+
+
+def format_allocated(allocated):
+    """Phần của một đơn trong pattern cắt chung (giải gộp), vd: "12 x 1500 + 4 x 2000" """
+    if not allocated:
+        return None
+    return " + ".join(f"{a['pieces']} x {a['length']:g}" for a in allocated)
@@ -0,0 +1,5 @@
+# frappe-bench/apps/cat_laser/cat_laser/utils/exceptions.py
+
+
+class OptimizationCancelled(Exception):
+    """Người dùng yêu cầu hủy trong lúc đang giải."""
@@ -0,0 +1,81 @@
+# frappe-bench/apps/cat_laser/cat_laser/utils/file_store.py
+import fcntl
+import hashlib
+import json
+from contextlib import contextmanager
+from pathlib import Path
+
+from cat_laser.utils.site import current_site, local_cache_dir
+
+
+# ===================================================================
+# Phần chung của các kho cache trên đĩa: khóa theo hash, khóa file, LRU
+# ===================================================================
+class FileStore:
+    """
+    Thư mục cache dùng chung giữa nhiều process (khóa fcntl trên `<root>/.lock`).
+    Lớp con đặt KEY_PREFIX / SCHEMA_VERSION, liệt kê entry qua `_entries()` -> (path, mtime, size)
+    và quyết định khi nào phải xóa bớt qua `_over_limit(count, total_bytes)`.
+    """
+
+    KEY_PREFIX = ""
+    SCHEMA_VERSION = 1
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock_path = self.root / ".lock"
+
+    @classmethod
+    def make_key(cls, payload):
+        data = dict(payload, schema_version=cls.SCHEMA_VERSION)
+        s = json.dumps(data, sort_keys=True, ensure_ascii=False)
+        return f"{cls.KEY_PREFIX}{cls.SCHEMA_VERSION}_{hashlib.sha256(s.encode('utf-8')).hexdigest()}"
+
+    @contextmanager
+    def _lock(self, shared=False):
+        with open(self._lock_path, "a+") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _entries(self):
+        raise NotImplementedError
+
+    def _over_limit(self, count, total_bytes):
+        raise NotImplementedError
+
+    def _remove(self, path):
+        raise NotImplementedError
+
+    def _evict(self):
+        """Xóa entry ít dùng nhất (mtime cũ nhất) đến khi về trong giới hạn; luôn giữ entry mới nhất."""
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        count = len(entries)
+        total = sum(size for _, _, size in entries)
+        for path, _, size in entries[:-1]:
+            if not self._over_limit(count, total):
+                break
+            self._remove(path)
+            count -= 1
+            total -= size
+
+    def clear(self):
+        with self._lock():
+            for path, _, _ in list(self._entries()):
+                self._remove(path)
+
+
+def site_cache_root(name, conf_key, site_dir):
+    """
+    (thư mục, site_config) cho một kho cache:
+      - trong Frappe: site_config[conf_key] hoặc private/files/<site_dir> của site
+      - ngoài Frappe: local_cache_dir(name), site_config rỗng
+    """
+    frappe = current_site()
+    if frappe is None:
+        return local_cache_dir(name), {}
+    conf = frappe.conf or {}
+    return conf.get(conf_key) or frappe.get_site_path("private", "files", site_dir), conf
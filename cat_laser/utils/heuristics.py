@@ -0,0 +1,288 @@
+# frappe-bench/apps/cat_laser/cat_laser/utils/heuristics.py
+import numpy as np
+
+
+# ===================================================================
+# Chia số cây thành bó (coin change)
+# ===================================================================
+def min_bundle_table(max_bars, factors):
+    """
+    best[k]: số bó ít nhất để có đúng k cây từ các hệ số `factors`, -1 nếu không thể.
+    choice[k]: hệ số của bó cuối cùng trong cách chia tối ưu.
+    """
+    factors = sorted({int(f) for f in factors if f > 0}, reverse=True)
+    inf = np.iinfo(np.int64).max // 2
+    best = np.full(max_bars + 1, inf, dtype=np.int64)
+    choice = np.zeros(max_bars + 1, dtype=np.int64)
+    best[0] = 0
+    for k in range(1, max_bars + 1):
+        for f in factors:
+            if f <= k and best[k - f] + 1 < best[k]:
+                best[k] = best[k - f] + 1
+                choice[k] = f
+    best[best == inf] = -1
+    return best, choice
+
+
+def decompose_bars(k, choice):
+    """Tách k cây thành {hệ số: số bó} theo bảng choice của min_bundle_table."""
+    out = {}
+    while k > 0:
+        f = int(choice[k])
+        out[f] = out.get(f, 0) + 1
+        k -= f
+    return out
+
+
+def remainder_bundle_table(max_bars, factors):
+    """
+    Bảng coin change rút gọn: k cây = q bó F cây (F = hệ số lớn nhất) + phần dư r <= R cây,
+    với R nhỏ nhất sao cho min_q (q + best[r]) bằng số bó ít nhất của mọi k <= max_bars.
+    Trả về (F, best[:R + 1], choice[:R + 1]); phần dư không chia bó được có best = -1.
+    """
+    best, choice = min_bundle_table(max_bars, factors)
+    F = max(int(f) for f in factors if f > 0)
+    reachable = np.flatnonzero(best >= 0).tolist()
+    for R in range(min(F - 1, max_bars), max_bars + 1):
+        small = best[: R + 1]
+        if all(
+            (qr := split_bars(k, F, small)) is not None and qr[0] + small[qr[1]] == best[k]
+            for k in reachable
+        ):
+            return F, small, choice[: R + 1]
+    return F, best, choice
+
+
+def split_bars(k, F, best):
+    """(q, r) với k = q * F + r, r trong bảng `best` và q + best[r] nhỏ nhất (ưu tiên q lớn)."""
+    R = len(best) - 1
+    out = None
+    for q in range(k // F, max(0, -(-(k - R) // F)) - 1, -1):
+        r = k - q * F
+        if best[r] >= 0 and (out is None or q + best[r] < out[0] + best[out[1]]):
+            out = (q, r)
+    return out
+
+
+def rebundle(bundles, pos_factors):
+    """
+    Chia lại số cây của từng pattern thành ít bó nhất, giữ nguyên số cây và số bó 1 cây
+    (cắt tay); pattern không chia lại được thì giữ nguyên.
+    """
+    bundles = np.array(bundles, dtype=np.int64)
+    factors = [f for f in pos_factors if f != 1]
+    if not factors or not len(bundles):
+        return bundles
+    col = {f: k for k, f in enumerate(pos_factors)}
+    ones = bundles[:, col[1]].copy() if 1 in col else np.zeros(len(bundles), dtype=np.int64)
+    rest = bundles @ np.array(pos_factors, dtype=np.int64) - ones
+    best, choice = min_bundle_table(int(rest.max()), factors)
+    for j in np.flatnonzero(rest > 0):
+        k = int(rest[j])
+        if best[k] < 0 or best[k] >= bundles[j].sum() - ones[j]:
+            continue
+        bundles[j] = 0
+        if 1 in col:
+            bundles[j, col[1]] = ones[j]
+        for f, cnt in decompose_bars(k, choice).items():
+            bundles[j, col[f]] += cnt
+    return bundles
+
+
+# ===================================================================
+# Heuristic tham lam cho GĐ 2
+# ===================================================================
+# Giới hạn quay lui: số bước tối đa và tổng số ô ma trận pattern được duyệt
+GREEDY_MAX_NODES = 1000
+GREEDY_MAX_CELLS = 2_000_000
+
+
+def _greedy_moves(A, waste_order, demands, caps, best, next_total, fit_first, bars, produced):
+    """Các bước (pattern, số cây thêm) theo thứ tự ưu tiên của heuristic tại trạng thái hiện tại."""
+    support = A > 0
+    safe_A = np.where(support, A, 1)
+    big = np.iinfo(np.int64).max
+    need = np.maximum(demands - produced, 0)
+    room = caps - produced
+    k_max = np.where(support, room // safe_A, big).min(axis=1)
+    k_need = np.where(support & (need > 0), -(-need // safe_A), 0).max(axis=1)
+    # Chỉ xét pattern còn thêm được số cây chia được thành bó mà không vượt trần
+    useful = (support & (need > 0)).any(axis=1) & (next_total[bars] - bars <= k_max)
+
+    candidates = []
+    if fit_first:
+        # Ưu tiên pattern dùng được mà không sinh dư so với nhu cầu còn lại
+        k_fit = np.where(support, need // safe_A, big).min(axis=1)
+        fit = useful & (k_fit >= 1)
+        candidates.append((waste_order[fit[waste_order]], k_fit))
+    candidates.append((waste_order[useful[waste_order]], np.minimum(k_need, k_max)))
+
+    seen = set()
+    for idx, k_target in candidates:
+        for j in idx:
+            # Chỉnh k để tổng số cây của pattern chia được thành bó
+            k = _bundleable_step(best, int(bars[j]), int(k_target[j]), int(k_max[j]))
+            if k is not None and (j, k) not in seen:
+                seen.add((j, k))
+                yield j, k
+
+
+def _greedy_bars(A, waste_order, demands, caps, best, fit_first, start=None, max_nodes=None):
+    """
+    Tham lam theo _greedy_moves; khi bế tắc (mọi bước đều vượt demand + max_stock_over hoặc
+    không chia được bó) thì quay lui thử bước kế tiếp, tối đa `max_nodes` bước
+    (mặc định theo kích thước A để heuristic vẫn chạy trong vài chục ms).
+    """
+    if max_nodes is None:
+        max_nodes = min(GREEDY_MAX_NODES, max(50, GREEDY_MAX_CELLS // max(A.size, 1)))
+    bars = np.zeros(A.shape[0], dtype=np.int64) if start is None else start.copy()
+    produced = bars @ A
+    # next_total[c]: số cây nhỏ nhất > c chia được thành bó
+    valid = np.flatnonzero(best >= 0)
+    next_total = np.append(valid, np.iinfo(np.int64).max // 2)[
+        np.searchsorted(valid, np.arange(len(best)), side="right")
+    ]
+
+    def moves():
+        return _greedy_moves(A, waste_order, demands, caps, best, next_total, fit_first, bars, produced)
+
+    picks = []
+    stack = [moves()]
+    nodes = 0
+    while (produced < demands).any():
+        move = next(stack[-1], None)
+        if move is None:
+            stack.pop()
+            if not picks:
+                return None
+            j, k = picks.pop()
+            bars[j] -= k
+            produced -= k * A[j]
+            continue
+        nodes += 1
+        if nodes > max_nodes:
+            return None
+        j, k = move
+        bars[j] += k
+        produced += k * A[j]
+        picks.append(move)
+        stack.append(moves())
+    return bars
+
+
+def _bundleable_step(best, current, k, k_max):
+    """
+    Số cây thêm vào pattern (1..k_max) gần k nhất sao cho tổng số cây chia được thành bó,
+    ưu tiên thêm nhiều hơn khi cách đều; None nếu không có.
+    """
+    if k_max < 1:
+        return None
+    steps = np.flatnonzero(best[current + 1 : current + k_max + 1] >= 0) + 1
+    if not len(steps):
+        return None
+    return int(steps[np.lexsort((steps < k, np.abs(steps - k)))[0]])
+
+
+def greedy_bundle_plan(matrix, waste, demands, max_stock_over, pos_factors, max_manual_cuts=0):
+    """
+    Dựng nhanh một phương án khả thi: lần lượt chọn pattern hao hụt thấp nhất còn giúp
+    đáp ứng nhu cầu (trước hết là pattern không sinh dư), dùng nó cho tới khi đủ số lượng
+    các kích thước trong pattern (không vượt quá demand + max_stock_over),
+    rồi chia số cây mỗi pattern thành bó.
+
+    Trả về ma trận số bó (n_patterns x len(pos_factors)) hoặc None nếu không tìm được.
+    """
+    A = np.asarray(matrix, dtype=np.int64)
+    if A.shape[0] == 0:
+        return None
+    demands = np.asarray(demands, dtype=np.int64)
+    caps = demands + int(max_stock_over)
+    table = _bundle_table(caps, pos_factors, max_manual_cuts)
+    if table is None:
+        return None
+    best, choice = table
+
+    waste = np.asarray(waste, dtype=float)
+    bars = _best_greedy(A, waste, demands, caps, best)
+    if bars is None:
+        return None
+    return _to_bundles(bars, choice, pos_factors, max_manual_cuts)
+
+
+def repair_bundle_plan(matrix, waste, demands, max_stock_over, pos_factors, start_bars, max_manual_cuts=0):
+    """
+    Chỉnh phương án cũ (số cây `start_bars` của từng pattern) cho nhu cầu mới, giữ nguyên
+    càng nhiều pattern càng tốt: bớt cây ở các pattern hao hụt cao nhất khi vượt
+    demand + max_stock_over, rồi bù phần còn thiếu bằng heuristic tham lam.
+
+    Trả về ma trận số bó (n_patterns x len(pos_factors)) hoặc None nếu không sửa được.
+    """
+    A = np.asarray(matrix, dtype=np.int64)
+    if A.shape[0] == 0:
+        return None
+    demands = np.asarray(demands, dtype=np.int64)
+    caps = demands + int(max_stock_over)
+    table = _bundle_table(caps, pos_factors, max_manual_cuts)
+    if table is None:
+        return None
+    best, choice = table
+    waste = np.asarray(waste, dtype=float)
+
+    # Số cây phải chia được thành bó: lùi về số gần nhất chia được
+    bars = np.minimum(np.asarray(start_bars, dtype=np.int64), len(best) - 1)
+    for j in np.flatnonzero(bars):
+        while bars[j] > 0 and best[bars[j]] < 0:
+            bars[j] -= 1
+
+    # Vượt trần: bớt cây ở pattern hao hụt cao nhất có chứa kích thước bị vượt
+    produced = bars @ A
+    while (produced > caps).any():
+        i = int(np.argmax(produced - caps))
+        js = np.flatnonzero((A[:, i] > 0) & (bars > 0))
+        j = int(js[np.argmax(waste[js])])
+        k = bars[j] - 1
+        while k > 0 and best[k] < 0:
+            k -= 1
+        produced -= (bars[j] - k) * A[j]
+        bars[j] = k
+
+    if (produced < demands).any():
+        bars = _best_greedy(A, waste, demands, caps, best, start=bars)
+        if bars is None:
+            return None
+    return _to_bundles(bars, choice, pos_factors, max_manual_cuts)
+
+
+def _bundle_table(caps, pos_factors, max_manual_cuts):
+    # Không còn lượt cắt tay thì không được dùng bó 1 cây
+    allow_one = max_manual_cuts > 0
+    usable = [f for f in pos_factors if f != 1 or allow_one]
+    if not usable:
+        return None
+    max_bars = int(caps.max()) + max(usable)
+    return min_bundle_table(max_bars, usable)
+
+
+def _best_greedy(A, waste, demands, caps, best, start=None):
+    order = np.argsort(waste, kind="stable")
+    plans = []
+    for fit_first in (True, False):
+        bars = _greedy_bars(A, order, demands, caps, best, fit_first, start=start)
+        if bars is not None:
+            plans.append(bars)
+    if not plans:
+        return None
+    return min(plans, key=lambda x: (float((x * waste).sum()), int(best[x].sum())))
+
+
+def _to_bundles(bars, choice, pos_factors, max_manual_cuts):
+    n = len(bars)
+    bundles = np.zeros((n, len(pos_factors)), dtype=np.int64)
+    col = {f: r for r, f in enumerate(pos_factors)}
+    for j in np.flatnonzero(bars):
+        for f, cnt in decompose_bars(int(bars[j]), choice).items():
+            bundles[j, col[f]] += cnt
+
+    if 1 in col and bundles[:, col[1]].sum() > max_manual_cuts:
+        return None
+    return bundles
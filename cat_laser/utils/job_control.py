@@ -0,0 +1,126 @@
+# frappe-bench/apps/cat_laser/cat_laser/utils/job_control.py
+import hashlib
+import time
+from contextlib import contextmanager
+
+import frappe
+from frappe.utils.background_jobs import get_job, get_queues_timeout, is_job_enqueued
+
+from cat_laser.utils.exceptions import OptimizationCancelled
+
+# Hàng đợi riêng cho bộ tối ưu (khai báo trong common_site_config: "workers")
+OPTIMIZE_QUEUE = "cat_laser_optimize"
+FALLBACK_QUEUE = "long"
+JOB_TIMEOUT = 3000
+DEFAULT_MAX_CONCURRENT = 2
+
+CANCEL_TTL = 3600
+SLOT_POLL_SECONDS = 5
+
+
+# ===================================================================
+# Hàng đợi, job_id và chống chạy trùng
+# ===================================================================
+def optimize_queue():
+    """Dùng hàng đợi riêng nếu đã khai báo worker cho nó, nếu không thì dùng 'long'."""
+    return OPTIMIZE_QUEUE if OPTIMIZE_QUEUE in get_queues_timeout() else FALLBACK_QUEUE
+
+
+def optimize_job_id(doc_name):
+    # Frappe tự thêm tên site vào job_id nên mỗi site có không gian riêng
+    return f"cat_laser_optimize::{doc_name}"
+
+
+def batch_job_id(doc_names):
+    digest = hashlib.sha1("\n".join(sorted(doc_names)).encode("utf-8")).hexdigest()[:16]
+    return f"cat_laser_batch::{digest}"
+
+
+def _batch_of_key(doc_name):
+    return f"cat_laser_batch_of::{doc_name}"
+
+
+def register_batch(job_id, doc_names):
+    """Ghi nhớ job gộp của từng document để hủy / kiểm tra trùng theo doc_name."""
+    for name in doc_names:
+        frappe.cache.set_value(_batch_of_key(name), job_id, expires_in_sec=JOB_TIMEOUT)
+
+
+def unregister_batch(doc_names):
+    for name in doc_names:
+        frappe.cache.delete_value(_batch_of_key(name))
+
+
+def _job_id_of(doc_name):
+    return frappe.cache.get_value(_batch_of_key(doc_name)) or optimize_job_id(doc_name)
+
+
+def is_optimization_enqueued(doc_name):
+    return is_job_enqueued(_job_id_of(doc_name))
+
+
+def get_optimization_job(doc_name):
+    try:
+        return get_job(_job_id_of(doc_name))
+    except Exception:
+        return None
+
+
+# ===================================================================
+# Hủy: cờ trong redis cache, job đang chạy kiểm tra mỗi giây
+# ===================================================================
+def _cancel_key(doc_name):
+    return f"cat_laser_cancel::{doc_name}"
+
+
+def request_cancel(doc_name):
+    frappe.cache.set_value(_cancel_key(doc_name), 1, expires_in_sec=CANCEL_TTL)
+
+
+def clear_cancel(doc_name):
+    frappe.cache.delete_value(_cancel_key(doc_name))
+
+
+def is_cancel_requested(doc_name):
+    return bool(frappe.cache.get_value(_cancel_key(doc_name)))
+
+
+# ===================================================================
+# Giới hạn số lượt giải đồng thời trên mỗi site
+# ===================================================================
+def max_concurrent_solves():
+    return int(frappe.conf.get("cat_laser_max_concurrent_solves") or DEFAULT_MAX_CONCURRENT)
+
+
+@contextmanager
+def solve_slot(doc_name, log=None, should_stop=None):
+    """
+    Chờ tới khi số lượt giải đang chạy trên site < cat_laser_max_concurrent_solves.
+    Mỗi lượt là một phần tử (doc_name, thời điểm bắt đầu) trong sorted set của redis;
+    phần tử cũ hơn JOB_TIMEOUT bị bỏ qua nên worker chết giữa chừng không giữ chỗ mãi.
+    """
+    cache = frappe.cache
+    key = cache.make_key("cat_laser_active_solves")
+    limit = max_concurrent_solves()
+    waiting_logged = False
+
+    while True:
+        now = time.time()
+        cache.zremrangebyscore(key, "-inf", now - JOB_TIMEOUT)
+        # Giữ chỗ trước rồi mới đếm: 2 job cùng lúc có thể cùng phải chờ, nhưng không bao giờ vượt giới hạn
+        cache.zadd(key, {doc_name: now})
+        if cache.zcard(key) <= limit:
+            break
+        cache.zrem(key, doc_name)
+        if should_stop is not None and should_stop():
+            raise OptimizationCancelled("Đã hủy tối ưu theo yêu cầu.")
+        if log and not waiting_logged:
+            log(f"⏳ Đang có {limit} lượt tối ưu chạy trên hệ thống, chờ tới lượt...")
+            waiting_logged = True
+        time.sleep(SLOT_POLL_SECONDS)
+
+    try:
+        yield
+    finally:
+        cache.zrem(key, doc_name)
+
@@ -1,47 +1,111 @@
 # frappe-bench/apps/cat_laser/cat_laser/utils/optimization.py
-import os
-import json
-import pickle
-import hashlib
-from pathlib import Path
 import numpy as np
-import pandas as pd  
-from collections import Counter
 import time
 import threading
+import contextvars
 from datetime import datetime
-import frappe
 
 # OR-Tools CP-SAT
 from ortools.sat.python import cp_model
 
+from cat_laser.utils.column_generation import ColumnGenerator
+from cat_laser.utils.constants import (
+    ENUMERATOR_CPSAT,
+    ENUMERATOR_NUMPY,
+    PATTERN_MODE_COLUMN_GENERATION,
+    PATTERN_MODE_ENUMERATION,
+    PHASE2_MODEL_BUNDLES,
+    PHASE2_MODEL_COMPACT,
+)
+from cat_laser.utils.exceptions import OptimizationCancelled
+from cat_laser.utils.cutting_plan import build_cutting_plan
+from cat_laser.utils.heuristics import (
+    decompose_bars,
+    greedy_bundle_plan,
+    rebundle,
+    remainder_bundle_table,
+    repair_bundle_plan,
+    split_bars,
+)
+from cat_laser.utils.pattern_cache import (
+    PatternCacheStore,
+    canonical_sizes,
+    get_default_store,
+    match_columns,
+    project_patterns,
+    size_key,
+)
+from cat_laser.utils.pattern_enum import enumerate_parallel
+from cat_laser.utils.pattern_reduction import reduce_patterns
+from cat_laser.utils.pattern_set import COUNT_DTYPE, PatternSet, row_keys
+from cat_laser.utils.progress import CallbackProgress
+from cat_laser.utils.scaling import LengthScale, integer_coefficients
+from cat_laser.utils.stocks import normalize_stocks
+from cat_laser.utils.result_cache import (
+    RESULT_CACHE_IMPROVE,
+    RESULT_CACHE_OFF,
+    RESULT_CACHE_REUSE,
+    ResultCacheStore,
+    get_default_result_store,
+)
+
+# Số kích thước mới tối đa để dùng lại cache của tập con (chỉ liệt kê phần chênh lệch)
+MAX_MISSING_SIZES = 3
+
+# Khoảng hao hụt mặc định của GĐ 1: chỉ nhận pattern dùng từ 99% chiều dài cây
+DEFAULT_WASTE_WINDOW = 0.01
+# GĐ 2 theo thứ tự ưu tiên: phần time_limit dành riêng cho bước 2 (tối thiểu số bó);
+# bước 1 chạy tối đa phần còn lại, bước 2 dùng hết thời gian bước 1 chưa dùng
+LEXICOGRAPHIC_BUNDLE_SHARE = 0.2
+# Dưới giới hạn thời gian này GĐ 2 tắt probing của CP-SAT: trên mô hình nhiều biến bó, probing
+# trong presolve có thể chạy hết gần như toàn bộ thời gian (không theo deterministic time limit)
+# và trả về UNKNOWN dù đã có hint khả thi
+PHASE2_PROBING_MIN_SECONDS = 60
+# Nhiều loại cây, heuristic bế tắc: tổng thời gian giải riêng từng loại cây để khởi động,
+# tính theo phần của time_limit (trừ vào thời gian của lượt giải chính)
+SINGLE_STOCK_WARM_START_SHARE = 0.4
+
+# Chế độ tự nới: các khoảng hao hụt lần lượt thử thêm sau khoảng cấu hình
+ADAPTIVE_WINDOWS = (0.02, 0.05)
+# Ngân sách pattern mỗi lượt tự nới (tối đa max_patterns): tập lớn làm GĐ 2 khó tìm nghiệm
+# trong thời gian cho phép, tập nhỏ + pattern giữ lại từ lượt trước cho kết quả tốt hơn
+ADAPTIVE_PATTERN_BUDGET = 250
+# Gap của GĐ 2 vẫn trên ngưỡng này thì coi là chưa đủ tốt, nới khoảng hao hụt
+ADAPTIVE_MAX_GAP = 0.05
+
 
 # ===================================================================
-# Lớp Timer (Sửa để Broadcast user=None)
+# Lớp Timer: báo tiến độ mỗi giây qua notify
 # ===================================================================
 class SolverTimer(threading.Thread):
-    def __init__(self, total_time, user_to_notify):
+    def __init__(self, total_time, user_to_notify, on_tick=None, notify=None):
         super().__init__()
         self.total_time = total_time
         self.user_to_notify = user_to_notify
+        self.on_tick = on_tick
+        self.notify = notify
         self.stop_event = threading.Event()
         self.start_time = None
         self.daemon = True
+        # Chạy tick trong context của thread tạo timer (frappe.local: site, kết nối redis...)
+        self._context = contextvars.copy_context()
 
     def run(self):
+        self._context.run(self._loop)
+
+    def _loop(self):
         self.start_time = time.time()
         while not self.stop_event.is_set():
             elapsed = int(time.time() - self.start_time)
             if elapsed > self.total_time:
                 break
-            
-            # === SỬA: user=None để Broadcast ===
-            frappe.publish_realtime(
-                "cutting_log", 
-                {'message': f"⏳ Đang chạy: {elapsed}/{int(self.total_time)}s"}, 
-                user=None 
-            )
-            time.sleep(1)
+
+            if self.notify is not None:
+                self.notify(f"⏳ Đang chạy: {elapsed}/{int(self.total_time)}s")
+            if self.on_tick is not None:
+                self.on_tick()
+            # Chờ theo event để stop() có hiệu lực ngay, không đợi hết giây
+            self.stop_event.wait(1)
 
     def stop(self):
         self.stop_event.set()
@@ -51,6 +115,17 @@ class SolverTimer(threading.Thread):
 # GIAI ĐOẠN 1: Thu thập nghiệm
 # =========================================================
 class SolutionAndLogCollector(cp_model.CpSolverSolutionCallback):
+    """
+    Ghi thẳng mỗi nghiệm vào bộ đệm NumPy cấp phát sẵn (nhân đôi khi đầy), loại trùng qua
+    hash 64-bit của dòng thay vì giữ tuple của từng pattern.
+    Có `max_kept` thì chỉ giữ `max_kept` pattern hao hụt thấp nhất: bộ đệm đầy (2 x max_kept)
+    được thu gọn về top-K và nghiệm tệ hơn pattern thứ K bị bỏ ngay, nên bộ nhớ GĐ 1
+    bị chặn bởi max_kept thay vì số nghiệm tối đa `accept_at_most`.
+    Chỉ sắp xếp 1 lần khi lấy kết quả (patterns).
+    """
+
+    INITIAL_CAPACITY = 1024
+
     def __init__(
         self,
         vars_x,
@@ -59,57 +134,167 @@ class SolutionAndLogCollector(cp_model.CpSolverSolutionCallback):
         scale,
         length,
         te_dau_sat,
-        exclude_set,
+        exclude,
         user_to_notify,
         accept_at_most=1000,
         print_every=100,
+        notify=None,
+        max_kept=None,
     ):
         super().__init__()
         self._vars_x = vars_x
-        self._seg_scaled = seg_scaled
-        self._blade_scaled = blade_scaled
+        # Chiều dài đã scale của mỗi đoạn kèm lưỡi cắt: 1 phép nhân vô hướng cho mỗi nghiệm
+        self._weights = np.asarray(seg_scaled, dtype=np.int64) + int(blade_scaled)
         self._scale = scale
         self._length = length
         self._te = te_dau_sat
-        self._exclude = exclude_set 
         self._user_to_notify = user_to_notify
-        self._seen = set()
-        self._solutions = [] 
+        self._notify = notify
         self._accept_at_most = accept_at_most
+        self._max_kept = int(max_kept) if max_kept else None
         self._print_every = max(1, print_every)
-        self._cnt = 0
+        # Số nghiệm hợp lệ đã nhận (kể cả nghiệm bị bỏ vì ngoài top-K)
+        self.found = 0
         self._start = time.time()
 
-    def on_solution_callback(self):
-        x = [int(self.Value(v)) for v in self._vars_x]
-        key = tuple(x)
+        # Hash các pattern đã có từ trước (cache, tập con...): không nhận lại
+        self._exclude = set()
+        if exclude is not None:
+            self._exclude = {hash(key.tobytes()) for key in row_keys(np.asarray(exclude, dtype=COUNT_DTYPE))}
 
-        if key in self._seen or key in self._exclude:
+        capacity = min(int(accept_at_most), self.INITIAL_CAPACITY)
+        if self._max_kept:
+            capacity = min(capacity, 2 * self._max_kept)
+        self._matrix = np.empty((max(capacity, 1), len(vars_x)), dtype=COUNT_DTYPE)
+        self._used = np.empty(len(self._matrix), dtype=np.float64)
+        self._hash = np.empty(len(self._matrix), dtype=np.int64)
+        self._size = 0
+        self._seen = set()
+        # Chiều dài sử dụng của pattern thứ K sau lần thu gọn gần nhất: nghiệm kém hơn bị bỏ ngay
+        self._threshold = -np.inf
+        self._result = None
+
+    def on_solution_callback(self):
+        # Các worker CP-SAT có thể còn báo nghiệm sau StopSearch(): bộ đệm đã đủ accept_at_most dòng
+        if self.found >= self._accept_at_most:
+            return
+        x = np.fromiter((self.Value(v) for v in self._vars_x), dtype=COUNT_DTYPE, count=len(self._vars_x))
+        key = hash(x.tobytes())
+        if key in self._exclude or key in self._seen:
             return
 
-        sum_x = sum(x)
-        obj_scaled = sum(self._seg_scaled[i] * x[i] for i in range(len(x))) + self._blade_scaled * sum_x
-        obj_value = obj_scaled / self._scale
+        obj_value = int(x @ self._weights) / self._scale
 
-        self._solutions.append((obj_value, x))
-        self._seen.add(key)
+        # Chừa phần tề đầu sắt
+        if obj_value + self._te > self._length:
+            return
 
-        self._cnt += 1
-        if self._cnt % self._print_every == 0:
+        self.found += 1
+        if self.found % self._print_every == 0 and self._notify is not None:
             hao_hut = self._length - obj_value
-            # === SỬA: user=None để Broadcast ===
-            frappe.publish_realtime(
-                'cutting_log',
-                {'message': f"👉 Tìm thấy pattern {self._cnt}: Hao hụt {hao_hut}mm"},
-                user=None
-            )
+            self._notify(f"👉 Tìm thấy pattern {self.found}: Hao hụt {hao_hut}mm")
+
+        if obj_value >= self._threshold:
+            if self._size == len(self._matrix):
+                self._make_room()
+            self._matrix[self._size] = x
+            self._used[self._size] = obj_value
+            self._hash[self._size] = key
+            self._size += 1
+            self._seen.add(key)
+            self._result = None
 
-        if len(self._solutions) >= self._accept_at_most:
+        if self.found >= self._accept_at_most:
             self.StopSearch()
 
+    def _make_room(self):
+        if self._max_kept and self._size >= 2 * self._max_kept:
+            # Thu gọn về top-K theo hao hụt (ổn định: nghiệm tìm thấy trước được ưu tiên khi bằng nhau)
+            keep = np.sort(np.argsort(-self._used[: self._size], kind="stable")[: self._max_kept])
+            self._size = len(keep)
+            self._matrix[: self._size] = self._matrix[keep]
+            self._used[: self._size] = self._used[keep]
+            self._hash[: self._size] = self._hash[keep]
+            self._seen = set(self._hash[: self._size].tolist())
+            self._threshold = float(self._used[: self._size].min())
+            return
+        capacity = min(2 * len(self._matrix), max(int(self._accept_at_most), 1))
+        if self._max_kept:
+            capacity = min(capacity, 2 * self._max_kept)
+        self._matrix = np.resize(self._matrix, (capacity, self._matrix.shape[1]))
+        self._used = np.resize(self._used, capacity)
+        self._hash = np.resize(self._hash, capacity)
+
     @property
-    def solutions(self):
-        return sorted(self._solutions, key=lambda t: t[0], reverse=True)
+    def patterns(self):
+        """PatternSet các nghiệm (top-K nếu có max_kept), sắp hao hụt tăng dần."""
+        if self._result is None:
+            found = PatternSet(self._matrix[: self._size], self._used[: self._size])
+            found = found.sort_by_used()
+            if self._max_kept:
+                found = found[: self._max_kept]
+            self._result = found
+        return self._result
+
+
+# =========================================================
+# GIAI ĐOẠN 2: Theo dõi mục tiêu & dừng sớm
+# =========================================================
+class EarlyStopCallback(cp_model.CpSolverSolutionCallback):
+    """
+    Ghi nhận mục tiêu / cận dưới của mỗi nghiệm mới và dừng tìm kiếm khi:
+      - gap tương đối <= gap_limit (phòng khi cận được cải thiện đúng lúc có nghiệm mới,
+        CP-SAT cũng tự kiểm tra qua tham số relative_gap_limit)
+      - nghiệm tốt nhất không cải thiện trong stall_seconds giây (kiểm tra bởi SolverTimer)
+    """
+
+    def __init__(self, gap_limit=None, stall_seconds=None, log=None):
+        super().__init__()
+        self._gap_limit = gap_limit
+        self._stall_seconds = stall_seconds
+        self._log = log or (lambda msg: None)
+        self._start = time.time()
+        self._last_improvement = None
+        self.best_objective = None
+        self.best_bound = None
+        self.num_solutions = 0
+        self.stop_reason = None
+        self.cancelled = False
+
+    @staticmethod
+    def relative_gap(objective, bound):
+        return abs(objective - bound) / max(abs(objective), 1.0)
+
+    def on_solution_callback(self):
+        obj = self.ObjectiveValue()
+        bound = self.BestObjectiveBound()
+        self.num_solutions += 1
+        if self.best_objective is None or obj < self.best_objective - 1e-9:
+            self.best_objective = obj
+            self._last_improvement = time.time()
+        self.best_bound = bound
+
+        gap = self.relative_gap(obj, bound)
+        if self._gap_limit is not None and gap <= self._gap_limit:
+            self._stop(f"gap {gap * 100:.3f}% <= {self._gap_limit * 100:.3f}%")
+
+    def check_stall(self):
+        if not self._stall_seconds or self._last_improvement is None or self.stop_reason:
+            return
+        idle = time.time() - self._last_improvement
+        if idle >= self._stall_seconds:
+            self._stop(f"không cải thiện trong {int(idle)}s")
+
+    def cancel(self):
+        self.cancelled = True
+        self._stop("hủy theo yêu cầu")
+
+    def _stop(self, reason):
+        if self.stop_reason:
+            return
+        self.stop_reason = reason
+        self._log(f"⏹ Dừng sớm sau {time.time() - self._start:.1f}s: {reason}")
+        self.StopSearch()
 
 
 # ===================================================================
@@ -128,9 +313,42 @@ class SteelCuttingOptimizer:
         max_manual_cuts,
         max_stock_over,
         time_limit_seconds=30.0,
-        user_to_notify=None # Mặc định None
+        user_to_notify=None, # Giữ để tương thích, không còn dùng
+        progress=None,
+        gap_limit=None,
+        stall_seconds=None,
+        pattern_mode=PATTERN_MODE_ENUMERATION,
+        enumerator=ENUMERATOR_NUMPY,
+        reduce=True,
+        top_k_per_support=20,
+        dominance_slack_ratio=0.005,
+        max_patterns=5000,
+        cache_store=None,
+        phase1_workers=1,
+        phase1_max_kept=None,
+        num_search_workers=8,
+        result_cache=None,
+        result_cache_mode=RESULT_CACHE_OFF,
+        should_stop=None,
+        stocks=None,
+        priorities=None,
+        last_segment=None,
+        previous_plan=None,
+        max_changed_patterns=None,
+        waste_window=DEFAULT_WASTE_WINDOW,
+        adaptive_window=False,
+        phase2_model=PHASE2_MODEL_BUNDLES,
+        normalize_coefficients=True,
+        on_provisional_plan=None,
     ):
-        self.length = length
+        # Các loại cây được phép dùng (normalize_stocks); mặc định chỉ 1 loại dài `length`
+        self.stocks = (
+            normalize_stocks(stocks)
+            if stocks
+            else [{"length": float(length), "cost": 1.0, "available": None}]
+        )
+        # Nhiều loại cây: self.length là cây dài nhất, mỗi pattern ghi loại cây trong patterns.stock
+        self.length = length if not stocks else max(s["length"] for s in self.stocks)
         self.te_dau_sat = te_dau_sat
         self.piece_names = piece_names
         self.segment_sizes = np.array(segment_sizes)
@@ -139,264 +357,1365 @@ class SteelCuttingOptimizer:
         self.factors = sorted(list(set(factors)), reverse=True) + [1, 0]
         self.max_manual_cuts = max_manual_cuts
         self.max_stock_over = max_stock_over
+        # Độ ưu tiên của từng item: mỗi đoạn dư bị phạt như hao hụt (độ ưu tiên x chiều dài đoạn)
+        self.priorities = np.array(priorities if priorities is not None else [0] * len(demands), dtype=np.int64)
+        self.surplus_penalty = np.maximum(self.priorities, 0) * self.segment_sizes.astype(float)
+        # Vị trí các item phải nằm ở đoạn cuối cây: tối đa 1 đoạn như vậy trên mỗi pattern
+        self.last_segment = [i for i, flag in enumerate(last_segment or []) if flag]
         self.time_limit_seconds = time_limit_seconds
-        
-        self.user_to_notify = user_to_notify 
+        self.gap_limit = gap_limit
+        self.stall_seconds = stall_seconds
 
-        self.solutions = []
-        self.solution_matrix = None
+        self.user_to_notify = user_to_notify
+        # Kênh nhận log/tiến độ: ProgressReporter trong Frappe, hoặc bất kỳ đối tượng có log()/status()
+        self.progress = progress if progress is not None else CallbackProgress()
+        self.pattern_mode = pattern_mode
+        self.enumerator = enumerator
+        self.phase2_model = phase2_model
+        # Tiền xử lý số: thang nguyên nhỏ nhất + chia GCD cho cả 2 GĐ, GĐ 2 giải theo thứ tự ưu tiên
+        # (hao hụt rồi số bó). Tắt: thang x10 cố định và mục tiêu tổng có trọng số như trước
+        self.normalize_coefficients = normalize_coefficients
+        self.reduce = reduce
+        self.top_k_per_support = top_k_per_support
+        self.dominance_slack_ratio = dominance_slack_ratio
+        self.max_patterns = max_patterns
+        self.reduction_stats = None
 
-        self.BASE_DIR = Path(__file__).resolve().parents[1]
-        self.CACHE_DIR = self.BASE_DIR / "pattern_cache"
-        self.CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Tập pattern của GĐ 1 (PatternSet: ma trận số đoạn, chiều dài sử dụng, loại cây)
+        self.patterns = None
+        self.heuristic_solution = None
+        self.phase2_stats = None
+        self.plan = None
+        self.bundle_plan = None
+        self.warm_start = None
+        self.cache_store = cache_store
+        self.phase1_workers = max(1, int(phase1_workers or 1))
+        # Số pattern tối đa giữ trong bộ nhớ khi liệt kê bằng CP-SAT (top-K theo hao hụt), None = không giới hạn
+        self.phase1_max_kept = int(phase1_max_kept) if phase1_max_kept else None
+        self.phase1_truncated = False
+        self.num_search_workers = max(1, int(num_search_workers or 1))
+        self.result_cache = result_cache
+        self.result_cache_mode = result_cache_mode or RESULT_CACHE_OFF
+        # Hàm không tham số, trả về True khi người dùng yêu cầu hủy
+        self.should_stop = should_stop
+        # Hàm nhận plan (build_cutting_plan) của phương án heuristic ngay khi có, trước khi CP-SAT chạy
+        self.on_provisional_plan = on_provisional_plan
+        # Tối ưu lại từ kết quả trước (plan của build_cutting_plan), giới hạn số pattern được đổi
+        self.previous_plan = previous_plan
+        self.max_changed_patterns = int(max_changed_patterns) if max_changed_patterns else None
+        self.previous_bars = None
+        # GĐ 1 chỉ nhận pattern có hao hụt trong khoảng waste_window x chiều dài cây.
+        # adaptive_window: bắt đầu hẹp, chỉ nới khoảng (kèm pattern từ Column Generation) khi GĐ 2
+        # không khả thi hoặc gap còn cao (chế độ Enumeration)
+        self.waste_window = float(waste_window)
+        self.adaptive_window = bool(adaptive_window)
+        self._window = self.waste_window
+        self._max_patterns = max_patterns
+        self._dominance_ratio = dominance_slack_ratio
+        # Pattern bổ sung từ Column Generation khi GĐ 2 không khả thi (chế độ tự nới)
+        self._tail_patterns = None
 
-    # --- Helper Log nội bộ (Quan trọng nhất) ---
+    # --- Helper Log nội bộ ---
     def log(self, message):
-        # === SỬA: user=None để Broadcast ===
-        frappe.publish_realtime('cutting_log', {'message': message}, user=None)
+        self.progress.log(message)
 
-    def _cache_key(self):
+    def _check_cancelled(self):
+        if self.should_stop is not None and self.should_stop():
+            raise OptimizationCancelled("Đã hủy tối ưu theo yêu cầu.")
+
+    def _status(self, message):
+        # Trạng thái tiến độ lặp lại liên tục: chỉ cần bản mới nhất
+        self.progress.status(message)
+
+    def _pattern_lengths(self):
+        """Chiều dài cây của từng pattern trong self.patterns."""
+        lengths = np.array([s["length"] for s in self.stocks], dtype=float)
+        return lengths[self.patterns.stock]
+
+    def _pattern_waste(self):
+        return self.patterns.waste(self._pattern_lengths())
+
+    def _pattern_costs(self):
+        """Giá tương đối trên 1mm hao hụt của từng pattern (theo loại cây)."""
+        costs = np.array([s["cost"] for s in self.stocks], dtype=float)
+        return costs[self.patterns.stock]
+
+    def _pattern_loss(self, matrix, waste):
+        """
+        Chi phí của 1 cây theo từng pattern ở GĐ 2: hao hụt x giá loại cây, cộng phạt các đoạn
+        ưu tiên (đoạn dư = sản lượng - nhu cầu, nhu cầu cố định nên phạt tuyến tính theo pattern).
+        """
+        return waste * self._pattern_costs() + np.asarray(matrix) @ self.surplus_penalty
+
+    def _cache_group_payload(self, window=None):
         payload = {
             "length": int(self.length),
-            "segment_sizes": list(map(float, self.segment_sizes.tolist())),
             "blade_width": float(self.blade_width),
+            "te_dau_sat": float(self.te_dau_sat),
+            "window": self._window if window is None else window,
+            "max_per_size": 30,
         }
-        s = json.dumps(payload, sort_keys=True, ensure_ascii=False)
-        return hashlib.md5(s.encode("utf-8")).hexdigest()
-
-    def _cache_path(self):
-        key = self._cache_key()
-        return self.CACHE_DIR / f"patterns_{key}.pkl"
-
-    def save_solution_to_pickle(self):
-        path = self._cache_path()
-        tmp = str(path) + ".tmp"
-        with open(tmp, "wb") as f:
-            pickle.dump(self.solutions, f, protocol=pickle.HIGHEST_PROTOCOL)
-        os.replace(tmp, path)
-
-    def cut_list(self, lst, x, length):
-        for i, (obj_value, solution) in enumerate(lst):
-            if obj_value + x <= length:
-                return lst[i:]
-        return []
-
-    def load_solution_from_pickle(self):
-        path = self._cache_path()
-        if not path.exists():
-            return []
-        try:
-            list_solutions = None
-            with open(path, "rb") as f:
-                list_solutions = pickle.load(f)
-        except Exception:
-            return []
+        if self.last_segment:
+            # Tập pattern bị giới hạn bởi quy tắc đoạn cuối: cache riêng theo các kích thước đoạn cuối
+            payload["last_segment"] = canonical_sizes(self.segment_sizes[self.last_segment].tolist())
+        return payload
+
+    def _cache_group(self):
+        return PatternCacheStore.make_key(self._cache_group_payload())
+
+    def _cache_key(self):
+        # Khóa theo danh sách kích thước đã sắp xếp: đổi thứ tự item vẫn dùng chung cache
+        payload = dict(
+            self._cache_group_payload(),
+            segment_sizes=canonical_sizes(self.segment_sizes.tolist()),
+        )
+        return PatternCacheStore.make_key(payload)
+
+    def _canonical_order(self):
+        return np.argsort(self.segment_sizes, kind="stable")
+
+    def _from_canonical(self, patterns):
+        out = np.empty_like(patterns)
+        out[:, self._canonical_order()] = patterns
+        return out
+
+    def _get_cache_store(self):
+        if self.cache_store is None:
+            self.cache_store = get_default_store()
+        return self.cache_store
+
+    def save_solution_to_cache(self, complete=True):
+        waste = self.patterns.waste(self.length)
+        patterns = self.patterns.matrix[:, self._canonical_order()]
+        meta = {
+            "group": self._cache_group(),
+            "sizes": canonical_sizes(self.segment_sizes.tolist()),
+            "complete": bool(complete),
+            "count": len(waste),
+        }
+        self._get_cache_store().save(self._cache_key(), waste, patterns, meta=meta)
+
+    def _find_cached_superset(self):
+        """Entry đầy đủ nhỏ nhất có tập kích thước chứa tập kích thước hiện tại."""
+        sizes = canonical_sizes(self.segment_sizes.tolist())
+        best = None
+        for key, meta in self._get_cache_store().find_entries(self._cache_group()):
+            if not meta.get("complete") or len(meta["sizes"]) <= len(sizes):
+                continue
+            if match_columns(meta["sizes"], sizes) is None:
+                continue
+            if best is None or meta["count"] < best[1]["count"]:
+                best = (key, meta)
+        return best
+
+    def _find_cached_subset(self):
+        """Entry đầy đủ lớn nhất có tập kích thước nằm trong tập hiện tại, thiếu ít kích thước nhất."""
+        sizes = canonical_sizes(self.segment_sizes.tolist())
+        best = None
+        for key, meta in self._get_cache_store().find_entries(self._cache_group()):
+            missing = len(sizes) - len(meta["sizes"])
+            if not meta.get("complete") or not 0 < missing <= MAX_MISSING_SIZES:
+                continue
+            if match_columns(sizes, meta["sizes"]) is None:
+                continue
+            if best is None or len(meta["sizes"]) > len(best[1]["sizes"]):
+                best = (key, meta)
+        return best
+
+    def _load_cached_subset(self):
+        """
+        Trả về (PatternSet của entry con theo thứ tự cột hiện tại, các cột còn thiếu)
+        để GĐ 1 chỉ cần liệt kê các pattern chứa kích thước mới.
+        """
+        empty = PatternSet.empty(len(self.segment_sizes))
+        found = self._find_cached_subset()
+        if found is None:
+            return empty, None
+        key, meta = found
+        cached = self._get_cache_store().load(key)
+        if cached is None:
+            return empty, None
+        waste, patterns = cached
+
+        sizes = canonical_sizes(self.segment_sizes.tolist())
+        cols = match_columns(sizes, meta["sizes"])
+        canonical = np.zeros((len(waste), len(sizes)), dtype=COUNT_DTYPE)
+        canonical[:, cols] = patterns
+        missing = sorted(set(range(len(sizes))) - set(cols))
+        require_any = [int(self._canonical_order()[c]) for c in missing]
+
+        self.log(
+            f"Dùng lại {len(waste)} patterns trong CACHE, chỉ tìm thêm pattern chứa "
+            f"{len(require_any)} kích thước mới..."
+        )
+        return PatternSet(self._from_canonical(canonical), self.length - np.asarray(waste)), require_any
+
+    def load_solution_from_cache(self):
+        store = self._get_cache_store()
+        empty = PatternSet.empty(len(self.segment_sizes))
+        cached = store.load(self._cache_key())
+        if cached is not None:
+            waste, patterns = cached
+        else:
+            found = self._find_cached_superset()
+            if found is None:
+                return empty
+            key, meta = found
+            cached = store.load(key)
+            if cached is None:
+                return empty
+            waste, patterns = project_patterns(
+                cached[0], cached[1], meta["sizes"], canonical_sizes(self.segment_sizes.tolist())
+            )
+            self.log(f"Chiếu từ CACHE của {len(meta['sizes'])} kích thước: {len(waste)} patterns phù hợp.")
+            if len(waste) == 0:
+                return empty
 
         self.log("------------------------------------------------")
-        self.log(f"ĐÃ CÓ {len(list_solutions)} NGHIỆM TRONG CACHE")
+        self.log(f"ĐÃ CÓ {len(waste)} NGHIỆM TRONG CACHE")
         self.log("------------------------------------------------")
 
-        list_solutions = self.cut_list(list_solutions, self.te_dau_sat, self.length)
+        # waste tăng dần: cắt bỏ các pattern không chừa đủ phần tề đầu sắt
+        found = PatternSet(self._from_canonical(np.asarray(patterns)), self.length - np.asarray(waste))
+        found = found[found.trim_cutoff(self.length, self.te_dau_sat):]
 
         if len(self.segment_sizes) > 5:
-            filtered = [
-                (obj_value, solution)
-                for obj_value, solution in list_solutions
-                if sum(1 for x in solution if x != 0) <= 5
-            ]
-            return filtered
+            found = found[found.count_nonzero() <= 5]
+        return found
+
+    # --- Cache kết quả cuối cùng (GĐ 1 + GĐ 2) ---
+    def _result_order(self):
+        # Thứ tự chuẩn của các item: theo (kích thước, số lượng)
+        return np.lexsort((self.demands, self.segment_sizes))
+
+    def _result_cache_key(self):
+        order = self._result_order()
+        payload = dict(
+            # Khoảng hao hụt cấu hình ban đầu (khoảng đang dùng thay đổi khi tự nới)
+            self._cache_group_payload(window=self.waste_window),
+            items=[[size_key(self.segment_sizes[i]), int(self.demands[i])] for i in order],
+            factors=sorted({int(f) for f in self.factors if f > 0}),
+            max_manual_cuts=int(self.max_manual_cuts),
+            max_stock_over=int(self.max_stock_over),
+            pattern_mode=self.pattern_mode,
+            reduce=bool(self.reduce),
+            top_k_per_support=self.top_k_per_support,
+            dominance_slack_ratio=self.dominance_slack_ratio,
+            max_patterns=self.max_patterns,
+            # Nới giới hạn solver phải giải lại chứ không trả về kết quả cũ của lần giải ngắn hơn
+            time_limit_seconds=float(self.time_limit_seconds),
+            gap_limit=self.gap_limit,
+            stall_seconds=self.stall_seconds,
+            # Mô hình / mục tiêu GĐ 2 và cách liệt kê GĐ 1 khác nhau cho phương án khác nhau
+            phase2_model=self.phase2_model,
+            normalize_coefficients=bool(self.normalize_coefficients),
+            enumerator=self.enumerator,
+        )
+        if self.last_segment or self.priorities.any():
+            payload["priorities"] = [int(self.priorities[i]) for i in order]
+            payload["last_segment"] = sorted(int(np.flatnonzero(order == i)[0]) for i in self.last_segment)
+        if len(self.stocks) > 1:
+            payload["stocks"] = [[s["length"], s["cost"], s["available"]] for s in self.stocks]
+        if self.adaptive_window:
+            payload["adaptive_window"] = True
+        return ResultCacheStore.make_key(payload)
+
+    def _get_result_store(self):
+        if self.result_cache is None:
+            self.result_cache = get_default_result_store()
+        return self.result_cache
+
+    def load_cached_result(self):
+        """Trả về kết quả đã lưu (cột theo thứ tự item hiện tại) hoặc None."""
+        entry = self._get_result_store().get(self._result_cache_key())
+        if entry is None:
+            return None
+        canonical = np.array(entry["patterns"], dtype=int).reshape(-1, len(self.segment_sizes))
+        patterns = np.empty_like(canonical)
+        patterns[:, self._result_order()] = canonical
+        return {
+            "patterns": patterns,
+            "waste": np.array(entry["waste"], dtype=float),
+            "bundles": np.array(entry["bundles"], dtype=np.int64).reshape(len(canonical), -1),
+            "stock": np.array(entry.get("stock") or [0] * len(canonical), dtype=np.int64),
+            "pos_factors": entry["pos_factors"],
+            "solver": entry.get("solver") or {},
+        }
+
+    def save_result_to_cache(self):
+        if self.bundle_plan is None:
+            return
+        pos_factors = self._pos_factors()
+        bars = self.bundle_plan @ np.array(pos_factors, dtype=np.int64)
+        used = np.flatnonzero(bars)
+        waste = self._pattern_waste()[used]
+        entry = {
+            "patterns": self.patterns.matrix[used][:, self._result_order()].tolist(),
+            "waste": waste.tolist(),
+            "bundles": self.bundle_plan[used].tolist(),
+            "stock": self.patterns.stock[used].tolist(),
+            "pos_factors": pos_factors,
+            "solver": self.phase2_stats or {},
+        }
+        self._get_result_store().set(self._result_cache_key(), entry)
+
+    def _use_cached_patterns(self, cached):
+        """
+        Đưa các pattern của kết quả đã lưu vào tập pattern hiện tại (thêm nếu thiếu)
+        và dựng phương án số bó tương ứng để GĐ 2 khởi động từ đó.
+        """
+        lengths = np.array([s["length"] for s in self.stocks], dtype=float)
+        index = self.patterns.index()
+        rows = []
+        added = []
+        for j_cached, (pattern, k) in enumerate(zip(cached["patterns"], cached["stock"], strict=True)):
+            key = PatternSet.key(pattern, k)
+            j = index.get(key)
+            if j is None:
+                j = len(self.patterns) + len(added)
+                index[key] = j
+                added.append(j_cached)
+            rows.append(j)
+        if added:
+            stock = cached["stock"][added]
+            self.patterns = self.patterns.append(
+                cached["patterns"][added], lengths[stock] - cached["waste"][added], stock
+            )
+
+        warm = np.zeros((len(self.patterns), len(cached["pos_factors"])), dtype=np.int64)
+        warm[rows] = cached["bundles"]
+        self.warm_start = warm
+        self.log(f"♻️ Khởi động GĐ 2 từ kết quả đã lưu ({len(rows)} patterns, thêm mới {len(added)}).")
+
+    def _use_previous_plan(self, plan):
+        """
+        Đưa các pattern của kết quả trước vào tập pattern hiện tại (ghép theo kích thước và
+        loại cây, bỏ pattern có kích thước không còn trong đơn), rồi sửa số cây cũ theo
+        nhu cầu mới làm điểm khởi động GĐ 2.
+        """
+        sizes = {}
+        for i, size in enumerate(self.segment_sizes.tolist()):
+            sizes.setdefault(size_key(size), i)
+        stock_index = {size_key(s["length"]): k for k, s in enumerate(self.stocks)}
+        index = self.patterns.index()
+        piece = self.segment_sizes.astype(float) + float(self.blade_width)
+
+        bars = {}
+        added = []
+        added_used = []
+        added_stock = []
+        dropped = 0
+        for p in plan.get("patterns") or []:
+            k = stock_index.get(size_key(p.get("stock_length") or plan.get("stock_length") or 0))
+            pattern = np.zeros(len(self.segment_sizes), dtype=np.int64)
+            for c in p["cuts"]:
+                i = sizes.get(size_key(c["length"]))
+                if i is None:
+                    k = None
+                    break
+                pattern[i] += int(c["qty"])
+            used = float(pattern @ piece)
+            if k is None or used > self.stocks[k]["length"] - self.te_dau_sat:
+                dropped += 1
+                continue
+            key = PatternSet.key(pattern, k)
+            j = index.get(key)
+            if j is None:
+                j = len(self.patterns) + len(added)
+                index[key] = j
+                added.append(pattern)
+                added_used.append(used)
+                added_stock.append(k)
+            bars[j] = bars.get(j, 0) + int(p["bars"])
+        if added:
+            self.patterns = self.patterns.append(np.array(added), added_used, added_stock)
+
+        self.previous_bars = np.zeros(len(self.patterns), dtype=np.int64)
+        for j, count in bars.items():
+            self.previous_bars[j] = count
+
+        self.warm_start = repair_bundle_plan(
+            self.patterns.matrix,
+            self._pattern_loss(self.patterns.matrix, self._pattern_waste()),
+            self.demands,
+            self.max_stock_over,
+            self._pos_factors(),
+            self.previous_bars,
+            max_manual_cuts=int(self.max_manual_cuts),
+        )
+        self.log(
+            f"🔁 Tối ưu lại từ kết quả trước: giữ {len(bars)} patterns (thêm mới {len(added)}, "
+            f"bỏ {dropped} không còn phù hợp)"
+            + ("" if self.warm_start is not None else ", không sửa được phương án cũ cho nhu cầu mới")
+        )
+
+    def _changed_patterns(self, bundles, pos_factors):
+        """Số pattern có số cây khác kết quả trước."""
+        bars = np.asarray(bundles) @ np.array(pos_factors, dtype=np.int64)
+        return int((bars != self.previous_bars).sum())
+
+    def _plan_from_cache(self, cached):
+        self.plan = build_cutting_plan(
+            length=self.length,
+            piece_names=self.piece_names,
+            segment_sizes=self.segment_sizes,
+            demands=self.demands,
+            matrix=cached["patterns"],
+            waste=cached["waste"],
+            bundles=cached["bundles"],
+            pos_factors=cached["pos_factors"],
+            solver_stats=dict(cached["solver"], from_cache=True),
+            stocks=self.stocks,
+            pattern_stock=cached["stock"],
+        )
+        totals = self.plan["totals"]
+        self.log(
+            f"♻️ Dùng lại kết quả đã lưu: {totals['bars']} cây, {totals['bundles']} bó, "
+            f"hao hụt {totals['waste']:.1f}mm ({totals['waste_percent']:.2f}%)"
+        )
+        return self.plan
+
+    def solve(self):
+        """
+        Chạy cả 2 giai đoạn, có dùng cache kết quả theo `result_cache_mode`:
+          - reuse: trả về ngay kết quả đã lưu cho cùng đầu vào
+          - improve: GĐ 2 khởi động từ kết quả đã lưu và tiếp tục tìm nghiệm tốt hơn
+          - off: luôn giải lại, không đọc/ghi cache kết quả
+        Chế độ tự nới (adaptive_window): giải lại với khoảng hao hụt rộng hơn khi GĐ 2 không khả thi
+        hoặc gap còn trên ADAPTIVE_MAX_GAP; mỗi lượt giữ các pattern và khởi động từ phương án của
+        lượt trước, chỉ nhận kết quả mới khi hao hụt giảm.
+        """
+        cached = None
+        # Tối ưu lại từ kết quả trước: ưu tiên giữ phương án cũ, không dùng cache kết quả
+        incremental = self.previous_plan is not None
+        use_result_cache = self.result_cache_mode != RESULT_CACHE_OFF and not incremental
+        if use_result_cache:
+            cached = self.load_cached_result()
+            if cached is not None and self.result_cache_mode == RESULT_CACHE_REUSE:
+                return self._plan_from_cache(cached)
+
+        steps = self._window_steps()
+        prior = None
+        for step, (window, max_patterns, dominance_ratio) in enumerate(steps):
+            self._check_cancelled()
+            self._window = window
+            self._max_patterns = max_patterns
+            self._dominance_ratio = dominance_ratio
+            if len(steps) > 1:
+                self.log(
+                    f"🔍 Khoảng hao hụt GĐ 1: {window * 100:g}%, ngân sách {max_patterns} patterns "
+                    f"(lượt {step + 1}/{len(steps)})"
+                )
+            try:
+                self._solve_window(cached, incremental, prior)
+            except ValueError as e:
+                if step == len(steps) - 1 and prior is None:
+                    raise
+                self.log(f"⚠️ Khoảng hao hụt {window * 100:g}%: {e}")
+                if len(steps) > 1 and self._tail_patterns is None:
+                    self._tail_patterns = self._generate_tail_patterns()
+                continue
+            if prior is not None and self.plan["totals"]["waste"] >= prior["plan"]["totals"]["waste"]:
+                self.log(f"Khoảng hao hụt {window * 100:g}% không cải thiện kết quả, giữ phương án trước.")
+                break
+            prior = {
+                "patterns": self.patterns,
+                "bundle_plan": self.bundle_plan,
+                "previous_bars": self.previous_bars,
+                "plan": self.plan,
+                "phase2_stats": self.phase2_stats,
+            }
+            if step == len(steps) - 1 or not self._gap_too_high():
+                break
+            self.log(f"Gap {self.phase2_stats.get('gap', 1.0) * 100:.2f}% còn cao, thử khoảng hao hụt rộng hơn.")
+
+        # Trạng thái của lượt thành công cuối cùng (lượt sau có thể đã thất bại giữa chừng)
+        self.patterns = prior["patterns"]
+        self.bundle_plan = prior["bundle_plan"]
+        self.previous_bars = prior["previous_bars"]
+        self.plan = prior["plan"]
+        self.phase2_stats = prior["phase2_stats"]
+
+        if use_result_cache:
+            self.save_result_to_cache()
+        return self.plan
+
+    def _window_steps(self):
+        """
+        (khoảng hao hụt, ngân sách pattern, tỉ lệ dominance_slack) của từng lượt giải.
+        Khi nới, các pattern trong cùng tổ hợp kích thước chỉ bị coi là "trội" nếu chênh hao hụt
+        quá độ rộng khoảng: loại quá mạnh làm mất các pattern cần để khớp đúng số lượng.
+        """
+        if not self.adaptive_window or self.pattern_mode != PATTERN_MODE_ENUMERATION:
+            return [(self.waste_window, self.max_patterns, self.dominance_slack_ratio)]
+        windows = [self.waste_window] + [w for w in ADAPTIVE_WINDOWS if w > self.waste_window]
+        steps = []
+        budget = min(ADAPTIVE_PATTERN_BUDGET, self.max_patterns or ADAPTIVE_PATTERN_BUDGET)
+        for k, window in enumerate(windows):
+            ratio = self.dominance_slack_ratio
+            if k and ratio is not None:
+                ratio = max(ratio, window)
+            steps.append((window, budget, ratio))
+        return steps
+
+    def _generate_tail_patterns(self):
+        """
+        Pattern sinh theo nhu cầu bằng Column Generation (không giới hạn khoảng hao hụt):
+        thường chứa vài pattern hao hụt cao nhưng cần để khớp đúng số lượng còn lại.
+        """
+        self.log("GĐ 2 không khả thi với tập pattern hiện tại: bổ sung pattern từ Column Generation...")
+        try:
+            tail = self._generate_columns()
+        except ValueError as e:
+            self.log(f"⚠️ Column Generation: {e}")
+            return PatternSet.empty(len(self.segment_sizes))
+        # Nhiều loại cây: các cột được sinh cho cây dài nhất (self.length)
+        longest = max(range(len(self.stocks)), key=lambda k: self.stocks[k]["length"])
+        return tail.with_stock(longest)
+
+    def _gap_too_high(self):
+        gap = (self.phase2_stats or {}).get("gap")
+        return gap is None or gap > ADAPTIVE_MAX_GAP
+
+    def _solve_window(self, cached, incremental, prior):
+        """1 lượt GĐ 1 + GĐ 2 với khoảng hao hụt / ngân sách pattern hiện tại."""
+        self.log('🚀 Phase 1: Đang tìm patterns...')
+        self.optimize_cutting()
+        self._check_cancelled()
+        if self._tail_patterns is not None and len(self._tail_patterns):
+            n_found = len(self.patterns)
+            self.patterns = PatternSet.concat([self.patterns, self._tail_patterns]).unique()
+            self.log(f"Thêm {len(self.patterns) - n_found} patterns từ Column Generation.")
+        if prior is not None:
+            self._merge_prior(prior)
         else:
-            return list_solutions
+            if cached is not None and self.result_cache_mode == RESULT_CACHE_IMPROVE:
+                self._use_cached_patterns(cached)
+            if incremental:
+                self._use_previous_plan(self.previous_plan)
+
+        self.log('⚙️ Phase 2: Đang tối ưu phân phối...')
+        return self.optimize_distribution()
+
+    def _merge_prior(self, prior):
+        """Giữ các pattern (ở đầu tập, cùng vị trí) và phương án của lượt trước làm điểm khởi động."""
+        n_prior = len(prior["patterns"])
+        merged = PatternSet.concat([prior["patterns"], self.patterns])
+        keep = merged.unique_mask()
+        keep[:n_prior] = True
+        self.patterns = merged[keep]
 
-    def _solve_single_bar_batch(self, max_solutions=1000, time_limit_sec=None):
+        warm = np.zeros((len(self.patterns), prior["bundle_plan"].shape[1]), dtype=np.int64)
+        warm[:n_prior] = prior["bundle_plan"]
+        self.warm_start = warm
+        if prior["previous_bars"] is not None:
+            self.previous_bars = np.zeros(len(self.patterns), dtype=np.int64)
+            self.previous_bars[:n_prior] = prior["previous_bars"]
+        self.log(f"Giữ {n_prior} patterns của lượt trước, thêm {len(self.patterns) - n_prior} patterns mới.")
+
+    def _solve_single_bar_batch(self, max_solutions=1000, time_limit_sec=None, enumerator=None, require_any=None):
         self.log(f"Bắt đầu GĐ 1: Tìm các pattern (tối đa {max_solutions:,} phương án). Vui lòng chờ...")
+        enumerator = enumerator or self.enumerator
+        if enumerator == ENUMERATOR_NUMPY:
+            try:
+                return self._enumerate_patterns_numpy(max_solutions, require_any)
+            except MemoryError:
+                self.log("GĐ 1: Không đủ bộ nhớ cho bộ liệt kê NumPy, chuyển sang CP-SAT...")
+        return self._solve_single_bar_batch_cpsat(max_solutions, time_limit_sec, require_any)
+
+    def _length_scale(self):
+        return LengthScale(self.segment_sizes.tolist(), self.blade_width, normalize=self.normalize_coefficients)
+
+    def _enumerate_patterns_numpy(self, max_solutions, require_any=None):
+        ls = self._length_scale()
+        enumerator_kwargs = dict(
+            seg_scaled=ls.seg,
+            blade_scaled=ls.blade,
+            lower=ls.lower(self.length * (1 - self._window)),
+            upper=ls.upper(self.length - self.te_dau_sat),
+            max_per_size=30,
+            max_distinct=5 if len(ls.seg) > 5 else None,
+            exclude=self.patterns.matrix if self.patterns is not None and len(self.patterns) else None,
+            require_any=require_any,
+            last_segment=self.last_segment,
+        )
+        if self.phase1_workers > 1:
+            self.log(f"GĐ 1: Liệt kê song song trên {self.phase1_workers} tiến trình...")
+        used_scaled, matrix = enumerate_parallel(
+            enumerator_kwargs, self.phase1_workers, max_solutions=max_solutions
+        )
+        self.log(f"GĐ 1: Tìm thấy {len(matrix)} patterns mới.")
+
+        return PatternSet(matrix, ls.to_mm(used_scaled))
+
+    def _solve_single_bar_batch_cpsat(self, max_solutions=1000, time_limit_sec=None, require_any=None):
         model = cp_model.CpModel()
 
         n = len(self.segment_sizes)
         vars_x = [model.NewIntVar(0, 30, f"x_{i}") for i in range(n)]
         sum_x = cp_model.LinearExpr.Sum(vars_x)
 
-        scale = 10
-        seg_scaled = [int(round(s * scale)) for s in self.segment_sizes.tolist()]
-        blade_scaled = int(round(self.blade_width * scale))
-        length_scaled = int(round(self.length * scale))
-
+        ls = self._length_scale()
         objective_scaled = cp_model.LinearExpr.Sum(
-            [seg_scaled[i] * vars_x[i] for i in range(n)]
-        ) + blade_scaled * sum_x
+            [ls.seg[i] * vars_x[i] for i in range(n)]
+        ) + ls.blade * sum_x
 
-        lower = int(round(length_scaled * (1 - 0.01)))
-        upper = int(round(length_scaled))
-        model.Add(objective_scaled >= lower)
-        model.Add(objective_scaled <= upper)
+        # Cùng cận và giới hạn số kích thước như bộ liệt kê NumPy để 2 engine cho cùng tập pattern
+        model.Add(objective_scaled >= ls.lower(self.length * (1 - self._window)))
+        model.Add(objective_scaled <= ls.upper(self.length - self.te_dau_sat))
+        if n > 5:
+            used = [model.NewBoolVar(f"used_{i}") for i in range(n)]
+            for i in range(n):
+                model.Add(vars_x[i] <= 30 * used[i])
+            model.Add(cp_model.LinearExpr.Sum(used) <= 5)
+        if require_any:
+            model.Add(cp_model.LinearExpr.Sum([vars_x[i] for i in require_any]) >= 1)
+        if self.last_segment:
+            model.Add(cp_model.LinearExpr.Sum([vars_x[i] for i in self.last_segment]) <= 1)
 
         solver = cp_model.CpSolver()
         solver.parameters.enumerate_all_solutions = True
         solver.parameters.log_search_progress = True
         solver.parameters.num_search_workers = 1
 
-        exclude_set = set()
-        for _, sol in self.solutions:
-            exclude_set.add(tuple(int(v) for v in sol))
-
         collector = SolutionAndLogCollector(
             vars_x=vars_x,
-            seg_scaled=seg_scaled,
-            blade_scaled=blade_scaled,
-            scale=scale,
+            seg_scaled=ls.seg_scaled,
+            blade_scaled=ls.blade_scaled,
+            scale=ls.scale,
             length=self.length,
             te_dau_sat=self.te_dau_sat,
-            exclude_set=exclude_set,
+            exclude=self.patterns.matrix if self.patterns is not None else None,
             user_to_notify=self.user_to_notify,
             accept_at_most=max_solutions,
             print_every=100,
+            notify=self._status,
+            max_kept=self.phase1_max_kept,
         )
 
         solver.SearchForAllSolutions(model, collector)
-        self.log(f"GĐ 1: Tìm thấy {len(collector.solutions)} patterns mới.")
-        return collector.solutions
+        patterns = collector.patterns
+        if collector.found > len(patterns):
+            # Chỉ giữ top-K: tập pattern không đầy đủ, không được coi là complete trong cache
+            self.phase1_truncated = True
+            self.log(
+                f"GĐ 1: Tìm thấy {collector.found} patterns mới, "
+                f"giữ {len(patterns)} pattern hao hụt thấp nhất."
+            )
+        else:
+            self.log(f"GĐ 1: Tìm thấy {len(patterns)} patterns mới.")
+        return patterns
+
+    def _generate_columns(self):
+        self.log("Bắt đầu GĐ 1 (Column Generation): Sinh pattern theo giá đối ngẫu...")
+        generator = ColumnGenerator(
+            length=self.length,
+            segment_sizes=self.segment_sizes.tolist(),
+            demands=self.demands.tolist(),
+            blade_width=self.blade_width,
+            max_stock_over=self.max_stock_over,
+            te_dau_sat=self.te_dau_sat,
+            max_distinct=5 if len(self.segment_sizes) > 5 else None,
+            time_limit_sec=self.time_limit_seconds,
+            surplus_penalty=self.surplus_penalty.tolist(),
+            last_segment=self.last_segment,
+            scale=self._length_scale().scale,
+            log=self.log,
+        )
+        return generator.run()
+
+    def _reduce_patterns(self):
+        max_patterns = self._max_patterns
+        reduced, stats = reduce_patterns(
+            self.patterns,
+            length=self.length,
+            demands=self.demands.tolist(),
+            max_stock_over=self.max_stock_over,
+            top_k_per_support=self.top_k_per_support,
+            dominance_slack=(
+                self.length * self._dominance_ratio
+                if self._dominance_ratio is not None
+                else None
+            ),
+            max_patterns=max_patterns,
+            surplus_penalty=self.surplus_penalty if self.priorities.any() else None,
+        )
+        self.reduction_stats = stats
+        removed = stats["before"] - stats["after"]
+        self.log(
+            f"Rút gọn pattern: {stats['before']} -> {stats['after']} (loại {removed}: "
+            f"{stats['infeasible']} vượt nhu cầu, {stats['duplicate']} trùng, "
+            f"{stats['dominated']} bị trội, {stats['top_k']} ngoài top-{self.top_k_per_support}, "
+            f"{stats['budget']} vượt ngân sách {max_patterns})"
+        )
+        return reduced
+
+    def _single_stock_optimizer(self, length):
+        """Bộ tối ưu chỉ dùng cho GĐ 1 với 1 chiều dài cây (cache pattern riêng theo chiều dài)."""
+        return SteelCuttingOptimizer(
+            length=length,
+            te_dau_sat=self.te_dau_sat,
+            piece_names=self.piece_names,
+            segment_sizes=self.segment_sizes.tolist(),
+            demands=self.demands.tolist(),
+            blade_width=self.blade_width,
+            factors=self._pos_factors(),
+            max_manual_cuts=self.max_manual_cuts,
+            max_stock_over=self.max_stock_over,
+            time_limit_seconds=self.time_limit_seconds,
+            progress=self.progress,
+            pattern_mode=self.pattern_mode,
+            enumerator=self.enumerator,
+            reduce=self.reduce,
+            top_k_per_support=self.top_k_per_support,
+            dominance_slack_ratio=self._dominance_ratio,
+            max_patterns=self._max_patterns,
+            cache_store=self.cache_store,
+            phase1_workers=self.phase1_workers,
+            phase1_max_kept=self.phase1_max_kept,
+            should_stop=self.should_stop,
+            priorities=self.priorities.tolist(),
+            last_segment=[i in self.last_segment for i in range(len(self.segment_sizes))],
+            waste_window=self._window,
+        )
+
+    def _optimize_cutting_per_stock(self):
+        """GĐ 1 cho từng loại cây, gộp tất cả pattern lại để GĐ 2 chọn tổ hợp loại cây."""
+        found_sets = []
+        for k, stock in enumerate(self.stocks):
+            self._check_cancelled()
+            self.log(f"📏 GĐ 1 cho cây {stock['length']:g}mm ({k + 1}/{len(self.stocks)})...")
+            try:
+                found = self._single_stock_optimizer(stock["length"]).optimize_cutting()
+            except ValueError as e:
+                # Một loại cây không cắt được pattern nào (vd: cây quá ngắn) thì bỏ qua loại đó
+                self.log(f"Bỏ qua cây {stock['length']:g}mm: {e}")
+                continue
+            found_sets.append(found.with_stock(k))
+
+        if not found_sets:
+            raise ValueError("Không tìm được pattern nào phù hợp cho các loại cây.")
+        self.patterns = PatternSet.concat(found_sets)
+        return self.patterns
 
     def optimize_cutting(self):
-        self.solutions = self.load_solution_from_pickle()
+        if len(self.stocks) > 1:
+            return self._optimize_cutting_per_stock()
 
-        if not self.solutions:
+        if self.pattern_mode == PATTERN_MODE_COLUMN_GENERATION:
+            # Không dùng cache: tập cột phụ thuộc vào nhu cầu (demands) của từng đơn
+            self.patterns = self._generate_columns()
+            if not len(self.patterns):
+                raise ValueError("Column Generation không sinh được pattern nào (GĐ 1).")
+            return self.patterns
+
+        self.patterns = self.load_solution_from_cache()
+
+        if not len(self.patterns):
             self.log("Chưa có nghiệm trong CACHE, đang tìm nghiệm...")
-        elif 0 < len(self.solutions) < 10:
+        elif 0 < len(self.patterns) < 10:
             self.log("DANH SÁCH NGHIỆM QUÁ NHỎ, ĐANG GIẢI LẠI!!!!")
-            self.solutions = []
+            self.patterns = PatternSet.empty(len(self.segment_sizes))
 
-        if not self.solutions:
+        if not len(self.patterns):
             MAX_SOLUTIONS = 100000
+            base, require_any = self._load_cached_subset()
             batch = self._solve_single_bar_batch(
-                max_solutions=MAX_SOLUTIONS,
-                time_limit_sec=None
+                max_solutions=MAX_SOLUTIONS - len(base),
+                time_limit_sec=None,
+                require_any=require_any,
             )
-            if not batch:
+            complete = len(batch) < MAX_SOLUTIONS - len(base) and not self.phase1_truncated
+            if len(base):
+                batch = PatternSet.concat([base, batch]).sort_by_used()
+            if not len(batch):
                 raise ValueError("Không tìm được nghiệm phù hợp cho 1 cây sắt (GĐ 1).")
 
             if len(self.segment_sizes) > 5:
                 before_count = len(batch)
-                batch = [
-                    (obj, sol) for obj, sol in batch
-                    if sum(1 for x in sol if x > 0) <= 5
-                ]
+                batch = batch[batch.count_nonzero() <= 5]
                 self.log(f"GĐ 1: Đã lọc bỏ pattern quá 5 loại kích thước: {before_count} -> {len(batch)} patterns.")
 
             self.log(f"GĐ 1: Còn lại {len(batch)} patterns sau khi lọc.")
-            self.solutions = batch
-            self.save_solution_to_pickle()
+            self.patterns = batch
+            self.save_solution_to_cache(complete=complete)
 
-        self.solution_matrix = np.array([sol[1] for sol in self.solutions], dtype=int)
-        
-        if len(self.solution_matrix) == 0:
-             raise ValueError(f"Không tìm được pattern nào phù hợp.")
-        
-        return self.solutions
+        # Cache lưu tập đầy đủ, chỉ rút gọn theo nhu cầu của đơn hiện tại
+        if self.reduce:
+            self.patterns = self._reduce_patterns()
 
-    def optimize_distribution(self):
-        self.log("<br>Bắt đầu GĐ 2: Đang tính toán bó sắt...<br>")
-        if self.solution_matrix is None:
-            raise ValueError("Run optimize_cutting first to generate solution matrix.")
+        if len(self.patterns) == 0:
+            raise ValueError("Không tìm được pattern nào phù hợp.")
+
+        return self.patterns
+
+    def _stock_bars(self, bundles, pos_factors):
+        """Số cây đã dùng của từng loại cây."""
+        bars = bundles @ np.array(pos_factors, dtype=np.int64)
+        return np.bincount(self.patterns.stock, weights=bars, minlength=len(self.stocks)).astype(np.int64)
+
+    def _within_availability(self, bundles, pos_factors):
+        used = self._stock_bars(bundles, pos_factors)
+        return all(
+            s["available"] is None or used[k] <= s["available"] for k, s in enumerate(self.stocks)
+        )
 
-        A = self.solution_matrix.T
-        L = np.array([self.length - sol[0] for sol in self.solutions], dtype=float)
+    def _greedy_candidates(self, matrix, waste, pos_factors):
+        """
+        Phương án tham lam trên toàn bộ pattern; nhiều loại cây thì thêm phương án
+        chỉ dùng pattern của từng loại cây (tổ hợp nhiều loại cây hay làm heuristic bế tắc).
+        """
+        weighted = self._pattern_loss(matrix, waste)
+        subsets = [None]
+        if len(self.stocks) > 1:
+            subsets += [np.flatnonzero(self.patterns.stock == k) for k in range(len(self.stocks))]
+
+        for rows in subsets:
+            if rows is not None and len(rows) == 0:
+                continue
+            bundles = greedy_bundle_plan(
+                matrix if rows is None else matrix[rows],
+                weighted if rows is None else weighted[rows],
+                self.demands,
+                self.max_stock_over,
+                pos_factors,
+                max_manual_cuts=int(self.max_manual_cuts),
+            )
+            if bundles is None:
+                continue
+            if rows is not None:
+                full = np.zeros((len(matrix), len(pos_factors)), dtype=np.int64)
+                full[rows] = bundles
+                bundles = full
+            if self._within_availability(bundles, pos_factors):
+                yield bundles
+
+    def _single_stock_plan(self, pos_factors, weighted):
+        """
+        Khởi động cho mô hình nhiều loại cây khi heuristic bế tắc: giải nhanh GĐ 2 riêng cho
+        từng loại cây (mô hình nhỏ hơn nhiều), lấy phương án tốt nhất còn trong số cây có sẵn.
+        """
+        deadline = time.time() + float(self.time_limit_seconds) * SINGLE_STOCK_WARM_START_SHARE
+        factors = np.array(pos_factors)
+        best = None
+        stocks = [(k, stock) for k, stock in enumerate(self.stocks) if (self.patterns.stock == k).any()]
+        for pos, (k, stock) in enumerate(stocks):
+            # Chia đều phần thời gian còn lại cho các loại cây chưa giải
+            budget = (deadline - time.time()) / (len(stocks) - pos)
+            if budget <= 0:
+                break
+            rows = np.flatnonzero(self.patterns.stock == k)
+            self._check_cancelled()
+            sub = self._single_stock_optimizer(stock["length"])
+            sub.progress = CallbackProgress()
+            sub.time_limit_seconds = budget
+            sub.stall_seconds = None
+            sub.num_search_workers = self.num_search_workers
+            sub.patterns = self.patterns[rows].with_stock(0)
+            try:
+                sub.optimize_distribution()
+            except ValueError:
+                continue
+            bundles = np.zeros((len(self.patterns), len(pos_factors)), dtype=np.int64)
+            bundles[rows] = sub.bundle_plan
+            if not self._within_availability(bundles, pos_factors):
+                continue
+            score = float(((bundles @ factors) * weighted).sum())
+            if best is None or score < best[0]:
+                best = (score, bundles)
+            self.log(f"GĐ 2: Phương án khởi động chỉ dùng cây {stock['length']:g}mm: hao hụt {score:.1f}")
+        return None if best is None else best[1]
+
+    def _heuristic_plan(self, matrix, waste, pos_factors):
+        start = time.time()
+        weighted = self._pattern_loss(matrix, waste)
+        factors = np.array(pos_factors)
+        bundles = min(
+            self._greedy_candidates(matrix, waste, pos_factors),
+            key=lambda x: (float(((x @ factors) * weighted).sum()), int(x.sum())),
+            default=None,
+        )
+        if bundles is None and len(self.stocks) > 1:
+            bundles = self._single_stock_plan(pos_factors, weighted)
+        self.heuristic_solution = bundles
+        if bundles is None:
+            self.log("Heuristic không tìm được phương án khả thi, CP-SAT bắt đầu từ đầu.")
+            return None
+
+        bars = bundles @ np.array(pos_factors)
+        total_waste = float((bars * waste).sum())
+        self.log(
+            f"⚡ Phương án tạm thời (heuristic, {time.time() - start:.2f}s): "
+            f"{int(bars.sum())} cây, {int(bundles.sum())} bó, hao hụt {total_waste:.1f}mm"
+        )
+        self._report_provisional(bundles, waste, pos_factors)
+        return bundles
+
+    def _report_provisional(self, bundles, waste, pos_factors):
+        """Gửi phương án heuristic cho on_provisional_plan làm kết quả tạm thời trong lúc CP-SAT chạy."""
+        if self.on_provisional_plan is None:
+            return
+        plan = build_cutting_plan(
+            length=self.length,
+            piece_names=self.piece_names,
+            segment_sizes=self.segment_sizes,
+            demands=self.demands,
+            matrix=self.patterns.matrix,
+            waste=waste,
+            bundles=bundles,
+            pos_factors=pos_factors,
+            solver_stats=dict(
+                status="HEURISTIC",
+                provisional=True,
+                finished_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            ),
+            stocks=self.stocks,
+            pattern_stock=self.patterns.stock,
+        )
+        try:
+            self.on_provisional_plan(plan)
+        except Exception as e:
+            # Không gửi được kết quả tạm thời không được làm hỏng lời giải
+            self.log(f"⚠️ Không gửi được phương án tạm thời: {e}")
+
+    def _pos_factors(self):
+        # self.factors có thêm [1, 0] ở cuối: loại trùng để không sinh 2 biến bó 1 cây
+        return sorted({int(f) for f in self.factors if f > 0}, reverse=True)
+
+    def _demand_rows(self, A):
+        """Ma trận thưa dạng CSR theo dòng nhu cầu i: (row_ptr, j, a_ij) của các pattern có a_ij > 0."""
+        nz_i, nz_j = np.nonzero(A)
+        row_ptr = np.searchsorted(nz_i, np.arange(A.shape[0] + 1))
+        return row_ptr, nz_j.tolist(), A[nz_i, nz_j].astype(np.int64).tolist()
+
+    def _add_side_constraints(self, model, bars_terms):
+        """
+        Ràng buộc dùng chung của 2 mô hình GĐ 2 trên số cây của từng pattern,
+        `bars_terms(js)` trả về (biến, hệ số) của tổng số cây các pattern js.
+        """
+        n = len(self.patterns)
+        # Số cây có sẵn của từng loại cây
+        for k, stock in enumerate(self.stocks):
+            if stock["available"] is None:
+                continue
+            terms, coeffs = bars_terms(np.flatnonzero(self.patterns.stock == k).tolist())
+            model.Add(cp_model.LinearExpr.WeightedSum(terms, coeffs) <= int(stock["available"]))
+
+        # Giới hạn số pattern được đổi số cây so với kết quả trước
+        if self.previous_bars is not None and self.max_changed_patterns is not None:
+            changed = []
+            for j in range(n):
+                c = model.NewBoolVar(f"changed_{j}")
+                terms, coeffs = bars_terms([j])
+                model.Add(
+                    cp_model.LinearExpr.WeightedSum(terms, coeffs) == int(self.previous_bars[j])
+                ).OnlyEnforceIf(c.Not())
+                changed.append(c)
+            model.Add(cp_model.LinearExpr.Sum(changed) <= self.max_changed_patterns)
+
+    def _build_bundle_model(self, A, UB, caps, pos_factors, loss_coef):
+        """
+        Mô hình theo bó: biến b_j_fr = số bó fr cây của pattern j (tối đa n x len(pos_factors) biến).
+        Trả về (model, (biến, hệ số) của hao hụt, (biến, hệ số) của số bó,
+        hint_vars(bundles) -> (biến, giá trị), decode(solver) -> bundles).
+        """
         m, n = A.shape
+        model = cp_model.CpModel()
+        row_ptr, nz_j, nz_a = self._demand_rows(A)
+
+        # Chỉ tạo biến cho hệ số còn chia được số cây tối đa (ub_j // fr > 0): biến luôn bằng 0
+        # chỉ làm presolve / probing tốn thời gian. cols[j]: vị trí hệ số của từng biến b[j]
+        b, cols = [], []
+        for j in range(n):
+            ub_j = int(UB[j])
+            cols.append([k for k, fr in enumerate(pos_factors) if ub_j // fr > 0])
+            b.append([model.NewIntVar(0, ub_j // pos_factors[k], f"b_{j}_{pos_factors[k]}") for k in cols[j]])
+
+        # Ràng buộc nhu cầu đặt thẳng trên tổng có trọng số (không cần biến phụ C_i)
+        for i in range(m):
+            lo, hi = row_ptr[i], row_ptr[i + 1]
+            terms = []
+            coeffs = []
+            for j, aij in zip(nz_j[lo:hi], nz_a[lo:hi], strict=True):
+                terms.extend(b[j])
+                coeffs.extend(aij * pos_factors[k] for k in cols[j])
+            model.AddLinearConstraint(
+                cp_model.LinearExpr.WeightedSum(terms, coeffs),
+                int(self.demands[i]),
+                int(caps[i]),
+            )
 
-        pos_factors = sorted([f for f in self.factors if f > 0], reverse=True)
-        idx_one = None
         if 1 in pos_factors:
             idx_one = pos_factors.index(1)
+            ones = [v for j in range(n) for v, k in zip(b[j], cols[j], strict=True) if k == idx_one]
+            model.Add(cp_model.LinearExpr.Sum(ones) <= int(self.max_manual_cuts))
 
+        self._add_side_constraints(
+            model, lambda js: ([v for j in js for v in b[j]], [pos_factors[k] for j in js for k in cols[j]])
+        )
+
+        flat = [v for row in b for v in row]
+        waste_terms = (flat, [int(loss_coef[j]) * pos_factors[k] for j in range(n) for k in cols[j]])
+        bundle_terms = (flat, [1] * len(flat))
+
+        def hint_vars(bundles):
+            return flat, [bundles[j, k] for j in range(n) for k in cols[j]]
+
+        def decode(solver):
+            bundles = np.zeros((n, len(pos_factors)), dtype=np.int64)
+            for j in range(n):
+                bundles[j, cols[j]] = [solver.Value(v) for v in b[j]]
+            return bundles
+
+        return model, waste_terms, bundle_terms, hint_vars, decode
+
+    def _build_compact_model(self, A, UB, caps, pos_factors, loss_coef):
+        """
+        Mô hình gọn: số cây của pattern j = F * q_j + r_j (F = hệ số lớn nhất), q_j là số bó F cây,
+        r_j là phần dư nhỏ (<= R) chỉ gồm các số cây chia bó được, số bó của phần dư t_j tra
+        bảng coin change rút gọn qua ràng buộc element. Bó 1 cây (cắt tay) tách riêng thành o_j,
+        chỉ tạo khi max_manual_cuts > 0.
+        Cùng nghiệm tối ưu với mô hình theo bó nhưng ~3 biến / pattern thay vì len(pos_factors)
+        và gần như không còn các cách chia bó tương đương cho cùng số cây. Element trên toàn bộ
+        số cây (bảng dài) làm CP-SAT mất cận dưới từ LP, nên chỉ tra bảng cho phần dư.
+        """
+        m, n = A.shape
         model = cp_model.CpModel()
+        row_ptr, nz_j, nz_a = self._demand_rows(A)
 
-        def safe_div_ceil(a, b):
-            return (a + b - 1) // b
+        bundle_factors = [f for f in pos_factors if f != 1]
+        use_ones = 1 in pos_factors and int(self.max_manual_cuts) > 0
+        max_ones = int(self.max_manual_cuts) if use_ones else 0
+        if bundle_factors:
+            F, best, choice = remainder_bundle_table(int(UB.max()) if n else 0, bundle_factors)
+        else:
+            F, best, choice = 1, np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.int64)
+        remainders = np.flatnonzero(best >= 0)
 
-        UB = []
+        q, r, t, o = [], [], [], []
         for j in range(n):
-            caps = []
-            for i in range(m):
-                aij = int(A[i, j])
-                if aij > 0:
-                    caps.append(safe_div_ceil(int(self.demands[i]) + int(self.max_stock_over), aij))
-            if caps:
-                UB.append(min(caps))
-            else:
-                UB.append(0)
+            ub_j = int(UB[j])
+            q_j = model.NewIntVar(0, ub_j // F if bundle_factors else 0, f"q_{j}")
+            values = remainders[: np.searchsorted(remainders, ub_j, side="right")].tolist()
+            r_j = t_j = None
+            if len(values) > 1:
+                r_j = model.NewIntVarFromDomain(cp_model.Domain.FromValues(values), f"r_{j}")
+                table = np.maximum(best[: values[-1] + 1], 0).tolist()
+                t_j = model.NewIntVar(0, max(table), f"t_{j}")
+                model.AddElement(r_j, table, t_j)
+            o_j = model.NewIntVar(0, min(max_ones, ub_j), f"o_{j}") if use_ones and ub_j else None
+            q.append(q_j)
+            r.append(r_j)
+            t.append(t_j)
+            o.append(o_j)
 
-        b = []
-        for j in range(n):
-            row = []
-            for fr in pos_factors:
-                ub = safe_div_ceil(UB[j], fr) if UB[j] > 0 else 0
-                row.append(model.NewIntVar(0, max(0, ub), f"b_{j}_{fr}"))
-            b.append(row)
+        def bars(js):
+            terms, coeffs = [], []
+            for j in js:
+                for v, k in ((q[j], F), (r[j], 1), (o[j], 1)):
+                    if v is not None:
+                        terms.append(v)
+                        coeffs.append(k)
+            return terms, coeffs
 
-        def bars_of_pattern(j):
-            terms = []
-            for r, fr in enumerate(pos_factors):
-                if fr != 0:
-                    terms.append(fr * b[j][r])
-            return sum(terms) if terms else 0
+        for j in range(n):
+            if r[j] is not None or o[j] is not None:
+                terms, coeffs = bars([j])
+                model.Add(cp_model.LinearExpr.WeightedSum(terms, coeffs) <= int(UB[j]))
 
-        C = []
         for i in range(m):
-            contrib = []
-            for j in range(n):
-                aij = int(A[i, j])
-                if aij != 0:
-                    contrib.append(aij * bars_of_pattern(j))
-            Ci = model.NewIntVar(0, 10**12, f"C_{i}")
-            model.Add(Ci == (sum(contrib) if contrib else 0))
-            model.Add(Ci >= int(self.demands[i]))
-            model.Add(Ci <= int(self.demands[i]) + int(self.max_stock_over))
-            C.append(Ci)
-
-        if idx_one is not None:
-            manual_cuts = sum(b[j][idx_one] for j in range(n))
-            model.Add(manual_cuts <= int(self.max_manual_cuts))
-
-        loss_terms = []
-        bundle_terms = []
+            lo, hi = row_ptr[i], row_ptr[i + 1]
+            terms, coeffs = [], []
+            for j, aij in zip(nz_j[lo:hi], nz_a[lo:hi], strict=True):
+                tj, kj = bars([j])
+                terms.extend(tj)
+                coeffs.extend(aij * k for k in kj)
+            model.AddLinearConstraint(
+                cp_model.LinearExpr.WeightedSum(terms, coeffs),
+                int(self.demands[i]),
+                int(caps[i]),
+            )
+
+        ones = [v for v in o if v is not None]
+        if ones:
+            model.Add(cp_model.LinearExpr.Sum(ones) <= max_ones)
+
+        self._add_side_constraints(model, bars)
+
+        # Hao hụt: chi phí_j * số cây; số bó: q_j + t_j + o_j
+        waste_terms, bundle_terms = ([], []), ([], [])
         for j in range(n):
-            bj = bars_of_pattern(j)
-            loss_terms.append(int(round(L[j] * 1000)) * bj)  
-            for r in range(len(pos_factors)):
-                bundle_terms.append(b[j][r])
+            cost = int(loss_coef[j])
+            for v, k in ((q[j], cost * F), (r[j], cost), (o[j], cost)):
+                if v is not None:
+                    waste_terms[0].append(v)
+                    waste_terms[1].append(k)
+            for v in (q[j], t[j], o[j]):
+                if v is not None:
+                    bundle_terms[0].append(v)
+                    bundle_terms[1].append(1)
 
-        Loss_expr = sum(loss_terms) if loss_terms else 0
-        Bundles_expr = sum(bundle_terms) if bundle_terms else 0
+        col = {f: k for k, f in enumerate(pos_factors)}
+        factors = np.array(pos_factors, dtype=np.int64)
 
-        W1 = 10**6
-        W2 = 1
-        model.Minimize(Loss_expr * W1 + Bundles_expr * W2)
+        def hint_vars(bundles):
+            ones_j = bundles[:, col[1]] if use_ones else np.zeros(n, dtype=np.int64)
+            total = bundles @ factors - ones_j
+            variables, values = [], []
+            for j in range(n):
+                split = split_bars(int(total[j]), F, best) or (0, 0)
+                for v, k in ((q[j], split[0]), (r[j], split[1]), (t[j], max(int(best[split[1]]), 0)), (o[j], ones_j[j])):
+                    if v is not None:
+                        variables.append(v)
+                        values.append(int(k))
+            return variables, values
+
+        def decode(solver):
+            bundles = np.zeros((n, len(pos_factors)), dtype=np.int64)
+            for j in range(n):
+                if bundle_factors:
+                    bundles[j, col[F]] += solver.Value(q[j])
+                if r[j] is not None:
+                    for f, cnt in decompose_bars(int(solver.Value(r[j])), choice).items():
+                        bundles[j, col[f]] += cnt
+                if o[j] is not None:
+                    bundles[j, col[1]] += solver.Value(o[j])
+            return bundles
 
+        return model, waste_terms, bundle_terms, hint_vars, decode
+
+    @staticmethod
+    def _set_hint(model, variables, values):
+        # Ghi hint thẳng vào proto: nhanh hơn nhiều so với gọi AddHint cho từng biến
+        model.ClearHints()
+        hint = model.Proto().solution_hint
+        hint.vars.extend(v.Index() for v in variables)
+        hint.values.extend(int(x) for x in values)
+
+    def _run_phase2_solver(self, model, time_limit, gap_limit=None):
+        """
+        Giải mô hình GĐ 2 với dừng sớm (gap / không cải thiện) và kiểm tra hủy mỗi giây.
+        `gap_limit` áp lên toàn bộ mục tiêu của `model`, None = không dừng theo gap.
+        """
         solver = cp_model.CpSolver()
         solver.parameters.log_search_progress = False
-        solver.parameters.max_time_in_seconds = float(self.time_limit_seconds)
-        solver.parameters.num_search_workers = 8
+        solver.parameters.max_time_in_seconds = float(time_limit)
+        solver.parameters.num_search_workers = self.num_search_workers
+        if gap_limit:
+            solver.parameters.relative_gap_limit = float(gap_limit)
+        if time_limit < PHASE2_PROBING_MIN_SECONDS:
+            solver.parameters.cp_model_probing_level = 0
+
+        early_stop = EarlyStopCallback(
+            gap_limit=gap_limit or None,
+            stall_seconds=self.stall_seconds or None,
+            log=self.log,
+        )
+
+        def on_tick():
+            early_stop.check_stall()
+            if not early_stop.cancelled and self.should_stop is not None and self.should_stop():
+                early_stop.cancel()
 
         # --- TIMER (Sử dụng user_to_notify) ---
-        timer_thread = SolverTimer(self.time_limit_seconds, self.user_to_notify)
+        timer_thread = SolverTimer(
+            time_limit,
+            self.user_to_notify,
+            on_tick=on_tick,
+            notify=self._status,
+        )
         timer_thread.start()
 
-        status = solver.Solve(model)
+        status = solver.Solve(model, early_stop)
 
         timer_thread.stop()
         timer_thread.join()
+        if early_stop.cancelled:
+            raise OptimizationCancelled("Đã hủy tối ưu theo yêu cầu.")
+        return solver, status, early_stop
 
-        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+    def optimize_distribution(self):
+        self.log("<br>Bắt đầu GĐ 2: Đang tính toán bó sắt...<br>")
+        if self.patterns is None:
+            raise ValueError("Run optimize_cutting first to generate solution matrix.")
+        # Dựng mô hình, heuristic và các lượt giải CP-SAT cùng nằm trong time_limit
+        deadline = time.time() + float(self.time_limit_seconds)
+
+        A = self.patterns.matrix.T
+        L = self._pattern_waste()
+        m, n = A.shape
+
+        pos_factors = self._pos_factors()
+        # Cận trên chặt cho số cây của mỗi pattern: a_ij * bars_j <= demand_i + max_stock_over
+        caps = self.demands.astype(np.int64) + int(self.max_stock_over)
+        nz_i, nz_j = np.nonzero(A)
+        nz_a = A[nz_i, nz_j].astype(np.int64)
+        UB = np.full(n, np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(UB, nz_j, caps[nz_i] // nz_a)
+        UB[UB == np.iinfo(np.int64).max] = 0
+
+        # Hệ số hao hụt nguyên: thang thập phân nhỏ nhất + chia GCD (tắt: x1000 như cũ)
+        loss = self._pattern_loss(A.T, L)
+        if self.normalize_coefficients:
+            loss_coef, loss_unit = integer_coefficients(loss, max_digits=3)
+        else:
+            loss_coef, loss_unit = np.rint(loss * 1000).astype(np.int64), 0.001
+
+        build_start = time.time()
+        build = self._build_compact_model if self.phase2_model == PHASE2_MODEL_COMPACT else self._build_bundle_model
+        model, waste_terms, bundle_terms, hint_vars, decode = build(A, UB, caps, pos_factors, loss_coef)
+        waste_expr = cp_model.LinearExpr.WeightedSum(*waste_terms)
+        bundle_expr = cp_model.LinearExpr.WeightedSum(*bundle_terms)
+        if self.normalize_coefficients:
+            # Thứ tự ưu tiên: bước 1 chỉ tối thiểu hao hụt, bước 2 giữ hao hụt và tối thiểu số bó
+            objective_expr = waste_expr
+            gap_limit = self.gap_limit
+        else:
+            # Tổng có trọng số: hao hụt * W1 + số bó * W2 (W1 đủ lớn để hao hụt luôn được ưu tiên).
+            # Gap tương đối của tổng này gần như chỉ là gap của hao hụt: dừng theo gap sẽ bỏ qua
+            # việc giảm số bó, nên chỉ dừng theo thời gian / không cải thiện
+            W1, W2 = 10**6, 1
+            gap_limit = None
+            objective_expr = cp_model.LinearExpr.WeightedSum(
+                waste_terms[0] + bundle_terms[0],
+                [k * W1 for k in waste_terms[1]] + [k * W2 for k in bundle_terms[1]],
+            )
+        model.Minimize(objective_expr)
+        build_time = time.time() - build_start
+        num_vars = len(model.Proto().variables)
+        self.log(
+            f"GĐ 2: Dựng mô hình {num_vars:,} biến, {m} ràng buộc nhu cầu "
+            f"trong {build_time:.2f}s"
+        )
+
+        # --- WARM START: phương án heuristic làm hint + cận trên cho mục tiêu ---
+        def plan_objective(bundles):
+            bars_p = bundles @ np.array(pos_factors, dtype=np.int64)
+            return int((loss_coef * bars_p).sum()), int(bundles.sum())
+
+        heuristic = self._heuristic_plan(A.T, L, pos_factors)
+        if (
+            self.warm_start is not None
+            and self.warm_start.shape == (n, len(pos_factors))
+            and self._within_availability(self.warm_start, pos_factors)
+        ):
+            # Tối ưu lại: luôn khởi động từ phương án cũ đã sửa để giữ ổn định.
+            # Kết quả đã lưu (chế độ improve): chỉ khi tốt hơn heuristic
+            if (
+                self.previous_bars is not None
+                or heuristic is None
+                or plan_objective(self.warm_start) <= plan_objective(heuristic)
+            ):
+                heuristic = self.warm_start
+        if (
+            heuristic is not None
+            and self.previous_bars is not None
+            and self.max_changed_patterns is not None
+            and self._changed_patterns(heuristic, pos_factors) > self.max_changed_patterns
+        ):
+            self.log("Phương án khởi động đổi quá nhiều pattern so với kết quả trước, CP-SAT bắt đầu từ đầu.")
+            heuristic = None
+        if heuristic is not None:
+            # Mô hình gọn tính số bó ít nhất nên mục tiêu của hint không vượt plan_objective
+            heuristic_waste, heuristic_bundles = plan_objective(heuristic)
+            self._set_hint(model, *hint_vars(heuristic))
+            if self.normalize_coefficients:
+                model.Add(waste_expr <= heuristic_waste)
+            else:
+                model.Add(objective_expr <= heuristic_waste * W1 + heuristic_bundles * W2)
+
+        time_limit = max(deadline - time.time(), 0.0)
+        # Tổng thời gian 2 bước không vượt time_limit
+        step1_limit = time_limit * (1 - LEXICOGRAPHIC_BUNDLE_SHARE) if self.normalize_coefficients else time_limit
+        solver, status, early_stop = self._run_phase2_solver(model, step1_limit, gap_limit)
+        wall_time = solver.WallTime()
+
+        self.phase2_stats = {
+            "build_time": build_time,
+            "model": self.phase2_model,
+            "num_vars": num_vars,
+            "status": solver.StatusName(status),
+            "wall_time": wall_time,
+            "stop_reason": early_stop.stop_reason,
+            "num_search_workers": self.num_search_workers,
+            "phase1_workers": self.phase1_workers,
+            "normalized": self.normalize_coefficients,
+        }
+        if self.pattern_mode == PATTERN_MODE_ENUMERATION:
+            # Khoảng hao hụt / ngân sách pattern của GĐ 1 đã cho ra kết quả này
+            self.phase2_stats["waste_window"] = self._window
+            self.phase2_stats["pattern_budget"] = self._max_patterns
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            self.phase2_stats["objective"] = solver.ObjectiveValue()
+            self.phase2_stats["bound"] = solver.BestObjectiveBound()
+            objective, bound = solver.ObjectiveValue(), solver.BestObjectiveBound()
+            if not self.normalize_coefficients:
+                # Gap báo cáo theo phần hao hụt của mục tiêu có trọng số
+                objective, bound = objective // W1, bound // W1
+            self.phase2_stats["gap"] = EarlyStopCallback.relative_gap(objective, bound)
+            self.log(
+                f"GĐ 2: {solver.StatusName(status)} sau {wall_time:.1f}s "
+                f"(dựng mô hình {build_time:.2f}s), gap {self.phase2_stats['gap'] * 100:.3f}%"
+            )
+
+        solution = decode(solver) if status in (cp_model.OPTIMAL, cp_model.FEASIBLE) else None
+        if solution is not None and self.normalize_coefficients:
+            # Bước 2: cố định hao hụt đã đạt, tối thiểu số bó, khởi động từ nghiệm bước 1
+            # đã chia lại bó (ít bó nhất cho đúng số cây của từng pattern)
+            solution = rebundle(solution, pos_factors)
+            best_waste = round(solver.ObjectiveValue())
+            model.Add(waste_expr <= best_waste)
+            model.Minimize(bundle_expr)
+            self._set_hint(model, *hint_vars(solution))
+            remaining = max(deadline - time.time(), 0.0)
+            bundle_solver, bundle_status, _ = self._run_phase2_solver(model, remaining, self.gap_limit)
+            self.phase2_stats["wall_time"] += bundle_solver.WallTime()
+            self.phase2_stats["bundles_status"] = bundle_solver.StatusName(bundle_status)
+            if (
+                bundle_status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+                and bundle_solver.ObjectiveValue() < solution.sum()
+            ):
+                solution = decode(bundle_solver)
+            self.log(
+                f"GĐ 2 (bước 2): giữ hao hụt {best_waste * loss_unit:.1f}mm, "
+                f"{int(solution.sum())} bó ({bundle_solver.StatusName(bundle_status)})"
+            )
+
+        if solution is not None:
+            b_opt = solution.tolist()
+        elif heuristic is not None:
+            self.log("CP-SAT chưa tìm được nghiệm trong thời gian cho phép, dùng phương án heuristic.")
+            b_opt = heuristic.tolist()
+        else:
             raise ValueError("Không tìm thấy giải pháp trong thời gian cho phép.")
+        self.bundle_plan = np.array(b_opt, dtype=np.int64).reshape(n, len(pos_factors))
+        if self.previous_bars is not None:
+            self.phase2_stats["changed_patterns"] = self._changed_patterns(self.bundle_plan, pos_factors)
+            self.log(f"🔁 Đổi số cây của {self.phase2_stats['changed_patterns']} pattern so với kết quả trước.")
 
-        # --- XUẤT KẾT QUẢ (LOG) ---
-        # Code xuất kết quả giữ nguyên, nhưng sẽ chạy qua hàm self.log (đã force user=None)
-        now = datetime.now()
-        html_out = ""
-        html_out += f"<b>Thời gian: {now.strftime('%d/%m/%Y %H:%M:%S')}</b><br>"
-        self.log(html_out)
-        
-        # ... (Phần logic tính toán & tạo bảng giữ nguyên như cũ, chỉ cần gọi self.log là được) ...
-        # (Để ngắn gọn mình không lặp lại đoạn tạo bảng HTML dài dòng ở đây vì logic đó bạn đã có, 
-        # quan trọng nhất là các hàm log() đã được sửa thành user=None)
-
-        return b_opt
\ No newline at end of file
+        # --- KẾT QUẢ CÓ CẤU TRÚC ---
+        self.plan = build_cutting_plan(
+            length=self.length,
+            piece_names=self.piece_names,
+            segment_sizes=self.segment_sizes,
+            demands=self.demands,
+            matrix=self.patterns.matrix,
+            waste=L,
+            bundles=b_opt,
+            pos_factors=pos_factors,
+            solver_stats=dict(
+                self.phase2_stats,
+                finished_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                used_heuristic=status not in (cp_model.OPTIMAL, cp_model.FEASIBLE),
+            ),
+            stocks=self.stocks,
+            pattern_stock=self.patterns.stock,
+        )
+        totals = self.plan["totals"]
+        self.log(
+            f"✅ Kết quả: {totals['bars']} cây, {totals['bundles']} bó, "
+            f"hao hụt {totals['waste']:.1f}mm ({totals['waste_percent']:.2f}%)"
+        )
+        if len(self.stocks) > 1:
+            self.log("📏 " + ", ".join(f"{s['bars']} cây {s['length']:g}mm" for s in self.plan["stocks"]))
+        return self.plan
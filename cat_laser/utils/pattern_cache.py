@@ -0,0 +1,171 @@
+# frappe-bench/apps/cat_laser/cat_laser/utils/pattern_cache.py
+import json
+import os
+import shutil
+from collections import defaultdict
+
+import numpy as np
+
+from cat_laser.utils.file_store import FileStore, site_cache_root
+
+# Tăng khi thay đổi định dạng lưu hoặc cách sinh pattern
+SCHEMA_VERSION = 3
+DEFAULT_MAX_MB = 512
+
+WASTE_FILE = "waste.npy"
+PATTERNS_FILE = "patterns.npy"
+META_FILE = "meta.json"
+
+
+# ===================================================================
+# Kho cache pattern: mảng NumPy, có version, LRU, khóa file
+# ===================================================================
+class PatternCacheStore(FileStore):
+    """
+    Mỗi entry là một thư mục `<root>/<key>/` gồm:
+      - waste.npy: vector hao hụt (mm) sắp xếp tăng dần
+      - patterns.npy: ma trận số lượng uint8, mỗi dòng là một pattern
+      - meta.json: nhóm tham số, danh sách kích thước (theo thứ tự cột), cờ complete
+    Hai file được đọc bằng mmap nên load gần như tức thời.
+    LRU dựa trên mtime của thư mục entry (được cập nhật mỗi lần đọc).
+    """
+
+    KEY_PREFIX = "v"
+    SCHEMA_VERSION = SCHEMA_VERSION
+
+    def __init__(self, root, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        super().__init__(root)
+        self.max_bytes = int(max_bytes)
+
+    def _entry_dir(self, key):
+        return self.root / key
+
+    def load(self, key, mmap=True):
+        """Trả về (waste, patterns) hoặc None nếu chưa có trong cache."""
+        entry = self._entry_dir(key)
+        with self._lock(shared=True):
+            if not (entry / WASTE_FILE).exists() or not (entry / PATTERNS_FILE).exists():
+                return None
+            mode = "r" if mmap else None
+            try:
+                waste = np.load(entry / WASTE_FILE, mmap_mode=mode)
+                patterns = np.load(entry / PATTERNS_FILE, mmap_mode=mode)
+            except (OSError, ValueError):
+                return None
+            try:
+                os.utime(entry, None)
+            except OSError:
+                pass
+        return waste, patterns
+
+    def load_meta(self, key):
+        try:
+            with open(self._entry_dir(key) / META_FILE, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def find_entries(self, group):
+        """Liệt kê (key, meta) của các entry thuộc cùng nhóm tham số."""
+        with self._lock(shared=True):
+            paths = [p for p in self.root.iterdir() if p.is_dir() and not p.name.startswith(".")]
+        found = []
+        for p in paths:
+            meta = self.load_meta(p.name)
+            if meta and meta.get("group") == group:
+                found.append((p.name, meta))
+        return found
+
+    def save(self, key, waste, patterns, meta=None):
+        waste = np.asarray(waste, dtype=np.float64)
+        patterns = np.asarray(patterns)
+        if patterns.size and patterns.max() > np.iinfo(np.uint8).max:
+            raise ValueError("Số đoạn trong pattern vượt quá giới hạn uint8.")
+
+        order = np.argsort(waste, kind="stable")
+        waste = waste[order]
+        patterns = patterns[order].astype(np.uint8)
+
+        entry = self._entry_dir(key)
+        tmp = self.root / f".tmp-{key}-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        np.save(tmp / WASTE_FILE, waste)
+        np.save(tmp / PATTERNS_FILE, patterns)
+        if meta is not None:
+            with open(tmp / META_FILE, "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+
+        with self._lock():
+            if entry.exists():
+                shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp, entry)
+            self._evict()
+
+    def _entries(self):
+        for p in self.root.iterdir():
+            if p.is_dir() and not p.name.startswith("."):
+                size = sum(f.stat().st_size for f in p.iterdir() if f.is_file())
+                yield p, p.stat().st_mtime, size
+
+    def _over_limit(self, count, total_bytes):
+        return total_bytes > self.max_bytes
+
+    def _remove(self, path):
+        shutil.rmtree(path, ignore_errors=True)
+
+
+# ===================================================================
+# Dùng lại cache giữa các danh sách kích thước khác nhau
+# ===================================================================
+def size_key(size):
+    return round(float(size), 3)
+
+
+def canonical_sizes(sizes):
+    """Danh sách kích thước sắp xếp tăng dần (giữ bội số nếu có kích thước trùng)."""
+    return sorted(size_key(s) for s in sizes)
+
+
+def match_columns(src_sizes, dst_sizes):
+    """
+    Với mỗi kích thước trong dst_sizes, chọn một cột riêng biệt trong src_sizes có cùng giá trị.
+    Trả về None nếu dst_sizes không phải tập con (theo bội số) của src_sizes.
+    """
+    available = defaultdict(list)
+    for j, s in enumerate(src_sizes):
+        available[size_key(s)].append(j)
+    cols = []
+    for s in dst_sizes:
+        bucket = available.get(size_key(s))
+        if not bucket:
+            return None
+        cols.append(bucket.pop(0))
+    return cols
+
+
+def project_patterns(waste, patterns, src_sizes, dst_sizes):
+    """
+    Chiếu tập pattern trên src_sizes xuống dst_sizes (tập con):
+    chỉ giữ các dòng không dùng kích thước ngoài dst_sizes, bỏ các cột thừa.
+    """
+    cols = match_columns(src_sizes, dst_sizes)
+    if cols is None:
+        return None
+    patterns = np.asarray(patterns)
+    others = np.setdiff1d(np.arange(patterns.shape[1]), cols)
+    if len(others):
+        mask = ~(patterns[:, others] > 0).any(axis=1)
+    else:
+        mask = np.ones(len(patterns), dtype=bool)
+    return np.asarray(waste)[mask], patterns[mask][:, cols]
+
+
+def get_default_store():
+    """
+    Trong Frappe: cache đặt trong private files của site, cấu hình qua site_config.
+    Ngoài Frappe: thư mục local_cache_dir("patterns").
+    """
+    root, conf = site_cache_root("patterns", "cat_laser_pattern_cache_dir", "cat_laser_pattern_cache")
+    max_mb = conf.get("cat_laser_pattern_cache_max_mb") or DEFAULT_MAX_MB
+    return PatternCacheStore(root, max_bytes=int(max_mb) * 1024 * 1024)
@@ -0,0 +1,289 @@
+# frappe-bench/apps/cat_laser/cat_laser/utils/pattern_enum.py
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from cat_laser.utils.pattern_set import COUNT_DTYPE, row_keys
+
+
+# ===================================================================
+# Liệt kê pattern cho bài toán 1 ràng buộc (bounded knapsack)
+# ===================================================================
+class PatternEnumerator:
+    """
+    Liệt kê mọi vector số nguyên x (0 <= x_i <= max_per_size) sao cho
+    lower <= sum((seg_i + blade) * x_i) <= upper, thay cho CP-SAT ở GĐ 1.
+
+    Duyệt theo chiều sâu nhưng mỗi bước mở rộng cả một khối trạng thái bằng NumPy,
+    cắt tỉa nhánh không thể đạt `lower` và nhánh vượt quá số loại kích thước cho phép.
+    Các pattern được ghi thẳng vào ma trận int16.
+    `exclude`: ma trận các pattern đã có (cột theo thứ tự segment_sizes), không liệt kê lại.
+    Nếu có `require_any` thì chỉ liệt kê pattern chứa ít nhất một kích thước trong danh sách đó.
+    `last_segment`: các kích thước phải nằm ở đoạn cuối cây, mỗi pattern chứa tối đa
+    `max_last_segment` đoạn thuộc nhóm này (cắt tỉa ngay khi mở rộng, không lọc sau).
+    """
+
+    def __init__(
+        self,
+        seg_scaled,
+        blade_scaled,
+        lower,
+        upper,
+        max_per_size=30,
+        max_distinct=None,
+        exclude=None,
+        require_any=None,
+        last_segment=None,
+        max_last_segment=1,
+        chunk_size=65536,
+    ):
+        self.n = len(seg_scaled)
+        self.lower = int(lower)
+        self.upper = int(upper)
+        self.max_distinct = max_distinct if max_distinct is not None else self.n
+        self.exclude = None if exclude is None or len(exclude) == 0 else np.asarray(exclude)
+        self.chunk_size = chunk_size
+
+        weights = np.array(seg_scaled, dtype=np.int64) + int(blade_scaled)
+        # Duyệt các kích thước bắt buộc trước, sau đó kích thước lớn trước để cắt tỉa sớm
+        required = sorted(set(require_any or []), key=lambda i: -weights[i])
+        required_set = set(required)
+        others = [int(i) for i in np.argsort(-weights, kind="stable") if i not in required_set]
+        self.order = np.array(required + others, dtype=np.int64)
+        self._require_level = len(required) - 1
+        self.weights = weights[self.order]
+        self.bounds = np.minimum(
+            int(max_per_size), np.maximum(self.upper, 0) // np.maximum(self.weights, 1)
+        ).astype(np.int64)
+
+        # Vị trí (theo thứ tự duyệt) của các kích thước đoạn cuối
+        last = set(int(i) for i in (last_segment or []))
+        self.max_last_segment = int(max_last_segment)
+        self._last_levels = np.array(
+            [k for k, i in enumerate(self.order) if int(i) in last], dtype=np.int64
+        )
+        if len(self._last_levels):
+            self.bounds[self._last_levels] = np.minimum(
+                self.bounds[self._last_levels], self.max_last_segment
+            )
+
+        self._reach = self._build_reach_table()
+
+    def _build_reach_table(self):
+        # reach[i][r]: chiều dài lớn nhất có thể thêm từ các kích thước i..n-1
+        # khi chỉ được dùng thêm tối đa r loại kích thước
+        n = self.n
+        k = self.max_distinct
+        best = self.bounds * self.weights
+        reach = np.zeros((n + 1, k + 1), dtype=np.int64)
+        for i in range(n - 1, -1, -1):
+            top = np.sort(best[i:])[::-1]
+            cum = np.concatenate(([0], np.cumsum(top)))
+            for r in range(k + 1):
+                reach[i, r] = cum[min(r, len(top))]
+        return np.minimum(reach, self.upper)
+
+    def _expand(self, level, counts, used, distinct):
+        w = self.weights[level]
+        last_used = None
+        if level in self._last_levels:
+            before = self._last_levels[self._last_levels < level]
+            last_used = counts[:, before].sum(axis=1, dtype=np.int64)
+        children_counts = []
+        children_used = []
+        children_distinct = []
+        for t in range(int(self.bounds[level]) + 1):
+            new_used = used + t * w
+            new_distinct = distinct + (1 if t > 0 else 0)
+            mask = new_used <= self.upper
+            mask &= new_distinct <= self.max_distinct
+            remaining = np.maximum(self.max_distinct - new_distinct, 0)
+            mask &= new_used + self._reach[level + 1, remaining] >= self.lower
+            if last_used is not None and t > 0:
+                mask &= last_used + t <= self.max_last_segment
+            if not mask.any():
+                if t > 0 and not (new_used <= self.upper).any():
+                    break
+                continue
+            c = counts[mask].copy()
+            c[:, level] = t
+            children_counts.append(c)
+            children_used.append(new_used[mask])
+            children_distinct.append(new_distinct[mask])
+
+        if not children_counts:
+            return None
+        counts = np.concatenate(children_counts)
+        used = np.concatenate(children_used)
+        distinct = np.concatenate(children_distinct)
+
+        if level == self._require_level:
+            mask = (counts[:, : level + 1] > 0).any(axis=1)
+            if not mask.any():
+                return None
+            counts, used, distinct = counts[mask], used[mask], distinct[mask]
+        return counts, used, distinct
+
+    def _root(self):
+        return (
+            0,
+            np.zeros((1, self.n), dtype=np.int16),
+            np.zeros(1, dtype=np.int64),
+            np.zeros(1, dtype=np.int64),
+        )
+
+    def start_state(self, level, counts):
+        """Trạng thái xuất phát từ các tiền tố đã cố định `level` kích thước đầu (thứ tự nội bộ)."""
+        counts = np.asarray(counts, dtype=np.int16)
+        fixed = counts[:, :level].astype(np.int64)
+        used = fixed @ self.weights[:level]
+        distinct = (fixed > 0).sum(axis=1)
+        return level, counts, used, distinct
+
+    def prefixes(self, min_count):
+        """
+        Mở rộng theo chiều rộng tới khi có ít nhất `min_count` tiền tố (hoặc chỉ còn 1 tầng),
+        mỗi tiền tố là một bài toán con độc lập. Trả về (level, counts), counts rỗng nếu không có nghiệm.
+        """
+        level, counts, used, distinct = self._root()
+        while level < self.n - 1 and len(counts) < min_count:
+            expanded = self._expand(level, counts, used, distinct)
+            if expanded is None:
+                return level + 1, np.zeros((0, self.n), dtype=np.int16)
+            counts, used, distinct = expanded
+            level += 1
+        return level, counts
+
+    def run(self, max_solutions=100000, start=None):
+        """
+        Trả về (used_scaled, matrix): vector tổng chiều dài đã scale và
+        ma trận pattern (int16, cột theo thứ tự segment_sizes ban đầu).
+        """
+        n = self.n
+        out_counts = []
+        out_used = []
+        total = 0
+
+        if n == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.int16)
+
+        exclude = None
+        if self.exclude is not None:
+            # Khóa theo thứ tự cột nội bộ để so thẳng với các dòng đang liệt kê
+            exclude = row_keys(self.exclude[:, self.order].astype(COUNT_DTYPE))
+
+        stack = [start if start is not None else self._root()]
+
+        while stack and total < max_solutions:
+            level, counts, used, distinct = stack.pop()
+
+            if len(counts) > self.chunk_size:
+                half = len(counts) // 2
+                stack.append((level, counts[half:], used[half:], distinct[half:]))
+                stack.append((level, counts[:half], used[:half], distinct[:half]))
+                continue
+
+            expanded = self._expand(level, counts, used, distinct)
+            if expanded is None:
+                continue
+            counts, used, distinct = expanded
+
+            if level == n - 1:
+                mask = used >= self.lower
+                counts, used = counts[mask], used[mask]
+                if exclude is not None and len(counts):
+                    keep = ~np.isin(row_keys(counts), exclude)
+                    counts, used = counts[keep], used[keep]
+                if len(counts):
+                    take = min(len(counts), max_solutions - total)
+                    out_counts.append(counts[:take])
+                    out_used.append(used[:take])
+                    total += take
+            else:
+                stack.append((level + 1, counts, used, distinct))
+
+        if not out_counts:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, n), dtype=np.int16)
+
+        matrix = np.empty((total, n), dtype=np.int16)
+        matrix[:, self.order] = np.concatenate(out_counts)
+        used = np.concatenate(out_used)
+
+        # Sắp xếp một lần: tổng chiều dài giảm dần (hao hụt tăng dần)
+        idx = np.argsort(-used, kind="stable")
+        return used[idx], matrix[idx]
+
+
+# ===================================================================
+# Liệt kê song song trên nhiều tiến trình
+# ===================================================================
+def _enumerate_partition(kwargs, level, counts, max_solutions):
+    enumerator = PatternEnumerator(**kwargs)
+    start = enumerator.start_state(level, counts)
+    return enumerator.run(max_solutions=max_solutions, start=start)
+
+
+def enumerate_parallel(kwargs, workers, max_solutions=100000, num_partitions=64):
+    """
+    Chia không gian tìm kiếm thành `num_partitions` bài toán con theo số lượng của các
+    kích thước lớn nhất (tiền tố), liệt kê mỗi phần trên một tiến trình.
+    Cách chia không phụ thuộc số tiến trình; kết quả được gộp theo đúng thứ tự các phần
+    cho tới khi đủ `max_solutions`, loại trùng rồi sắp xếp theo
+    (tổng chiều dài giảm dần, vector pattern) nên luôn giống nhau dù chạy 1, 2 hay 32 tiến trình.
+    Với 1 tiến trình các phần được liệt kê lần lượt ngay trong tiến trình hiện tại.
+    """
+    enumerator = PatternEnumerator(**kwargs)
+    n = enumerator.n
+    level, prefixes = enumerator.prefixes(num_partitions)
+    if len(prefixes) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, n), dtype=np.int16)
+    chunks = [c for c in np.array_split(prefixes, min(len(prefixes), num_partitions)) if len(c)]
+
+    parts = []
+    total = 0
+    if workers <= 1:
+        for chunk in chunks:
+            if total >= max_solutions:
+                break
+            part = _enumerate_partition(kwargs, level, chunk, max_solutions)
+            parts.append(part)
+            total += len(part[1])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_enumerate_partition, kwargs, level, chunk, max_solutions)
+                for chunk in chunks
+            ]
+            for future in futures:
+                if total >= max_solutions:
+                    future.cancel()
+                    continue
+                part = future.result()
+                parts.append(part)
+                total += len(part[1])
+
+    # Mỗi phần đã sắp xếp sẵn; lấy theo thứ tự các phần cho tới khi đủ giới hạn chung
+    used_parts, matrix_parts = [], []
+    remaining = max_solutions
+    for used, matrix in parts:
+        used_parts.append(used[:remaining])
+        matrix_parts.append(matrix[:remaining])
+        remaining -= len(matrix_parts[-1])
+        if remaining <= 0:
+            break
+    used = np.concatenate(used_parts)
+    matrix = np.concatenate(matrix_parts)
+    if len(matrix) == 0:
+        return used, matrix
+
+    matrix, first = np.unique(matrix, axis=0, return_index=True)
+    return _canonical_order(used[first], matrix)
+
+
+def _canonical_order(used, matrix):
+    """Thứ tự xác định: tổng chiều dài giảm dần, rồi theo vector pattern."""
+    if len(matrix) == 0:
+        return used, matrix
+    keys = [matrix[:, k] for k in range(matrix.shape[1] - 1, -1, -1)] + [-used]
+    idx = np.lexsort(keys)
+    return used[idx], matrix[idx]
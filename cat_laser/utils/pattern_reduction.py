@@ -0,0 +1,108 @@
+# frappe-bench/apps/cat_laser/cat_laser/utils/pattern_reduction.py
+import numpy as np
+
+from cat_laser.utils.pattern_set import row_keys
+
+
+# ===================================================================
+# Rút gọn tập pattern giữa GĐ 1 và GĐ 2
+# ===================================================================
+def _support_groups(matrix):
+    """Gán mỗi pattern vào nhóm theo tập kích thước được dùng (support)."""
+    _, groups = np.unique(row_keys(np.packbits(matrix > 0, axis=1)), return_inverse=True)
+    return groups.ravel()
+
+
+def reduce_patterns(
+    patterns,
+    length,
+    demands,
+    max_stock_over,
+    top_k_per_support=None,
+    dominance_slack=None,
+    max_patterns=None,
+    surplus_penalty=None,
+):
+    """
+    Loại bỏ khỏi `patterns` (PatternSet) các pattern không (hoặc hầu như không) có ích cho GĐ 2:
+      - infeasible: số đoạn của một kích thước vượt quá demand + max_stock_over
+      - duplicate: trùng vector số lượng
+      - dominated: cùng support nhưng hao hụt tệ hơn pattern tốt nhất của nhóm quá `dominance_slack` (mm);
+        đây là heuristic: khi nhu cầu bị chặn chặt, phương án tối ưu có thể cần pattern bị loại
+      - top_k: chỉ giữ `top_k_per_support` pattern hao hụt thấp nhất trong mỗi nhóm support
+      - budget: nếu vẫn còn hơn `max_patterns`, giữ lần lượt pattern tốt nhất của mọi nhóm,
+        rồi pattern tốt thứ hai... để tập còn lại vẫn đa dạng về tổ hợp kích thước
+    Kích thước nào bị mất hết pattern sẽ được giữ lại pattern hao hụt thấp nhất chứa nó.
+    Có `surplus_penalty` (mm / đoạn) thì hao hụt được xếp hạng cùng phần phạt như ở GĐ 2.
+
+    Trả về (PatternSet đã rút gọn, thống kê số pattern bị loại theo từng bước).
+    """
+    stats = {"before": len(patterns), "infeasible": 0, "duplicate": 0, "dominated": 0, "top_k": 0, "budget": 0}
+    if not len(patterns):
+        stats["after"] = 0
+        return patterns, stats
+
+    matrix = patterns.matrix
+    waste = patterns.waste(length)
+    if surplus_penalty is not None:
+        waste = waste + matrix @ np.asarray(surplus_penalty, dtype=float)
+    caps = np.asarray(demands, dtype=np.int64) + int(max_stock_over)
+
+    keep = np.ones(len(patterns), dtype=bool)
+
+    # 1. Pattern không khả thi
+    feasible = (matrix <= caps).all(axis=1)
+    stats["infeasible"] = int((~feasible).sum())
+    keep &= feasible
+
+    # 2. Pattern trùng lặp (giữ lần xuất hiện đầu tiên)
+    unique_mask = patterns.unique_mask()
+    stats["duplicate"] = int((keep & ~unique_mask).sum())
+    keep &= unique_mask
+
+    groups = _support_groups(matrix)
+
+    # 3. Pattern bị trội trong cùng nhóm support
+    if dominance_slack is not None:
+        best = np.full(groups.max() + 1, np.inf)
+        np.minimum.at(best, groups[keep], waste[keep])
+        dominated = keep & (waste > best[groups] + float(dominance_slack))
+        stats["dominated"] = int(dominated.sum())
+        keep &= ~dominated
+
+    # Thứ hạng hao hụt của từng pattern trong nhóm support của nó
+    idx = np.flatnonzero(keep)
+    order = idx[np.lexsort((waste[idx], groups[idx]))]
+    rank = np.zeros(len(patterns), dtype=np.int64)
+    if len(order):
+        g_sorted = groups[order]
+        starts = np.r_[0, np.flatnonzero(np.diff(g_sorted)) + 1]
+        rank[order] = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+
+    # 4. Giới hạn top-K theo hao hụt cho mỗi nhóm support
+    if top_k_per_support:
+        over = keep & (rank >= int(top_k_per_support))
+        stats["top_k"] = int(over.sum())
+        keep &= ~over
+
+    # 5. Ngân sách tổng số pattern
+    if max_patterns and keep.sum() > max_patterns:
+        idx = np.flatnonzero(keep)
+        order = idx[np.lexsort((waste[idx], rank[idx]))]
+        over = order[int(max_patterns):]
+        stats["budget"] = len(over)
+        keep[over] = False
+
+    # Đảm bảo mỗi kích thước có nhu cầu vẫn còn ít nhất 1 pattern
+    demands_arr = np.asarray(demands)
+    for i in np.flatnonzero(demands_arr > 0):
+        contains = patterns.support_mask([i])
+        if (contains & keep).any():
+            continue
+        candidates = np.flatnonzero(feasible & contains)
+        if len(candidates):
+            keep[candidates[np.argmin(waste[candidates])]] = True
+
+    reduced = patterns[keep]
+    stats["after"] = len(reduced)
+    return reduced, stats
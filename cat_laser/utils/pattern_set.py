@@ -0,0 +1,131 @@
+# frappe-bench/apps/cat_laser/cat_laser/utils/pattern_set.py
+import numpy as np
+
+# Số đoạn của một kích thước trong pattern luôn nhỏ (max_per_size = 30): int16 là đủ
+COUNT_DTYPE = np.int16
+
+
+def row_keys(matrix):
+    """Khóa so sánh được của từng dòng (np.void trên bytes của dòng) để loại trùng / tra cứu."""
+    rows = np.ascontiguousarray(matrix)
+    if rows.ndim != 2 or rows.shape[1] == 0:
+        return np.zeros(len(rows), dtype=np.dtype((np.void, 1)))
+    return rows.view(np.dtype((np.void, rows.dtype.itemsize * rows.shape[1]))).ravel()
+
+
+# ===================================================================
+# Tập pattern dạng mảng NumPy liền khối
+# ===================================================================
+class PatternSet:
+    """
+    Tập pattern dùng xuyên suốt GĐ 1 -> GĐ 2 thay cho list (obj_value, [số đoạn...]):
+      - matrix: số đoạn mỗi kích thước (n_patterns x n_sizes, int16, liền khối)
+      - used: tổng chiều dài đã dùng của từng pattern (mm)
+      - stock: loại cây của từng pattern (chỉ số trong danh sách stocks, mặc định 0)
+    Các bộ lọc đều vector hóa; cắt lát bằng slice trả về view (không sao chép).
+    Sau sort_by_used() tập được sắp theo used giảm dần, tức hao hụt tăng dần.
+    """
+
+    __slots__ = ("matrix", "stock", "used")
+
+    def __init__(self, matrix, used, stock=None):
+        self.matrix = np.asarray(matrix, dtype=COUNT_DTYPE)
+        self.used = np.asarray(used, dtype=np.float64)
+        if self.matrix.ndim != 2 or len(self.matrix) != len(self.used):
+            raise ValueError("PatternSet: matrix phải là mảng 2 chiều, mỗi dòng ứng với 1 giá trị used.")
+        if stock is None:
+            stock = 0
+        if np.ndim(stock) == 0:
+            stock = np.full(len(self.used), int(stock), dtype=np.int64)
+        self.stock = np.asarray(stock, dtype=np.int64)
+
+    @classmethod
+    def empty(cls, n_sizes):
+        return cls(np.zeros((0, n_sizes), dtype=COUNT_DTYPE), np.zeros(0))
+
+    @classmethod
+    def concat(cls, sets):
+        sets = [s for s in sets if s is not None]
+        if len(sets) == 1:
+            return sets[0]
+        return cls(
+            np.concatenate([s.matrix for s in sets]),
+            np.concatenate([s.used for s in sets]),
+            np.concatenate([s.stock for s in sets]),
+        )
+
+    def __len__(self):
+        return len(self.used)
+
+    def __getitem__(self, idx):
+        """Slice -> view; mảng chỉ số / mask -> bản sao các dòng được chọn."""
+        return PatternSet(self.matrix[idx], self.used[idx], self.stock[idx])
+
+    @property
+    def n_sizes(self):
+        return self.matrix.shape[1]
+
+    def with_stock(self, k):
+        """Cùng dữ liệu (không sao chép), gán mọi pattern cho loại cây k."""
+        return PatternSet(self.matrix, self.used, int(k))
+
+    def waste(self, length):
+        """Hao hụt của từng pattern; `length` là 1 số hoặc chiều dài cây theo từng pattern."""
+        return np.asarray(length, dtype=np.float64) - self.used
+
+    # --- Bộ lọc vector hóa ---
+    def count_nonzero(self):
+        """Số loại kích thước trong từng pattern."""
+        return np.count_nonzero(self.matrix, axis=1)
+
+    def support_mask(self, sizes):
+        """Pattern chứa ít nhất 1 đoạn thuộc các kích thước `sizes`."""
+        return (self.matrix[:, list(sizes)] > 0).any(axis=1)
+
+    def trim_cutoff(self, length, min_waste):
+        """
+        Với tập đã sắp hao hụt tăng dần: vị trí đầu tiên có hao hụt >= min_waste
+        (vd: chừa phần tề đầu sắt), tìm bằng searchsorted thay cho duyệt tuần tự.
+        """
+        return int(np.searchsorted(self.waste(length), min_waste, side="left"))
+
+    def sort_by_used(self):
+        """Sắp xếp ổn định theo used giảm dần (hao hụt tăng dần)."""
+        order = np.argsort(-self.used, kind="stable")
+        return self[order]
+
+    # --- Loại trùng / tra cứu theo bytes của dòng ---
+    def keys(self):
+        """Khóa của từng pattern: bytes của (loại cây, số đoạn)."""
+        full = np.empty((len(self), self.n_sizes + 1), dtype=COUNT_DTYPE)
+        full[:, 0] = self.stock
+        full[:, 1:] = self.matrix
+        return row_keys(full)
+
+    @staticmethod
+    def key(pattern, stock=0):
+        """Khóa của 1 pattern, cùng dạng với keys()."""
+        return np.concatenate(([int(stock)], np.asarray(pattern))).astype(COUNT_DTYPE).tobytes()
+
+    def index(self):
+        """dict khóa -> vị trí (lần xuất hiện đầu tiên)."""
+        out = {}
+        for j, k in enumerate(self.keys()):
+            out.setdefault(k.tobytes(), j)
+        return out
+
+    def unique_mask(self):
+        """True tại lần xuất hiện đầu tiên của mỗi pattern (theo loại cây + số đoạn)."""
+        mask = np.zeros(len(self), dtype=bool)
+        if len(self):
+            _, first = np.unique(self.keys(), return_index=True)
+            mask[first] = True
+        return mask
+
+    def unique(self):
+        """Bỏ pattern trùng, giữ nguyên thứ tự các lần xuất hiện đầu tiên."""
+        return self[self.unique_mask()]
+
+    def append(self, matrix, used, stock=None):
+        """Tập mới gồm tập hiện tại và các dòng thêm vào."""
+        return PatternSet.concat([self, PatternSet(np.reshape(matrix, (-1, self.n_sizes)), used, stock)])
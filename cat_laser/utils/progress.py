@@ -0,0 +1,154 @@
+# frappe-bench/apps/cat_laser/cat_laser/utils/progress.py
+import contextvars
+import threading
+
+
+# ===================================================================
+# Kênh báo tiến độ: gom log, gửi theo lô trên thread nền
+# ===================================================================
+class ProgressReporter:
+    """
+    Gom các log của bộ tối ưu và gửi tối đa 1 sự kiện realtime mỗi `interval` giây,
+    chỉ tới room của document đang giải (doctype/docname) thay vì broadcast.
+
+    - log(msg): thêm một dòng log (giữ thứ tự, tối đa `max_buffer` dòng mỗi lô)
+    - status(msg): trạng thái tiến độ, chỉ giữ bản mới nhất (vd: "Đang chạy 12/30s")
+
+    Việc publish chạy trên thread nền nên callback của solver không bao giờ chờ Redis.
+    """
+
+    def __init__(
+        self,
+        doctype=None,
+        docname=None,
+        event="cutting_log",
+        interval=1.0,
+        publish=None,
+        max_buffer=200,
+    ):
+        self.doctype = doctype
+        self.docname = docname
+        self.event = event
+        self.interval = interval
+        self.max_buffer = max_buffer
+        self._publish = publish or self._publish_realtime
+
+        self._lock = threading.Lock()
+        self._messages = []
+        self._dropped = 0
+        self._status = None
+        self._closed = threading.Event()
+        self._thread = None
+
+    def _publish_realtime(self, payload):
+        import frappe
+
+        frappe.publish_realtime(
+            self.event, payload, doctype=self.doctype, docname=self.docname
+        )
+
+    def log(self, message):
+        with self._lock:
+            self._messages.append(message)
+            if len(self._messages) > self.max_buffer:
+                del self._messages[0]
+                self._dropped += 1
+        self._ensure_started()
+
+    def status(self, message):
+        with self._lock:
+            self._status = message
+        self._ensure_started()
+
+    def _ensure_started(self):
+        if self._thread is not None or self._closed.is_set():
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            # Chép context hiện tại để thread nền vẫn thấy frappe.local (site, user...)
+            ctx = contextvars.copy_context()
+            self._thread = threading.Thread(target=ctx.run, args=(self._run,), daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._closed.wait(self.interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            messages, self._messages = self._messages, []
+            status, self._status = self._status, None
+            dropped, self._dropped = self._dropped, 0
+        if not messages and status is None:
+            return
+
+        payload = {
+            "doc_name": self.docname,
+            "messages": messages,
+            "status": status,
+            "dropped": dropped,
+            # Giữ khóa "message" cho các client cũ
+            "message": messages[-1] if messages else status,
+        }
+        try:
+            self._publish(payload)
+        except Exception:
+            # Mất một lô log không được làm hỏng lời giải
+            pass
+
+    def close(self, timeout=5.0):
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        else:
+            self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class CallbackProgress:
+    """
+    Kênh báo tiến độ tối giản cho bộ tối ưu chạy ngoài Frappe (CLI, benchmark):
+    chuyển log/status cho hàm được truyền vào, mặc định bỏ qua.
+    """
+
+    def __init__(self, log=None, status=None):
+        self._log = log
+        self._status = status
+
+    def log(self, message):
+        if self._log is not None:
+            self._log(message)
+
+    def status(self, message):
+        if self._status is not None:
+            self._status(message)
+
+    def close(self, timeout=None):
+        pass
+
+
+class MultiProgress:
+    """Gửi cùng log/status cho nhiều kênh, vd: các Cutting Request được giải gộp trong một job."""
+
+    def __init__(self, reporters):
+        self.reporters = list(reporters)
+
+    def log(self, message):
+        for r in self.reporters:
+            r.log(message)
+
+    def status(self, message):
+        for r in self.reporters:
+            r.status(message)
+
+    def close(self):
+        for r in self.reporters:
+            r.close()
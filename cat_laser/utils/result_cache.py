@@ -0,0 +1,101 @@
+# frappe-bench/apps/cat_laser/cat_laser/utils/result_cache.py
+import json
+import os
+import time
+
+from cat_laser.utils.file_store import FileStore, site_cache_root
+
+# Tăng khi thay đổi định dạng lưu hoặc ý nghĩa của kết quả
+SCHEMA_VERSION = 1
+DEFAULT_TTL_HOURS = 24 * 7
+DEFAULT_MAX_ENTRIES = 1000
+
+# Cách dùng kết quả đã lưu
+RESULT_CACHE_OFF = "off"
+RESULT_CACHE_REUSE = "reuse"
+RESULT_CACHE_IMPROVE = "improve"
+
+
+# ===================================================================
+# Cache kết quả cuối cùng (phương án chia bó) theo toàn bộ đầu vào
+# ===================================================================
+class ResultCacheStore(FileStore):
+    """
+    Mỗi entry là một file `<root>/<key>.json` gồm các pattern được dùng (cột theo thứ tự
+    chuẩn của khóa), số bó theo hệ số, hao hụt và trạng thái/gap của solver.
+    Entry quá `ttl_seconds` bị bỏ khi đọc; vượt `max_entries` thì xóa entry ít dùng nhất
+    (LRU theo mtime, được cập nhật mỗi lần đọc).
+    """
+
+    KEY_PREFIX = "r"
+    SCHEMA_VERSION = SCHEMA_VERSION
+
+    def __init__(self, root, ttl_seconds=DEFAULT_TTL_HOURS * 3600, max_entries=DEFAULT_MAX_ENTRIES):
+        super().__init__(root)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = int(max_entries)
+
+    def _path(self, key):
+        return self.root / f"{key}.json"
+
+    def get(self, key):
+        """Trả về dict đã lưu hoặc None nếu chưa có / đã hết hạn."""
+        path = self._path(key)
+        with self._lock(shared=True):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                return None
+        if self.ttl_seconds and time.time() - entry.get("created", 0) > self.ttl_seconds:
+            self.delete(key)
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry
+
+    def set(self, key, entry):
+        entry = dict(entry, created=time.time())
+        path = self._path(key)
+        tmp = self.root / f".tmp-{key}-{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        with self._lock():
+            os.replace(tmp, path)
+            self._evict()
+
+    def delete(self, key):
+        with self._lock():
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def _entries(self):
+        for p in self.root.glob("*.json"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            yield p, st.st_mtime, st.st_size
+
+    def _over_limit(self, count, total_bytes):
+        return count > self.max_entries
+
+    def _remove(self, path):
+        path.unlink(missing_ok=True)
+
+
+def get_default_result_store():
+    """
+    Trong Frappe: cache kết quả đặt trong private files của site, cấu hình qua site_config.
+    Ngoài Frappe: thư mục local_cache_dir("results").
+    """
+    root, conf = site_cache_root("results", "cat_laser_result_cache_dir", "cat_laser_result_cache")
+    ttl_hours = conf.get("cat_laser_result_cache_ttl_hours")
+    if ttl_hours is None:
+        ttl_hours = DEFAULT_TTL_HOURS
+    max_entries = conf.get("cat_laser_result_cache_max_entries") or DEFAULT_MAX_ENTRIES
+    return ResultCacheStore(root, ttl_seconds=float(ttl_hours) * 3600, max_entries=max_entries)
@@ -0,0 +1,67 @@
+# frappe-bench/apps/cat_laser/cat_laser/utils/scaling.py
+import math
+
+import numpy as np
+
+# Số chữ số thập phân tối đa được giữ chính xác (chiều dài tính bằng mm)
+MAX_DECIMALS = 3
+
+
+def decimal_scale(values, max_digits=MAX_DECIMALS):
+    """10**d nhỏ nhất (d <= max_digits) để mọi giá trị x 10**d là số nguyên (bỏ qua sai số float)."""
+    values = np.abs(np.asarray(values, dtype=np.float64)).ravel()
+    for d in range(max_digits + 1):
+        scaled = values * 10**d
+        if np.all(np.abs(scaled - np.rint(scaled)) <= 1e-6 * np.maximum(scaled, 1.0)):
+            return 10**d
+    return 10**max_digits
+
+
+def integer_coefficients(values, max_digits=MAX_DECIMALS):
+    """
+    Hệ số nguyên nhỏ nhất cho một mục tiêu tuyến tính: (coeffs, unit) với values ~ coeffs x unit,
+    coeffs đã chia ước chung lớn nhất.
+    """
+    scale = decimal_scale(values, max_digits)
+    coeffs = np.rint(np.asarray(values, dtype=np.float64) * scale).astype(np.int64)
+    g = int(np.gcd.reduce(np.abs(coeffs))) if coeffs.size else 0
+    g = g or 1
+    return coeffs // g, g / scale
+
+
+# ===================================================================
+# Thang số nguyên cho ràng buộc chiều dài của GĐ 1
+# ===================================================================
+class LengthScale:
+    """
+    Chiều dài các đoạn + lưỡi cắt đổi sang số nguyên chính xác: nhân thang thập phân nhỏ nhất
+    theo độ chính xác thực của segment_sizes / blade_width rồi chia ước chung lớn nhất.
+      - seg, blade: hệ số đã rút gọn dùng trong mô hình
+      - seg_scaled, blade_scaled: hệ số trước khi chia GCD (đơn vị 1/scale mm)
+    Cận của tổng chiều dài làm tròn vào trong (lower lên, upper xuống) nên tập nghiệm nguyên
+    không đổi so với ràng buộc gốc.
+    """
+
+    __slots__ = ("blade", "blade_scaled", "gcd", "scale", "seg", "seg_scaled")
+
+    def __init__(self, segment_sizes, blade_width, normalize=True):
+        sizes = [float(s) for s in segment_sizes]
+        self.scale = decimal_scale([*sizes, float(blade_width)]) if normalize else 10
+        self.seg_scaled = [round(s * self.scale) for s in sizes]
+        self.blade_scaled = round(float(blade_width) * self.scale)
+        g = math.gcd(*self.seg_scaled, self.blade_scaled) if normalize else 1
+        self.gcd = g or 1
+        self.seg = [s // self.gcd for s in self.seg_scaled]
+        self.blade = self.blade_scaled // self.gcd
+
+    def lower(self, length):
+        """Cận dưới nguyên của tổng chiều dài >= length."""
+        return -(-round(float(length) * self.scale) // self.gcd)
+
+    def upper(self, length):
+        """Cận trên nguyên của tổng chiều dài <= length."""
+        return round(float(length) * self.scale) // self.gcd
+
+    def to_mm(self, units):
+        """Tổng chiều dài (đơn vị của mô hình) -> mm."""
+        return np.asarray(units) * self.gcd / self.scale
@@ -0,0 +1,64 @@
+# frappe-bench/apps/cat_laser/cat_laser/utils/scheduler.py
+import os
+import socket
+import time
+from contextlib import contextmanager
+
+DEFAULT_MAX_SEARCH_WORKERS = 8
+DEFAULT_MIN_SEARCH_WORKERS = 1
+# Lượt giải cũ hơn mốc này coi như worker đã chết (không còn chiếm CPU)
+STALE_SECONDS = 3600
+
+
+# ===================================================================
+# Chia CPU của máy cho các lượt giải đang chạy
+# ===================================================================
+def available_cores():
+    """Số core tiến trình được phép dùng (tôn trọng taskset / cgroup cpuset)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+
+def choose_search_workers(active_solves, cores=None, max_workers=None, min_workers=None):
+    """
+    Số search worker cho một lượt CP-SAT: chia đều core cho các lượt đang chạy trên máy,
+    kẹp trong [min_workers, max_workers].
+    """
+    cores = cores or available_cores()
+    max_workers = int(max_workers or DEFAULT_MAX_SEARCH_WORKERS)
+    min_workers = int(min_workers or DEFAULT_MIN_SEARCH_WORKERS)
+    share = cores // max(1, int(active_solves))
+    return max(min_workers, min(max_workers, share))
+
+
+def _host_key():
+    # Không gắn với site: mọi site chạy trên cùng máy dùng chung CPU
+    return f"cat_laser:active_solves:{socket.gethostname()}"
+
+
+@contextmanager
+def host_solve_slot(redis, member):
+    """
+    Ghi nhận một lượt giải đang chạy trên máy này (sorted set theo thời điểm bắt đầu),
+    trả về số lượt đang chạy kể cả lượt hiện tại.
+    """
+    key = _host_key()
+    now = time.time()
+    redis.zremrangebyscore(key, "-inf", now - STALE_SECONDS)
+    redis.zadd(key, {member: now})
+    redis.expire(key, STALE_SECONDS)
+    try:
+        yield max(1, int(redis.zcard(key)))
+    finally:
+        redis.zrem(key, member)
+
+
+def search_workers_from_conf(active_solves, conf):
+    """Đọc giới hạn từ site_config rồi chọn số search worker."""
+    return choose_search_workers(
+        active_solves,
+        max_workers=conf.get("cat_laser_max_search_workers"),
+        min_workers=conf.get("cat_laser_min_search_workers"),
+    )
@@ -0,0 +1,21 @@
+# frappe-bench/apps/cat_laser/cat_laser/utils/site.py
+import os
+
+
+def current_site():
+    """Trả về module frappe nếu đang chạy trong một site Frappe, ngược lại None (CLI, benchmark)."""
+    try:
+        import frappe
+    except ImportError:
+        return None
+    if not getattr(frappe.local, "site", None):
+        return None
+    return frappe
+
+
+def local_cache_dir(name):
+    """Thư mục cache khi chạy ngoài Frappe: $CAT_LASER_CACHE_DIR/<name> hoặc ~/.cache/cat_laser/<name>."""
+    root = os.environ.get("CAT_LASER_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "cat_laser"
+    )
+    return os.path.join(root, name)
@@ -0,0 +1,35 @@
+# frappe-bench/apps/cat_laser/cat_laser/utils/stocks.py
+
+
+# ===================================================================
+# Các loại cây sắt (chiều dài cây) dùng trong một lượt giải
+# ===================================================================
+def normalize_stocks(stocks):
+    """
+    stocks: [{"length", "cost" (giá tương đối trên 1mm, mặc định 1), "available" (số cây tối đa)}]
+    `available` rỗng hoặc 0 = không giới hạn.
+
+    Trả về danh sách đã sắp xếp theo chiều dài tăng dần, mỗi chiều dài chỉ một dòng.
+    """
+    out = {}
+    for s in stocks:
+        length = float(s["length"])
+        if length <= 0:
+            continue
+        if length in out:
+            raise ValueError(f"Chiều dài cây {length:g}mm bị khai báo 2 lần.")
+        cost = s.get("cost")
+        available = s.get("available")
+        out[length] = {
+            "length": length,
+            "cost": float(cost) if cost else 1.0,
+            "available": int(available) if available else None,
+        }
+    if not out:
+        raise ValueError("Chưa có chiều dài cây sắt hợp lệ.")
+    return [out[length] for length in sorted(out)]
+
+
+def stocks_key(stocks):
+    """Khóa so sánh 2 danh sách loại cây (gộp đơn, cache kết quả)."""
+    return tuple((s["length"], s["cost"], s["available"]) for s in normalize_stocks(stocks))